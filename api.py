@@ -0,0 +1,311 @@
+"""
+Read-only HTTP API over the cleaned dataset.
+
+Serves the same data as the dashboard without Streamlit reruns:
+
+    GET /api/countries                          countries with iso code and continent
+    GET /api/countries/{country}/series         daily rows (?start=&end=YYYY-MM-DD, ?metrics=a,b)
+    GET /api/countries/{country}/latest         latest row, like get_latest_metrics (?metrics=a,b)
+    GET /api/snapshots/{date}                   one row per country for a date (or "latest")
+    GET /api/export/{format}                    every country's rows as a file (csv.gz or parquet)
+    GET /api/health                             background refresh status
+    GET /metrics                                stage timings and counters (Prometheus text, ?format=json)
+
+Responses are JSON, or Arrow IPC streams with ``?format=arrow`` or
+``Accept: application/vnd.apache.arrow.stream``. They carry an ETag
+derived from the dataset version (``If-None-Match`` gets a 304), are
+gzipped when the client accepts it, and may be cached until the next
+scheduled refresh. Run with:
+
+    python api.py --port 8000
+"""
+import argparse
+import contextlib
+import gzip
+import io
+import json
+import os
+import threading
+import zlib
+from collections import OrderedDict
+import pandas as pd
+import pyarrow as pa
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import FileResponse, JSONResponse, Response
+from starlette.routing import Route
+from data_fetcher import DataUnavailableError, dataset_version, get_date_partitions, get_date_snapshot
+from dataset_refresher import create_refresher
+from instrumentation import count, prometheus_text, snapshot, span
+from metrics import METRICS, latest_metrics, with_metrics
+from table_export import EXPORT_FORMATS, export_all_path
+
+ARROW_TYPE = 'application/vnd.apache.arrow.stream'
+JSON_TYPE = 'application/json'
+
+# Columns of a country's daily series
+SERIES_COLUMNS = ['date', 'daily_cases', 'daily_deaths', 'cumulative_cases', 'cumulative_deaths', 'population', 'cfr']
+
+# Columns of the latest-metrics row
+LATEST_COLUMNS = ['country', 'iso_code', 'continent', *SERIES_COLUMNS]
+
+# Encoded response bodies kept in memory
+RESPONSE_CACHE_SIZE = int(os.environ.get('COVID_TRACKER_API_CACHE_SIZE', 512))
+
+# Smaller bodies are not worth compressing
+GZIP_MIN_BYTES = 1024
+
+# Upper bound on Cache-Control max-age, in seconds
+MAX_AGE = 3600
+
+class ApiError(Exception):
+    """A request that cannot be served, with its HTTP status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class ResponseCache:
+    """Bounded LRU of encoded bodies as ``(body, gzipped_body_or_None, media_type)``."""
+
+    def __init__(self, max_entries=RESPONSE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+RESPONSE_CACHE = ResponseCache()
+
+def _metric_names(request):
+    names = [name for name in request.query_params.get('metrics', '').split(',') if name]
+    unknown = [name for name in names if name not in METRICS]
+    if unknown:
+        raise ApiError(400, f"Unknown metrics: {', '.join(unknown)}")
+    return names
+
+def _parse_date(value, name):
+    try:
+        date = pd.Timestamp(value)
+    except ValueError:
+        date = pd.NaT
+    if pd.isna(date):  # An empty value parses as NaT
+        raise ApiError(400, f"Invalid {name}: {value!r} (expected YYYY-MM-DD)")
+    return date
+
+def _check_country(data, country):
+    if country not in data['country'].cat.categories:
+        raise ApiError(404, f"Unknown country: {country}")
+
+def countries_frame(data, request):
+    """One row per country: name, iso code, continent and covered dates."""
+    index = data.attrs['country_index']
+    blocks = [(start, stop) for start, stop in zip(index['starts'], index['stops']) if stop > start]
+    first = data.iloc[[start for start, _ in blocks]]
+    return pd.DataFrame({
+        'country': first['country'].astype(str).to_numpy(),
+        'iso_code': first['iso_code'].astype(object).to_numpy(),
+        'continent': first['continent'].astype(object).to_numpy(),
+        'first_date': first['date'].to_numpy(),
+        'last_date': data['date'].to_numpy()[[stop - 1 for _, stop in blocks]]
+    })
+
+def series_frame(data, request):
+    """A country's daily rows, optionally cut to ``start``/``end`` and with registry metrics."""
+    country = request.path_params['country']
+    _check_country(data, country)
+    names = _metric_names(request)
+    rows = with_metrics(data, names, country=country)
+    rows.attrs = {}  # Otherwise every column access deep-copies the country index
+    rows = rows[[*SERIES_COLUMNS, *names]]
+    dates = rows['date'].to_numpy()
+    low, high = 0, len(rows)
+    if 'start' in request.query_params:
+        low = dates.searchsorted(_parse_date(request.query_params['start'], 'start').to_datetime64(), 'left')
+    if 'end' in request.query_params:
+        high = dates.searchsorted(_parse_date(request.query_params['end'], 'end').to_datetime64(), 'right')
+    return rows.iloc[low:high]
+
+def latest_frame(data, request):
+    """The latest row of a country with ``cumulative_cases_per_100k`` and any requested metrics."""
+    country = request.path_params['country']
+    _check_country(data, country)
+    names = list(dict.fromkeys(['cumulative_cases_per_100k', *_metric_names(request)]))
+    latest = latest_metrics(data, country, names)
+    if latest is None:
+        raise ApiError(404, f"No data for {country}")
+    return pd.DataFrame([{column: latest[column] for column in [*LATEST_COLUMNS, *names]}])
+
+def snapshot_frame(data, request):
+    """One row per country for the requested date (``latest`` for the most recent)."""
+    value = request.path_params['date']
+    dates = get_date_partitions(data)['dates']
+    date = dates[-1] if value == 'latest' else _parse_date(value, 'date')
+    snapshot = get_date_snapshot(data, date)
+    if snapshot.empty:
+        raise ApiError(404, f"No data for {date:%Y-%m-%d}")
+    return snapshot
+
+def _encode(frame, media_type, single):
+    """Serialize ``frame`` as JSON records (one object if ``single``) or an Arrow IPC stream."""
+    if media_type == ARROW_TYPE:
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue()
+    frame = frame.copy()
+    for column in frame.columns:
+        if pd.api.types.is_datetime64_any_dtype(frame[column]):
+            frame[column] = frame[column].dt.strftime('%Y-%m-%d')
+    body = frame.to_json(orient='records', double_precision=6)
+    return body[1:-1].encode() if single else body.encode()
+
+def _media_type(request):
+    requested = request.query_params.get('format')
+    if requested == 'arrow' or (requested is None and ARROW_TYPE in request.headers.get('accept', '')):
+        return ARROW_TYPE
+    if requested not in (None, 'json'):
+        raise ApiError(400, f"Unknown format: {requested!r} (use json or arrow)")
+    return JSON_TYPE
+
+def _error(status, message):
+    return JSONResponse({'error': message}, status_code=status)
+
+def _dataset_endpoint(build, single=False):
+    """
+    Wrap ``build(data, request) -> DataFrame`` as an endpoint.
+
+    The ETag covers the dataset version, the URL and the format, so it is
+    checked (and a cached body looked up) before anything is computed.
+    Cached bodies are keyed on the version and the full URL and format,
+    not the ETag, whose short URL checksum can collide.
+    """
+    async def endpoint(request):
+        refresher = request.app.state.refresher
+        try:
+            data = refresher.current()
+            if data is None:
+                data = await run_in_threadpool(refresher.get)
+            media_type = _media_type(request)
+        except DataUnavailableError as e:
+            return _error(503, f"Data unavailable: {e}")
+        except ApiError as e:
+            return _error(e.status, str(e))
+
+        url = f"{request.url.path}?{request.url.query}|{media_type}"
+        etag = f'W/"{dataset_version(data)}-{zlib.crc32(url.encode()):08x}"'
+        max_age = int(min(max(refresher.stats()['next_refresh_in'], 0), MAX_AGE))
+        headers = {
+            'ETag': etag,
+            'Cache-Control': f"public, max-age={max_age}",
+            'Vary': 'Accept, Accept-Encoding',
+            'X-Dataset-Version': str(dataset_version(data))
+        }
+        if etag in request.headers.get('if-none-match', ''):
+            count('api_not_modified')
+            return Response(status_code=304, headers=headers)
+
+        key = (dataset_version(data), url)
+        entry = RESPONSE_CACHE.get(key)
+        if entry is None:
+            def render():
+                with span('api_render'):
+                    body = _encode(build(data, request), media_type, single)
+                compressed = gzip.compress(body, compresslevel=6, mtime=0) if len(body) >= GZIP_MIN_BYTES else None
+                return body, compressed, media_type
+            try:
+                entry = await run_in_threadpool(render)
+            except ApiError as e:
+                return _error(e.status, str(e))
+            RESPONSE_CACHE.put(key, entry)
+
+        body, compressed, media_type = entry
+        if compressed is not None and 'gzip' in request.headers.get('accept-encoding', ''):
+            body = compressed
+            headers['Content-Encoding'] = 'gzip'
+        return Response(body, media_type=media_type, headers=headers)
+    return endpoint
+
+async def export(request):
+    """
+    The all-countries export of ``table_export``, streamed from its file
+    in chunks, so the body is never held in memory.
+    """
+    formats = {extension: (label, mime) for label, (extension, mime) in EXPORT_FORMATS.items()}
+    extension = request.path_params['format']
+    if extension not in formats:
+        return _error(404, f"Unknown export format: {extension!r} (use {' or '.join(formats)})")
+    label, mime = formats[extension]
+    refresher = request.app.state.refresher
+    try:
+        data = refresher.current()
+        if data is None:
+            data = await run_in_threadpool(refresher.get)
+    except DataUnavailableError as e:
+        return _error(503, f"Data unavailable: {e}")
+
+    etag = f'"{dataset_version(data)}-{extension}"'
+    if etag in request.headers.get('if-none-match', ''):
+        count('api_not_modified')
+        return Response(status_code=304, headers={'ETag': etag})
+    path = await run_in_threadpool(export_all_path, data, label)
+    return FileResponse(path, media_type=mime, filename=f"covid_data.{extension}", headers={'ETag': etag})
+
+async def health(request):
+    stats = request.app.state.refresher.stats()
+    status = 200 if stats['version'] is not None else 503
+    return Response(json.dumps(stats), status_code=status, media_type=JSON_TYPE,
+                    headers={'Cache-Control': 'no-store'})
+
+async def metrics(request):
+    if request.query_params.get('format') == 'json':
+        return JSONResponse(snapshot(), headers={'Cache-Control': 'no-store'})
+    return Response(prometheus_text(), media_type='text/plain; version=0.0.4',
+                    headers={'Cache-Control': 'no-store'})
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    app.state.refresher = create_refresher().start()
+    try:
+        await run_in_threadpool(app.state.refresher.get)
+    except DataUnavailableError:
+        pass  # Served as 503 until a background refresh succeeds
+    yield
+    app.state.refresher.stop()
+
+app = Starlette(
+    routes=[
+        Route('/api/countries', _dataset_endpoint(countries_frame)),
+        Route('/api/countries/{country}/series', _dataset_endpoint(series_frame)),
+        Route('/api/countries/{country}/latest', _dataset_endpoint(latest_frame, single=True)),
+        Route('/api/snapshots/{date}', _dataset_endpoint(snapshot_frame)),
+        Route('/api/export/{format}', export),
+        Route('/api/health', health),
+        Route('/metrics', metrics)
+    ],
+    lifespan=lifespan
+)
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description='Serve the COVID-19 dataset over HTTP.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port, log_level='warning')
+
+if __name__ == '__main__':
+    main()
@@ -1,32 +1,70 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-from data_fetcher import load_covid_data, get_latest_metrics, filter_by_country
+from data_fetcher import (
+    DataUnavailableError, filter_by_country
+)
 from visualizations import (
     plot_daily_metrics,
     plot_country_comparison,
     plot_global_map,
-    plot_metrics_cards
+    plot_global_map_timeline,
+    plot_metrics_cards,
+    plot_case_fatality_rate,
+    plot_rollup_trend,
+    plot_continent_breakdown,
+    plot_metric_trend
 )
+from metrics import METRICS, latest_metrics, metric_label
+from rollups import GLOBAL_GROUP, rollup_groups, rollup_latest
+from figure_cache import FIGURE_CACHE
+from dataset_refresher import get_refresher, load_current_dataset
+from explorer_app import render_explorer
+from page_state import get_dimensions, session_cached
+from table_export import EXPORT_FORMATS, SORT_ORDERS, export_all_countries, export_country, table_page
+from instrumentation import finish_rerun, is_enabled, rerun_breakdown, set_enabled, span, start_rerun
 
 st.set_page_config(page_title="COVID-19 Data Tracker", layout="wide")
+start_rerun()
 
 st.title("🦠 COVID-19 Data Tracker")
 st.markdown("Interactive visualization of global and regional pandemic trends")
 
 # Refresh data button in sidebar
 if st.sidebar.button("🔄 Refresh Data"):
-    st.cache_data.clear()
-    st.rerun()
+    # Patch the snapshot with what changed upstream and swap it in now
+    # instead of waiting for the background refresh
+    try:
+        st.session_state['last_refresh'] = get_refresher().refresh(force=True)
+    except DataUnavailableError as e:
+        st.sidebar.error(f"Refresh failed, still showing the previous data: {e}")
+    else:
+        st.rerun()
 
-# Load data
-@st.cache_data
-def get_data():
-    return load_covid_data()
+if 'last_refresh' in st.session_state:
+    refresh = st.session_state['last_refresh']
+    if refresh['mode'] == 'unchanged':
+        st.sidebar.caption(f"Data already up to date (checked in {refresh['seconds']:.1f}s)")
+    else:
+        st.sidebar.caption(
+            f"Refreshed ({refresh['mode']}): {refresh['rows']:,} rows updated, "
+            f"{refresh['removed']:,} removed across {refresh['countries']} countries in {refresh['seconds']:.1f}s"
+        )
 
-data = get_data()
-last_update = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-st.sidebar.caption(f"Last updated: {last_update}")
+# Load data (kept fresh in the background; one memory-mapped copy per host in shared mode)
+data = load_current_dataset()
+# Country list and date axis of the widgets, derived once per data version
+dimensions = get_dimensions(data)
+freshness = get_refresher().stats()
+if freshness['refreshed_at'] is not None:
+    last_update = datetime.fromtimestamp(freshness['refreshed_at']).strftime("%Y-%m-%d %H:%M:%S")
+    st.sidebar.caption(f"Last updated: {last_update}")
+# Anything the last refresh could not load as it should, e.g. a source served from its older copy
+problems = [(level, message) for level, message in freshness['notices'] if level != 'success']
+for level, message in problems:
+    getattr(st.sidebar, level)(message)
+if freshness['consecutive_failures'] and not problems:
+    st.sidebar.warning(f"⚠️ Data sources unreachable, showing older data ({freshness['last_error']})")
 
 # Sidebar navigation
 st.sidebar.title("Navigation")
@@ -34,7 +72,10 @@ page = st.sidebar.radio("Select View", [
     "Country Dashboard",
     "Daily Metrics",
     "Country Comparison",
+    "Continent View",
+    "Global View",
     "Global Map",
+    "Metric Explorer",
     "About"
 ])
 
@@ -42,11 +83,12 @@ if page == "Country Dashboard":
     st.header("🌐 Country Dashboard")
     
     # Country selector
-    selected_country = st.selectbox("Select Country", sorted(data['country'].unique()))
+    selected_country = st.selectbox("Select Country", dimensions['countries'])
     
-    # Get country data
-    country_data = filter_by_country(data, selected_country)
-    latest = get_latest_metrics(data, selected_country)
+    # Get country data (kept across reruns until the country changes)
+    country_data, latest = session_cached(data, 'dashboard', selected_country, lambda: (
+        filter_by_country(data, selected_country), latest_metrics(data, selected_country)
+    ))
     
     if latest is not None:
         # Display metric cards
@@ -68,42 +110,53 @@ if page == "Country Dashboard":
             st.subheader(f"Data Table - {selected_country}")
             
             # Filter options
-            col1, col2 = st.columns(2)
+            col1, col2, col3 = st.columns(3)
             with col1:
-                rows_display = st.slider("Rows to Display", 10, len(country_data), 20)
+                page_size = st.selectbox("Rows per Page", [20, 50, 100, 500])
             with col2:
-                sort_by = st.selectbox("Sort By", ["Date (Newest)", "Date (Oldest)", "Cases (High to Low)"])
-            
-            # Apply sorting
-            if sort_by == "Date (Newest)":
-                display_data = country_data.tail(rows_display).sort_values('date', ascending=False)
-            elif sort_by == "Date (Oldest)":
-                display_data = country_data.head(rows_display).sort_values('date', ascending=True)
-            else:
-                display_data = country_data.nlargest(rows_display, 'cumulative_cases')
-            
-            # Format and display table
-            table_display = display_data[['date', 'daily_cases', 'daily_deaths', 'cumulative_cases', 'cumulative_deaths', 'cfr']].copy()
-            table_display['date'] = table_display['date'].dt.strftime('%Y-%m-%d')
-            table_display.columns = ['Date', 'Daily Cases', 'Daily Deaths', 'Cumulative Cases', 'Cumulative Deaths', 'CFR (%)']
-            table_display = table_display.fillna(0).astype({"Daily Cases": "int", "Daily Deaths": "int", "Cumulative Cases": "int", "Cumulative Deaths": "int"})
+                sort_by = st.selectbox("Sort By", SORT_ORDERS)
+            with col3:
+                extra_metrics = st.multiselect("Extra Metrics", [m for m in METRICS if m != 'cfr'],
+                                               format_func=metric_label)
             
-            st.dataframe(table_display, use_container_width=True, hide_index=True)
+            # Only the visible page is copied and formatted
+            pages = max(1, -(-len(country_data) // page_size))
+            page_number = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1)
+            table_display, total_rows = table_page(data, selected_country, sort_by, page_number - 1, page_size, extra_metrics)
+            with span('table_send'):
+                st.dataframe(table_display, use_container_width=True, hide_index=True)
+            first_row = (page_number - 1) * page_size
+            st.caption(f"Rows {first_row + 1:,}-{first_row + len(table_display):,} of {total_rows:,} (page {page_number} of {pages})")
             
-            # Download button
-            csv = table_display.to_csv(index=False)
-            st.download_button(
-                label="📥 Download as CSV",
-                data=csv,
-                file_name=f"{selected_country}_covid_data.csv",
-                mime="text/csv"
-            )
+            # Download buttons; the files are built on click and cached per data version
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                export_format = st.selectbox("Export Format", list(EXPORT_FORMATS))
+            extension, mime = EXPORT_FORMATS[export_format]
+            with col2:
+                st.download_button(
+                    label="📥 Download Country",
+                    data=lambda: export_country(data, selected_country, sort_by, extra_metrics, export_format),
+                    file_name=f"{selected_country}_covid_data.{extension}",
+                    mime=mime
+                )
+            with col3:
+                st.download_button(
+                    label="📥 Download All Countries",
+                    data=lambda: export_all_countries(data, export_format),
+                    file_name=f"covid_data.{extension}",
+                    mime=mime
+                )
         
         with tab3:
             st.subheader(f"Chart Analysis - {selected_country}")
             
+            derived_charts = {metric_label(name): name for name in [
+                'daily_cases_7d', 'daily_cases_14d', 'daily_deaths_7d', 'daily_cases_7d_per_100k',
+                'cases_growth_wow', 'deaths_growth_wow', 'cases_doubling_days', 'deaths_doubling_days'
+            ]}
             chart_type = st.selectbox("Select Chart Type", 
-                ["Daily Cases Trend", "Cumulative Cases", "Daily Deaths Trend", "Case Fatality Rate"])
+                ["Daily Cases Trend", "Cumulative Cases", "Daily Deaths Trend", "Case Fatality Rate", *derived_charts])
             
             if chart_type == "Daily Cases Trend":
                 plot_daily_metrics(country_data, selected_country, "Cases", key_suffix="tab3_cases")
@@ -111,14 +164,10 @@ if page == "Country Dashboard":
                 plot_daily_metrics(country_data, selected_country, "Recoveries", key_suffix="tab3_cumulative")
             elif chart_type == "Daily Deaths Trend":
                 plot_daily_metrics(country_data, selected_country, "Deaths", key_suffix="tab3_deaths")
+            elif chart_type in derived_charts:
+                plot_metric_trend(data, selected_country, derived_charts[chart_type], key="metric_chart_tab3")
             else:
-                # CFR chart
-                import plotly.express as px
-                fig = px.line(country_data, x='date', y='cfr', 
-                             title=f"Case Fatality Rate - {selected_country}",
-                             markers=True, labels={'cfr': 'CFR (%)', 'date': 'Date'})
-                fig.update_layout(height=500, template='plotly_white', hovermode='x unified')
-                st.plotly_chart(fig, use_container_width=True, key="cfr_chart_tab3")
+                plot_case_fatality_rate(country_data, selected_country, key="cfr_chart_tab3")
 
 elif page == "Daily Metrics":
     st.header("📊 Daily Metrics")
@@ -126,37 +175,90 @@ elif page == "Daily Metrics":
     
     col1, col2 = st.columns(2)
     with col1:
-        selected_country = st.selectbox("Select Country", data['country'].unique(), key="daily_country")
+        selected_country = st.selectbox("Select Country", dimensions['countries'], key="daily_country")
     with col2:
         metric_type = st.selectbox("Select Metric", ["Cases", "Deaths", "Recoveries"], key="daily_metric")
     
-    country_data = filter_by_country(data, selected_country)
-    plot_daily_metrics(country_data, selected_country, metric_type, key_suffix="daily_page")
+    country_data = session_cached(data, 'daily', selected_country, lambda: filter_by_country(data, selected_country))
+    if not country_data.empty:
+        first_date, last_date = dimensions['country_dates'][selected_country]
+        date_range = st.slider("Date Range", min_value=first_date, max_value=last_date,
+                               value=(first_date, last_date), key="daily_range")
+        plot_daily_metrics(country_data, selected_country, metric_type, key_suffix="daily_page",
+                           date_range=pd.to_datetime(date_range))
+    else:
+        plot_daily_metrics(country_data, selected_country, metric_type, key_suffix="daily_page")
 
 elif page == "Country Comparison":
     st.header("🌍 Country-wise Comparisons")
     st.markdown("Compare trends across multiple countries")
     
-    countries = st.multiselect("Select Countries", sorted(data['country'].unique()), 
-                               default=["United States", "India", "Brazil"])
+    countries = st.multiselect("Select Countries", dimensions['countries'], 
+                               default=dimensions['default_countries'])
     normalize = st.checkbox("Normalize by Population")
+    date_axis = dimensions['dates']
+    date_range = st.slider("Date Range", min_value=date_axis[0].date(), max_value=date_axis[-1].date(),
+                           value=(date_axis[0].date(), date_axis[-1].date()), key="comparison_range")
     
     if countries:
-        plot_country_comparison(data, countries, normalize)
+        plot_country_comparison(data, countries, normalize, date_range=pd.to_datetime(date_range))
+
+elif page == "Continent View":
+    st.header("🌎 Continent View")
+    st.markdown("Daily trends summed over the countries of each continent")
+    
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        continent = st.selectbox("Select Continent", [g for g in rollup_groups(data) if g != GLOBAL_GROUP])
+    with col2:
+        metric_type = st.selectbox("Select Metric", ["Cases", "Deaths"], key="continent_metric")
+    with col3:
+        per_100k = st.checkbox("Per 100K Population", key="continent_per_100k")
+    
+    plot_metrics_cards(rollup_latest(data, continent), continent)
+    plot_rollup_trend(data, continent, metric_type, per_100k, key="continent_trend")
+
+elif page == "Global View":
+    st.header("🌐 Global View")
+    st.markdown("Worldwide daily trends and how continents compare")
+    
+    col1, col2 = st.columns([1, 1])
+    with col1:
+        metric_type = st.selectbox("Select Metric", ["Cases", "Deaths"], key="global_metric")
+    with col2:
+        per_100k = st.checkbox("Per 100K Population", key="global_per_100k")
+    
+    plot_metrics_cards(rollup_latest(data, GLOBAL_GROUP), GLOBAL_GROUP)
+    plot_rollup_trend(data, GLOBAL_GROUP, metric_type, per_100k, key="global_trend")
+    plot_continent_breakdown(data, metric_type, per_100k)
 
 elif page == "Global Map":
     st.header("🗺️ Global Maps")
     st.markdown("Choropleth maps showing case density and mortality rates")
     
-    col1, col2 = st.columns(2)
+    col1, col2, col3 = st.columns([1, 1, 2])
     with col1:
         map_type = st.selectbox("Select Map Type", ["Cases", "Deaths", "Case Fatality Rate"])
     with col2:
-        date_slider = st.select_slider("Select Date", 
-                                       options=sorted(data['date'].unique()), 
-                                       value=data['date'].max())
+        map_mode = st.radio("Mode", ["Single Date", "Timeline"], horizontal=True)
+    with col3:
+        if map_mode == "Timeline":
+            granularity = st.radio("Frame Interval", ["Weekly", "Daily"], horizontal=True)
+        else:
+            date_axis = dimensions['date_options']
+            date_slider = st.select_slider("Select Date", 
+                                           options=date_axis, 
+                                           value=date_axis[-1])
     
-    plot_global_map(data, map_type, pd.to_datetime(date_slider))
+    if map_mode == "Timeline":
+        plot_global_map_timeline(data, map_type, granularity)
+    else:
+        plot_global_map(data, map_type, pd.to_datetime(date_slider))
+
+elif page == "Metric Explorer":
+    st.header("🔎 Metric Explorer")
+    st.markdown("Compare new or total cases, deaths and tests across countries")
+    render_explorer(data)
 
 elif page == "About":
     st.header("ℹ️ About This Project")
@@ -168,8 +270,10 @@ elif page == "About":
     - **Country Dashboard**: Real-time metrics with tabbed interface (Graphics, Table, Charts)
     - **Daily Metrics**: Visualize cases, deaths, and recoveries by country
     - **Country Comparisons**: Compare trends with population normalization
+    - **Continent & Global Views**: Aggregated daily trends with 7-day averages and per-100K rates
     - **Interactive Charts**: Line graphs, bar charts, with zoom and hover tooltips
     - **Global Maps**: Choropleth maps showing statistics over time
+    - **Metric Explorer**: Any count, including tests, compared over time, on the latest day and on a map
     - **Live Updates**: Refresh button to get latest data
     
     ### 📊 Data Sources
@@ -182,3 +286,65 @@ elif page == "About":
     ### 👨‍💻 Developer
     Built with Streamlit, Plotly, and Pandas for interactive COVID-19 data visualization.
     """)
+
+# Worldwide headline numbers, read from the prebuilt rollups
+global_latest = rollup_latest(data, GLOBAL_GROUP)
+if global_latest is not None:
+    with st.sidebar.expander("🌍 Quick Stats", expanded=True):
+        st.caption(f"As of {global_latest['date']:%Y-%m-%d}")
+        st.metric("Global cases (7-day avg)", f"{global_latest['daily_cases_7d']:,.0f}")
+        st.metric("Global deaths (7-day avg)", f"{global_latest['daily_deaths_7d']:,.0f}")
+        st.metric("Total cases", f"{global_latest['cumulative_cases']:,.0f}")
+
+# Cache counters and dataset size (rendered last so they include this rerun)
+with st.sidebar.expander("🧮 Cache & Memory"):
+    cache_stats = FIGURE_CACHE.stats()
+    st.caption(
+        f"Hits: {cache_stats['hits']:,} · Misses: {cache_stats['misses']:,} · "
+        f"Hit rate: {cache_stats['hit_rate']:.0%}"
+    )
+    st.caption(
+        f"Entries: {cache_stats['entries']}/{cache_stats['max_entries']} · "
+        f"Evictions: {cache_stats['evictions']:,}"
+    )
+    footprint = data.attrs.get('memory_footprint')
+    if footprint:
+        st.caption(
+            f"Dataset: {footprint['compact'] / 2**20:.1f} MB in memory "
+            f"({footprint['parsed'] / 2**20:.1f} MB as parsed)"
+        )
+
+# Background refresh health
+with st.sidebar.expander("🔁 Data Freshness"):
+    # A snapshot served during an outage may have no age or refresh time
+    age, duration = freshness['age_seconds'], freshness['last_refresh_seconds']
+    st.caption(
+        f"Age: {'n/a' if age is None else f'{age / 60:.0f}'} min · "
+        f"Next refresh in {freshness['next_refresh_in'] / 60:.0f} min"
+    )
+    st.caption(
+        f"Last refresh: {'n/a' if duration is None else f'{duration:.1f}'}s "
+        f"({freshness['last_refresh_mode'] or 'n/a'}) · "
+        f"Refreshes: {freshness['refreshes']:,} · Failures: {freshness['failures']:,}"
+    )
+    for level, message in freshness['notices']:
+        if level == 'success':
+            st.caption(message)
+    if freshness['consecutive_failures']:
+        st.caption(f"Last error: {freshness['last_error']}")
+
+# Per-rerun timing by stage (rendered last so it covers the whole rerun);
+# the switch applies to every session in the process
+with st.sidebar.expander("⏱️ Debug Timing"):
+    st.toggle("Instrument hot paths", value=is_enabled(), key="instrumentation",
+              on_change=lambda: set_enabled(st.session_state["instrumentation"]))
+    breakdown = rerun_breakdown()
+    if breakdown is None:
+        st.caption("Off: turn on to time loading, filtering, aggregates, figure building and chart sending.")
+    else:
+        st.caption(f"This rerun: {breakdown['total_ms']:.0f} ms (nested stages also count in their parents)")
+        for stage, timing in breakdown['spans'].items():
+            st.caption(f"{stage}: {timing['ms']:.1f} ms · {timing['calls']}×")
+        if breakdown['counters']:
+            st.caption(" · ".join(f"{name}: {value:,}" for name, value in sorted(breakdown['counters'].items())))
+finish_rerun(page=page)
@@ -0,0 +1,137 @@
+"""
+Load test for the read-only HTTP API (``api.py``).
+
+Serves a CSV through ``local_server``, starts the API on a local port in
+this process and drives it with ``--clients`` keep-alive connections for
+``--seconds`` per scenario, reporting requests per second and latency
+percentiles. ``*_uncached`` scenarios vary the query string so every
+request misses the response cache; ``series_etag`` revalidates with
+``If-None-Match`` and gets 304s. Client and server share the machine, so
+absolute numbers are a floor.
+
+    python benchmarks/bench_api.py --scale 1 --seconds 5 --clients 8
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import quote
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+def _scenarios(country, dates):
+    path = f"/api/countries/{quote(country)}"
+    starts = itertools.cycle(f"{date:%Y-%m-%d}" for date in dates)
+    return [
+        ('series_json', lambda: (f"{path}/series", {})),
+        ('series_json_gzip', lambda: (f"{path}/series", {'Accept-Encoding': 'gzip'})),
+        ('series_arrow', lambda: (f"{path}/series?format=arrow", {})),
+        ('series_etag', None),  # Filled in once the ETag is known
+        ('series_metrics_uncached', lambda: (f"{path}/series?metrics=daily_cases_7d&start={next(starts)}", {})),
+        ('latest', lambda: (f"{path}/latest", {})),
+        ('snapshot_latest', lambda: ("/api/snapshots/latest", {'Accept-Encoding': 'gzip'})),
+        ('snapshot_uncached', lambda: (f"/api/snapshots/{next(starts)}", {'Accept-Encoding': 'gzip'})),
+    ]
+
+def _drive(port, request, clients, seconds):
+    latencies, statuses, lock = [], {}, threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client():
+        connection = http.client.HTTPConnection('127.0.0.1', port)
+        mine, codes = [], {}
+        while time.perf_counter() < deadline:
+            path, headers = request()
+            start = time.perf_counter()
+            connection.request('GET', path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            mine.append(time.perf_counter() - start)
+            codes[response.status] = codes.get(response.status, 0) + 1
+        connection.close()
+        with lock:
+            latencies.extend(mine)
+            for code, count in codes.items():
+                statuses[code] = statuses.get(code, 0) + count
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / elapsed, 1),
+        'ms_p50': round(_percentile(latencies, 0.5) * 1000, 3),
+        'ms_p99': round(_percentile(latencies, 0.99) * 1000, 3),
+        'statuses': {str(code): count for code, count in sorted(statuses.items())}
+    }
+
+def run(csv_path, clients, seconds, tmp):
+    os.environ['COVID_TRACKER_CACHE_DIR'] = os.path.join(tmp, 'cache')
+    import uvicorn
+    import data_fetcher
+    from local_server import serve_csv
+
+    server, url = serve_csv(csv_path)
+    data_fetcher.OWID_URLS[:] = [url]
+    import api
+
+    config = uvicorn.Config(api.app, host='127.0.0.1', port=0, log_level='error')
+    api_server = uvicorn.Server(config)
+    thread = threading.Thread(target=api_server.run, daemon=True)
+    thread.start()
+    try:
+        while not api_server.started:
+            time.sleep(0.05)
+        port = api_server.servers[0].sockets[0].getsockname()[1]
+        data = api.app.state.refresher.get()
+        countries = [str(c) for c in data['country'].cat.categories]
+        country = 'United States' if 'United States' in countries else countries[0]
+        dates = data_fetcher.get_date_partitions(data)['dates']
+
+        connection = http.client.HTTPConnection('127.0.0.1', port)
+        connection.request('GET', f"/api/countries/{quote(country)}/series")
+        etag = connection.getresponse().getheader('ETag')
+        connection.close()
+
+        results = {'rows': len(data), 'clients': clients}
+        for name, request in _scenarios(country, dates):
+            if request is None:
+                request = (lambda: (f"/api/countries/{quote(country)}/series", {'If-None-Match': etag}))
+            results[name] = _drive(port, request, clients, seconds)
+    finally:
+        api_server.should_exit = True
+        thread.join()
+        server.shutdown()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the read-only HTTP API.')
+    parser.add_argument('--csv', help='saved copy of owid-covid-data.csv (synthetic if omitted)')
+    parser.add_argument('--scale', type=float, default=1.0, help='synthetic data scale')
+    parser.add_argument('--clients', type=int, default=8, help='concurrent keep-alive connections')
+    parser.add_argument('--seconds', type=float, default=5, help='duration of each scenario')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = args.csv
+        if csv_path is None:
+            from synthetic import write_owid_csv
+
+            csv_path = write_owid_csv(os.path.join(tmp, 'owid-covid-data.csv'), args.scale)
+        print(json.dumps(run(csv_path, args.clients, args.seconds, tmp), indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Page latency around a dataset refresh: blocking reload vs background refresher.
+
+``blocking`` is the previous behaviour: once the one-hour ``ttl`` of the
+``st.cache_data`` loader expired, the next page render downloaded, parsed
+and cleaned the whole file itself. ``background`` runs the same full reload
+in a ``dataset_refresher.DatasetRefresher`` thread on a short interval
+while a reader keeps asking for the dataset, as page renders do; it
+reports the reader's latency percentiles and how many versions were
+swapped in meanwhile.
+
+    python benchmarks/bench_background_refresh.py --scale 0.5 --delay 1 --seconds 20
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+def run(csv_path, delay, seconds, interval, tmp):
+    os.environ['COVID_TRACKER_CACHE_DIR'] = os.path.join(tmp, 'cache')
+    import data_fetcher
+    from dataset_refresher import DatasetRefresher
+    from local_server import serve_csv
+
+    server, url = serve_csv(csv_path, delay=delay)
+    data_fetcher.OWID_URLS[:] = [url]
+
+    def full_reload(force=False, current=None):
+        # Drop the snapshot so every build pays for the whole ingest
+        for path in [data_fetcher.SNAPSHOT_DATA, data_fetcher.SNAPSHOT_META, data_fetcher.SNAPSHOT_LINES]:
+            if os.path.exists(path):
+                os.remove(path)
+        data, _ = data_fetcher.fetch_covid_data()
+        return data, {'mode': 'full'}
+
+    try:
+        blocking = []
+        for _ in range(3):
+            start = time.perf_counter()
+            full_reload()
+            blocking.append(time.perf_counter() - start)
+
+        refresher = DatasetRefresher(full_reload, interval=interval)
+        refresher.get()
+        refresher.start()
+        latencies = []
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            refresher.get()
+            latencies.append(time.perf_counter() - start)
+            time.sleep(0.01)
+        refresher.stop()
+        stats = refresher.stats()
+    finally:
+        server.shutdown()
+
+    return {
+        'blocking': {'page_seconds_after_expiry': round(min(blocking), 3)},
+        'background': {
+            'page_ms_p50': round(_percentile(latencies, 0.5) * 1000, 4),
+            'page_ms_p99': round(_percentile(latencies, 0.99) * 1000, 4),
+            'page_ms_max': round(max(latencies) * 1000, 4),
+            'pages': len(latencies),
+            'refreshes': stats['refreshes'],
+            'last_refresh_seconds': round(stats['last_refresh_seconds'], 3)
+        }
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark page latency during background refreshes.')
+    parser.add_argument('--csv', help='saved copy of owid-covid-data.csv (synthetic if omitted)')
+    parser.add_argument('--scale', type=float, default=0.5, help='synthetic data scale')
+    parser.add_argument('--delay', type=float, default=1.0, help='simulated upstream response delay (s)')
+    parser.add_argument('--seconds', type=float, default=20, help='how long the reader runs')
+    parser.add_argument('--interval', type=float, default=2, help='background refresh interval (s)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.csv:
+            csv_path = args.csv
+        else:
+            from synthetic import write_owid_csv
+
+            csv_path = write_owid_csv(os.path.join(tmp, 'owid-covid-data.csv'), args.scale)
+        print(json.dumps(run(csv_path, args.delay, args.seconds, args.interval, tmp), indent=2))
+
+if __name__ == '__main__':
+    main()
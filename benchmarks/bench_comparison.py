@@ -0,0 +1,76 @@
+"""
+Country Comparison figure construction at 3, 30 and 200 countries.
+
+``loop`` is the original per-country path (scan + copy per country, then
+per-country normalization); ``batched`` is the figure builder behind
+``plot_country_comparison`` (``select_countries`` plus one vectorized
+per-100k pass), called directly so the figure cache is bypassed.
+
+    python benchmarks/bench_comparison.py --csv owid-covid-data.csv
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import plotly.graph_objects as go  # noqa: E402
+
+import figures  # noqa: E402
+from bench_country_lookup import _mask_filter, load  # noqa: E402
+
+def _loop_comparison(data, countries, normalize):
+    fig = go.Figure()
+    for country in countries:
+        country_data = _mask_filter(data, country)
+        if country_data.empty:
+            continue
+        if normalize:
+            country_data = country_data[country_data['population'] > 0].copy()
+            if country_data.empty:
+                continue
+            y_val = (country_data['cumulative_cases'] / country_data['population'] * 100000).fillna(0)
+        else:
+            y_val = country_data['cumulative_cases'].fillna(0)
+        fig.add_trace(go.Scatter(x=country_data['date'], y=y_val, name=country, mode='lines+markers'))
+    return fig
+
+def _batched_comparison(data, countries, normalize):
+    # The figure builder itself, so repeats are not served by the figure cache
+    figure, _ = figures.country_comparison_figure(data, countries, normalize)
+    return figure
+
+def run(data, sizes=(3, 30, 200), normalize=True, number=3):
+    countries = [str(c) for c in data['country'].cat.categories]
+    results = {'rows': len(data), 'normalize': normalize, 'runs': []}
+    for size in sizes:
+        selection = countries[:size]
+        entry = {'countries': len(selection)}
+        for label, fn in [('loop', _loop_comparison), ('batched', _batched_comparison)]:
+            seconds = min(timeit.repeat(lambda: fn(data, selection, normalize), number=number, repeat=3)) / number
+            entry[f'{label}_ms'] = round(seconds * 1000, 1)
+        entry['speedup'] = round(entry['loop_ms'] / entry['batched_ms'], 1)
+        results['runs'].append(entry)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Country Comparison chart.')
+    parser.add_argument('--csv', help='saved copy of owid-covid-data.csv (synthetic if omitted)')
+    parser.add_argument('--scale', type=float, default=1.0, help='synthetic data scale')
+    parser.add_argument('--no-normalize', action='store_true')
+    args = parser.parse_args()
+
+    if args.csv:
+        data = load(args.csv)
+    else:
+        from synthetic import write_owid_csv
+
+        with tempfile.TemporaryDirectory() as tmp:
+            data = load(write_owid_csv(os.path.join(tmp, 'owid-covid-data.csv'), args.scale))
+    print(json.dumps(run(data, normalize=not args.no_normalize), indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Per-render latency of country lookups, before and after the country index.
+
+One Country Dashboard render filters the selected country in ``app.py``,
+again in ``get_latest_metrics`` and again inside ``plot_daily_metrics``;
+the comparison page filters once per selected country. ``mask`` runs
+those lookups the original way (boolean scan + sort + copy), ``index``
+through the country index attached when the dataset is loaded.
+
+    python benchmarks/bench_country_lookup.py --csv owid-covid-data.csv
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import data_fetcher  # noqa: E402
+from data_fetcher import filter_by_country, get_latest_metrics  # noqa: E402
+
+def _mask_filter(data, country):
+    filtered = data[data['country'] == country].sort_values('date').copy()
+    numeric_columns = filtered.select_dtypes('number').columns
+    filtered[numeric_columns] = filtered[numeric_columns].fillna(0)
+    return filtered[filtered['cumulative_cases'] >= 0]
+
+def _mask_latest(data, country):
+    country_data = _mask_filter(data, country)
+    return None if country_data.empty else country_data.iloc[-1]
+
+def _render(data, country, comparison, filter_fn, latest_fn):
+    country_data = filter_fn(data, country)      # app.py
+    latest_fn(data, country)                     # get_latest_metrics
+    filter_fn(country_data, country)             # plot_daily_metrics
+    for other in comparison:                     # plot_country_comparison
+        filter_fn(data, other)
+
+def load(csv_path):
+    with open(csv_path, 'rb') as f:
+        df = data_fetcher._read_owid_csv(f)
+    return data_fetcher.prepare_dataset(data_fetcher.clean_covid_data(df))
+
+def run(data, number=20):
+    countries = list(data['country'].cat.categories)
+    country = 'United States' if 'United States' in countries else countries[0]
+    comparison = [c for c in ['United States', 'India', 'Brazil'] if c in countries] or countries[:3]
+
+    results = {'rows': len(data), 'countries': len(countries)}
+    for label, filter_fn, latest_fn in [
+        ('mask', _mask_filter, _mask_latest),
+        ('index', filter_by_country, get_latest_metrics),
+    ]:
+        seconds = min(timeit.repeat(
+            lambda: _render(data, country, comparison, filter_fn, latest_fn),
+            number=number, repeat=3
+        )) / number
+        results[f'{label}_ms_per_render'] = round(seconds * 1000, 3)
+    results['speedup'] = round(results['mask_ms_per_render'] / results['index_ms_per_render'], 1)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark country lookups per dashboard render.')
+    parser.add_argument('--csv', help='saved copy of owid-covid-data.csv (synthetic if omitted)')
+    parser.add_argument('--scale', type=float, default=1.0, help='synthetic data scale')
+    args = parser.parse_args()
+
+    if args.csv:
+        data = load(args.csv)
+    else:
+        from synthetic import write_owid_csv
+
+        with tempfile.TemporaryDirectory() as tmp:
+            data = load(write_owid_csv(os.path.join(tmp, 'owid-covid-data.csv'), args.scale))
+    print(json.dumps(run(data), indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Date-range queries: boolean masks vs binary search in the country blocks.
+
+``mask`` filters the way the alternate entry point does (two comparisons
+over every row, then the country filter on the result); ``search`` uses
+``filter_by_date_range``, ``select_countries(..., date_range=...)`` and
+``filter_by_country(..., date_range=...)``, which search the sorted
+(country, date) keys. ``build_keys_ms`` is the one-off cost of the keys
+per data version. Defaults to 10x the real file.
+
+    python benchmarks/bench_date_range.py --scale 10
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import data_fetcher  # noqa: E402
+from bench_country_lookup import load  # noqa: E402
+from data_fetcher import filter_by_country, filter_by_date_range, select_countries  # noqa: E402
+
+def _mask_range(data, start, end):
+    return data[(data['date'] >= start) & (data['date'] <= end)]
+
+def _queries(data, countries, start, end):
+    country = countries[0]
+    return {
+        'global_range': (
+            lambda: _mask_range(data, start, end),
+            lambda: filter_by_date_range(data, start, end)),
+        'countries_over_range': (
+            lambda: (lambda rows: rows[rows['country'].isin(countries)])(_mask_range(data, start, end)),
+            lambda: select_countries(data, countries, (start, end))),
+        'country_over_range': (
+            lambda: (lambda rows: rows[rows['country'] == country])(_mask_range(data, start, end)),
+            lambda: filter_by_country(data, country, (start, end))),
+    }
+
+def run(data, number=10):
+    names = [str(c) for c in data['country'].cat.categories]
+    countries = [c for c in ['United States', 'India', 'Brazil'] if c in names] or names[:3]
+    dates = data_fetcher.get_date_partitions(data)['dates']
+    start, end = dates[len(dates) // 4], dates[len(dates) // 2]
+
+    results = {'rows': len(data), 'countries': len(names)}
+    results['build_keys_ms'] = round(min(timeit.repeat(
+        lambda: data_fetcher._date_keys(data), number=1, repeat=3)) * 1000, 3)
+    for name, (mask, search) in _queries(data, countries, start, end).items():
+        search()  # Build and cache the keys for this version
+        timings = {}
+        for label, fn in [('mask', mask), ('search', search)]:
+            timings[label] = min(timeit.repeat(fn, number=number, repeat=3)) / number * 1000
+        results[name] = {
+            'mask_ms': round(timings['mask'], 3),
+            'search_ms': round(timings['search'], 3),
+            'speedup': round(timings['mask'] / timings['search'], 1)
+        }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark date-range queries.')
+    parser.add_argument('--csv', help='saved copy of owid-covid-data.csv (synthetic if omitted)')
+    parser.add_argument('--scale', type=float, default=10.0, help='synthetic data scale')
+    args = parser.parse_args()
+
+    if args.csv:
+        data = load(args.csv)
+    else:
+        from synthetic import write_owid_csv
+
+        with tempfile.TemporaryDirectory() as tmp:
+            data = load(write_owid_csv(os.path.join(tmp, 'owid-covid-data.csv'), args.scale))
+    print(json.dumps(run(data), indent=2))
+
+if __name__ == '__main__':
+    main()
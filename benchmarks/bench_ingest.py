@@ -0,0 +1,114 @@
+"""
+Compare peak RSS and wall-clock time of the OWID ingestion paths.
+
+``legacy`` reproduces the original loader (``response.text`` ->
+``io.StringIO`` -> parse all columns -> prune); ``streaming`` is the
+current ``data_fetcher`` path. Each mode runs in a fresh interpreter so
+peak RSS is not shared between them.
+
+    python benchmarks/bench_ingest.py --csv owid-covid-data.csv
+"""
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+LEGACY_COLUMNS = ['iso_code', 'continent', 'location', 'date', 'new_cases',
+                  'new_deaths', 'total_cases', 'total_deaths', 'population']
+
+def _legacy_ingest(url):
+    import pandas as pd
+    import requests
+    from data_fetcher import REQUEST_HEADERS
+
+    response = requests.get(url, headers=REQUEST_HEADERS, timeout=30)
+    response.raise_for_status()
+    df = pd.read_csv(io.StringIO(response.text))
+    df = df[LEGACY_COLUMNS]
+    df = df.rename(columns={
+        'location': 'country',
+        'new_cases': 'daily_cases',
+        'new_deaths': 'daily_deaths',
+        'total_cases': 'cumulative_cases',
+        'total_deaths': 'cumulative_deaths'
+    })
+    df['date'] = pd.to_datetime(df['date'])
+    df = df.dropna(subset=['country', 'date'])
+    df = df.fillna(0)
+    df['cfr'] = (df['cumulative_deaths'] / df['cumulative_cases'] * 100).replace([float('inf'), -float('inf')], 0)
+    return df
+
+def _streaming_ingest(url):
+    from data_fetcher import _fetch_owid_csv, clean_covid_data
+
+    df, _ = _fetch_owid_csv(url)
+    return clean_covid_data(df)
+
+MODES = {'legacy': _legacy_ingest, 'streaming': _streaming_ingest}
+
+def _worker(mode, url):
+    import pandas  # noqa: F401  (keep import cost out of the timing)
+    import requests  # noqa: F401
+
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    df = MODES[mode](url)
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({
+        'mode': mode,
+        'rows': len(df),
+        'seconds': round(elapsed, 3),
+        'peak_rss_mb': round(peak_kb / 1024, 1),
+        'ingest_rss_mb': round((peak_kb - baseline_kb) / 1024, 1),
+        'frame_mb': round(df.memory_usage(deep=True).sum() / 2**20, 1)
+    }))
+
+def run(csv_path, repeat=1):
+    from local_server import serve_csv
+
+    server, url = serve_csv(csv_path)
+    results = []
+    try:
+        for mode in MODES:
+            for _ in range(repeat):
+                out = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), '--worker', mode, url],
+                    check=True, capture_output=True, text=True
+                )
+                results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    finally:
+        server.shutdown()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark OWID CSV ingestion paths.')
+    parser.add_argument('--csv', help='saved copy of owid-covid-data.csv (synthetic if omitted)')
+    parser.add_argument('--scale', type=float, default=1.0, help='synthetic data scale')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--worker', nargs=2, metavar=('MODE', 'URL'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        _worker(*args.worker)
+        return
+
+    if args.csv:
+        results = run(args.csv, args.repeat)
+    else:
+        from synthetic import write_owid_csv
+
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = write_owid_csv(os.path.join(tmp, 'owid-covid-data.csv'), args.scale)
+            results = run(csv_path, args.repeat)
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
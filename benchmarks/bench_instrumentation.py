@@ -0,0 +1,61 @@
+"""
+Overhead of the instrumentation layer on a hot path.
+
+Times ``filter_by_country`` (a ``timed`` function) called directly
+(``__wrapped__``), through its wrapper with instrumentation off, and with
+it on, plus the bare cost of entering a ``span``.
+
+    python benchmarks/bench_instrumentation.py --csv owid-covid-data.csv
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import instrumentation  # noqa: E402
+from bench_country_lookup import load  # noqa: E402
+from data_fetcher import filter_by_country  # noqa: E402
+
+def _per_call_us(fn, number):
+    return round(min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6, 3)
+
+def _empty_span():
+    with instrumentation.span('bench'):
+        pass
+
+def run(data, number=20000):
+    country = str(data['country'].cat.categories[0])
+    results = {'rows': len(data)}
+    results['filter_direct_us'] = _per_call_us(lambda: filter_by_country.__wrapped__(data, country), number)
+    instrumentation.set_enabled(False)
+    results['filter_disabled_us'] = _per_call_us(lambda: filter_by_country(data, country), number)
+    results['span_disabled_us'] = _per_call_us(_empty_span, number)
+    instrumentation.set_enabled(True)
+    instrumentation.start_rerun()
+    results['filter_enabled_us'] = _per_call_us(lambda: filter_by_country(data, country), number)
+    results['span_enabled_us'] = _per_call_us(_empty_span, number)
+    instrumentation.finish_rerun()
+    instrumentation.set_enabled(False)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the overhead of instrumentation spans.')
+    parser.add_argument('--csv', help='saved copy of owid-covid-data.csv (synthetic if omitted)')
+    parser.add_argument('--scale', type=float, default=1.0, help='synthetic data scale')
+    args = parser.parse_args()
+
+    if args.csv:
+        data = load(args.csv)
+    else:
+        from synthetic import write_owid_csv
+
+        with tempfile.TemporaryDirectory() as tmp:
+            data = load(write_owid_csv(os.path.join(tmp, 'owid-covid-data.csv'), args.scale))
+    print(json.dumps(run(data), indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Time to first valid dataset with healthy, slow, stalled and failing mirrors.
+
+Each scenario starts three local stand-ins for the OWID mirrors (see
+``local_server.serve_csv``) and measures how long a cold start takes to get
+a parsed dataset:
+
+``sequential``
+    the original loop: try each mirror in turn with a 30 s timeout.
+``hedged``
+    ``data_fetcher._fetch_hedged`` with the configured hedge delay.
+``hedged_0``
+    the same with the mirrors all started at once.
+
+    python benchmarks/bench_mirrors.py --scale 0.1 --hedge-delay 2
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import data_fetcher  # noqa: E402
+from local_server import serve_csv  # noqa: E402
+
+HEALTHY = {}
+SLOW = {'delay': 6}
+STALLED = {'rate': 256 * 1024}
+FAILING = {'status': 503}
+
+SCENARIOS = {
+    'all_healthy': [HEALTHY, HEALTHY, HEALTHY],
+    'slow_primary': [SLOW, HEALTHY, HEALTHY],
+    'stalled_primary': [STALLED, HEALTHY, HEALTHY],
+    'failing_then_slow': [FAILING, SLOW, HEALTHY],
+    'all_failing': [FAILING, FAILING, FAILING],
+}
+
+def _sequential(urls, timeout=30):
+    last_error = None
+    for url in urls:
+        try:
+            df, _ = data_fetcher._fetch_owid_csv(url, timeout=timeout)
+            return df, url
+        except Exception as e:
+            last_error = e
+    raise last_error
+
+def _hedged(hedge_delay):
+    def fetch(urls):
+        df, _, url = data_fetcher._fetch_hedged(urls, hedge_delay=hedge_delay)
+        return df, url
+    return fetch
+
+def run(csv_path, hedge_delay, scenarios=None):
+    strategies = {
+        'sequential': _sequential,
+        'hedged': _hedged(hedge_delay),
+        'hedged_0': _hedged(0),
+    }
+    results = []
+    for scenario in scenarios or SCENARIOS:
+        for strategy, fetch in strategies.items():
+            servers = [serve_csv(csv_path, **options) for options in SCENARIOS[scenario]]
+            urls = [url for _, url in servers]
+            start = time.perf_counter()
+            try:
+                df, url = fetch(urls)
+                outcome = {'rows': len(df), 'winner': urls.index(url)}
+            except Exception as e:
+                outcome = {'error': type(e).__name__}
+            results.append(dict(
+                scenario=scenario,
+                strategy=strategy,
+                seconds_to_dataset=round(time.perf_counter() - start, 2),
+                **outcome
+            ))
+            for server, _ in servers:
+                server.shutdown()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark hedged mirror fetching.')
+    parser.add_argument('--csv', help='saved copy of owid-covid-data.csv (synthetic if omitted)')
+    parser.add_argument('--scale', type=float, default=0.1, help='synthetic data scale')
+    parser.add_argument('--hedge-delay', type=float, default=data_fetcher.HEDGE_DELAY)
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS))
+    args = parser.parse_args()
+
+    if args.csv:
+        results = run(args.csv, args.hedge_delay, args.scenarios)
+    else:
+        from synthetic import write_owid_csv
+
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = write_owid_csv(os.path.join(tmp, 'owid-covid-data.csv'), args.scale)
+            results = run(csv_path, args.hedge_delay, args.scenarios)
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Work an ``app.py`` rerun does before drawing anything, with and without
+the widget dimensions and per-session page results of ``page_state``.
+
+``before`` is what each page ran on every widget change (sorted unique
+countries for the selectors, the date axis from the date partitions, the
+selected country's rows and latest values, with the country index
+deep-copied from ``attrs`` on every column access and slice); ``after``
+is the same rerun through ``get_dimensions`` and ``session_cached`` with
+unchanged inputs. ``column_access`` isolates the ``attrs`` copy.
+
+    python benchmarks/bench_page_state.py --scales 1 10
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import streamlit.logger as streamlit_logger  # noqa: E402
+
+# Session state warns when used without a running app
+streamlit_logger.set_log_level('error')
+
+import data_fetcher  # noqa: E402
+import page_state  # noqa: E402
+from bench_country_lookup import load  # noqa: E402
+from metrics import latest_metrics  # noqa: E402
+
+def _with_plain_offsets(data):
+    """``data`` sharing its columns, with the country index as plain tuples as before."""
+    frame = data.copy(deep=False)
+    index = data.attrs['country_index']
+    data_fetcher.set_country_index(frame, index['starts'], index['stops'])
+    frame.attrs['country_index'].update(starts=tuple(index['starts']), stops=tuple(index['stops']))
+    return frame
+
+def _reruns(data, country):
+    """``(before, after)`` callables per page."""
+    def dashboard_before():
+        sorted(data['country'].unique())
+        return data_fetcher.filter_by_country(data, country), latest_metrics(data, country)
+
+    def dashboard_after():
+        page_state.get_dimensions(data)['countries']
+        return page_state.session_cached(data, 'dashboard', country, lambda: (
+            data_fetcher.filter_by_country(data, country), latest_metrics(data, country)
+        ))
+
+    def daily_before():
+        data['country'].unique()
+        rows = data_fetcher.filter_by_country(data, country)
+        return rows['date'].iloc[0].date(), rows['date'].iloc[-1].date()
+
+    def daily_after():
+        dimensions = page_state.get_dimensions(data)
+        page_state.session_cached(data, 'daily', country, lambda: data_fetcher.filter_by_country(data, country))
+        return dimensions['country_dates'][country]
+
+    def comparison_before():
+        return sorted(data['country'].unique()), data_fetcher.get_date_partitions(data)['dates']
+
+    def comparison_after():
+        dimensions = page_state.get_dimensions(data)
+        return dimensions['countries'], dimensions['dates']
+
+    return {
+        'dashboard': (dashboard_before, dashboard_after),
+        'daily_metrics': (daily_before, daily_after),
+        'comparison': (comparison_before, comparison_after),
+    }
+
+def _ms(fn, number=20):
+    fn()
+    return round(min(timeit.repeat(fn, number=number, repeat=3)) / number * 1000, 3)
+
+def run(data):
+    names = page_state.get_dimensions(data)['countries']
+    country = next((c for c in page_state.DEFAULT_COUNTRIES if c in names), names[0])
+    results = {
+        'rows': len(data),
+        'countries': len(names),
+        'dimensions_build_ms': _ms(lambda: page_state._build_dimensions(data), 1)
+    }
+    plain = _with_plain_offsets(data)
+    results['column_access'] = {
+        'before_ms': _ms(lambda: plain['country'], 200),
+        'after_ms': _ms(lambda: data['country'], 200)
+    }
+    before_reruns, after_reruns = _reruns(plain, country), _reruns(data, country)
+    for page in before_reruns:
+        results[page] = {
+            'before_ms': _ms(before_reruns[page][0]),
+            'after_ms': _ms(after_reruns[page][1])
+        }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark rerun work with and without page_state.')
+    parser.add_argument('--csv', help='saved copy of owid-covid-data.csv (synthetic if omitted)')
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10], help='synthetic data scales')
+    args = parser.parse_args()
+
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in ([None] if args.csv else args.scales):
+            if args.csv:
+                label, data = 'csv', load(args.csv)
+            else:
+                from synthetic import write_owid_csv
+
+                label = f"{scale:g}x"
+                data = load(write_owid_csv(os.path.join(tmp, f"owid-{label}.csv"), scale))
+            report[label] = run(data)
+            print(json.dumps({label: report[label]}, indent=2), flush=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Dashboard queries on the pandas backend vs the DuckDB query engine.
+
+Each scale replicates the 1x dataset's locations (renamed, as more
+sub-national rows would add them) and runs the country, date-range,
+latest-value and snapshot queries of ``data_fetcher`` plus the rollup
+aggregation with ``query_engine`` set to each backend. ``engine_load_ms``
+is DuckDB's one-off copy of a data version. Large scales need several
+GB of memory (50x is ~17M rows).
+
+    python benchmarks/bench_query_engine.py --scales 1 50
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import data_fetcher  # noqa: E402
+import query_engine  # noqa: E402
+import rollups  # noqa: E402
+from bench_country_lookup import load  # noqa: E402
+
+def replicate(data, factor):
+    """``data`` with ``factor`` copies of every location, prepared like a loaded dataset."""
+    if factor == 1:
+        return data
+    frame = {}
+    for column in data.columns:
+        series = data[column]
+        if column == 'country':
+            names = series.cat.categories
+            codes = np.concatenate([series.cat.codes.to_numpy() + k * len(names) for k in range(factor)])
+            categories = [*names, *(f"{name} #{k}" for k in range(1, factor) for name in names)]
+            frame[column] = pd.Categorical.from_codes(codes, categories)
+        elif isinstance(series.dtype, pd.CategoricalDtype):
+            frame[column] = pd.Categorical.from_codes(np.tile(series.cat.codes.to_numpy(), factor), dtype=series.dtype)
+        else:
+            frame[column] = np.tile(series.to_numpy(), factor)
+    return data_fetcher.prepare_dataset(pd.DataFrame(frame))
+
+def _queries(data):
+    names = [str(c) for c in data['country'].cat.categories]
+    countries = [c for c in ['United States', 'India', 'Brazil'] if c in names] or names[:3]
+    dates = data_fetcher.get_date_partitions(data)['dates']
+    start, end = dates[len(dates) // 4], dates[len(dates) // 2]
+    return {
+        'country': lambda: data_fetcher.filter_by_country(data, countries[0]),
+        'country_over_range': lambda: data_fetcher.filter_by_country(data, countries[0], (start, end)),
+        'countries_over_range': lambda: data_fetcher.select_countries(data, countries, (start, end)),
+        'latest': lambda: data_fetcher.get_latest_metrics(data, countries[0]),
+        'date_range': lambda: data_fetcher.filter_by_date_range(data, start, end),
+        'snapshot': lambda: data_fetcher.get_date_snapshot(data, dates[-1]),
+        'rollups': lambda: rollups._build_rollups(data),
+    }
+
+def _ms(fn, number):
+    return round(min(timeit.repeat(fn, number=number, repeat=3)) / number * 1000, 3)
+
+def run(data, number=5):
+    results = {'rows': len(data), 'countries': len(data['country'].cat.categories)}
+    results['engine_load_ms'] = _ms(lambda: query_engine._load_table(data).close(), 1)
+    queries = _queries(data)
+    for name in queries:
+        results[name] = {}
+    for backend in query_engine.BACKENDS:
+        query_engine.set_backend(backend)
+        for name, query in queries.items():
+            query()  # Warm: keys, partitions and the DuckDB table for this version
+            results[name][f"{backend}_ms"] = _ms(query, 1 if name == 'rollups' else number)
+    query_engine.set_backend('pandas')
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the pandas and DuckDB query backends.')
+    parser.add_argument('--csv', help='saved copy of owid-covid-data.csv (synthetic if omitted)')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 50], help='location multiples of the 1x data')
+    args = parser.parse_args()
+    if query_engine.duckdb is None:
+        sys.exit('duckdb is not installed (pip install duckdb)')
+
+    if args.csv:
+        base = load(args.csv)
+    else:
+        from synthetic import write_owid_csv
+
+        with tempfile.TemporaryDirectory() as tmp:
+            base = load(write_owid_csv(os.path.join(tmp, 'owid-covid-data.csv'), 1.0))
+    report = {}
+    for scale in args.scales:
+        report[f"{scale}x"] = run(replicate(base, scale))
+        print(json.dumps({f"{scale}x": report[f"{scale}x"]}, indent=2), flush=True)
+
+if __name__ == '__main__':
+    main()
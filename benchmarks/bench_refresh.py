@@ -0,0 +1,96 @@
+"""
+Cost of "Refresh Data" as a function of how much changed upstream.
+
+For each change size (new days of data for every location) the served
+file is updated in one of two layouts:
+
+``appended``
+    new rows are written at the end of the file, as append-only sources
+    do; ``refresh_covid_data`` fetches just those bytes with a range request.
+``in_place``
+    new rows are inserted under each location, as the OWID file (sorted by
+    location, then date) is rewritten; the refresh downloads and diffs.
+
+``full_reload`` is the previous behaviour: download, parse and clean the
+whole file again.
+
+    python benchmarks/bench_refresh.py --scale 1 --days 1400
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+def _write(frame, path, mode='w'):
+    frame.to_csv(path, mode=mode, header=mode == 'w', index=False, float_format='%.6g')
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return round(time.perf_counter() - start, 3), result
+
+def run(scale, days, change_sizes, tmp):
+    os.environ['COVID_TRACKER_CACHE_DIR'] = os.path.join(tmp, 'cache')
+    import data_fetcher
+    from local_server import serve_csv
+    from synthetic import generate_owid_frame
+
+    frame = generate_owid_frame(scale, days + max(change_sizes))
+    dates = sorted(frame['date'].unique())
+    csv_path = os.path.join(tmp, 'owid-covid-data.csv')
+    server, url = serve_csv(csv_path)
+    data_fetcher.OWID_URLS[:] = [url]
+    snapshot_files = [data_fetcher.SNAPSHOT_DATA, data_fetcher.SNAPSHOT_META]
+
+    results = []
+    try:
+        for layout in ['appended', 'in_place']:
+            for size in change_sizes:
+                base = frame[frame['date'] < dates[days]]
+                added = frame[(frame['date'] >= dates[days]) & (frame['date'] <= dates[days + size - 1])]
+                _write(base, csv_path)
+                data_fetcher.fetch_covid_data()
+                for path in snapshot_files:
+                    shutil.copy(path, path + '.base')
+
+                # New mtime -> new ETag even within the same second
+                time.sleep(1.1)
+                if layout == 'appended':
+                    _write(added, csv_path, mode='a')
+                else:
+                    _write(frame[frame['date'] <= dates[days + size - 1]], csv_path)
+
+                refresh_seconds, (_, summary) = _timed(data_fetcher.refresh_covid_data)
+                for path in snapshot_files:
+                    shutil.copy(path + '.base', path)
+                full_seconds, _ = _timed(data_fetcher.fetch_covid_data)
+                results.append({
+                    'layout': layout,
+                    'new_days': size,
+                    'rows_changed': summary['rows'],
+                    'mode': summary['mode'],
+                    'refresh_seconds': refresh_seconds,
+                    'full_reload_seconds': full_seconds,
+                    'speedup': round(full_seconds / refresh_seconds, 1)
+                })
+    finally:
+        server.shutdown()
+    return {'rows': int((frame['date'] < dates[days]).sum()), 'runs': results}
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark incremental refresh against a full reload.')
+    parser.add_argument('--scale', type=float, default=1.0, help='synthetic data scale')
+    parser.add_argument('--days', type=int, default=1400, help='days of history before the refresh')
+    parser.add_argument('--changes', type=int, nargs='+', default=[1, 7, 30], help='new days per refresh')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(json.dumps(run(args.scale, args.days, args.changes, tmp), indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Per-interaction cost of continent and global aggregates.
+
+``groupby`` regroups the table on every rerun, as the alternate entry
+point does for its global quick stats (``df.groupby("date").sum()``)
+plus a per-continent series with a 7-day average. ``rollups`` reads the
+same numbers from ``rollups.get_rollups``, built once per data version;
+``build_ms`` is that one-off cost.
+
+    python benchmarks/bench_rollups.py --csv owid-covid-data.csv
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bench_country_lookup import load  # noqa: E402
+from rollups import GLOBAL_GROUP, _build_rollups, rollup_latest, rollup_series  # noqa: E402
+
+def _groupby_interaction(data, continent):
+    countries = data[data['continent'].notna()]
+    global_latest = countries.groupby('date')[['daily_cases', 'daily_deaths']].sum().iloc[-1]
+    series = countries[countries['continent'] == continent].groupby('date')['daily_cases'].sum()
+    return global_latest, series.rolling(7, min_periods=1).mean()
+
+def _rollup_interaction(data, continent):
+    return rollup_latest(data, GLOBAL_GROUP), rollup_series(data, continent)['daily_cases_7d']
+
+def run(data, number=20):
+    continent = data['continent'].dropna().iloc[0]
+    results = {'rows': len(data)}
+    results['build_ms'] = round(min(timeit.repeat(lambda: _build_rollups(data), number=1, repeat=3)) * 1000, 3)
+    _rollup_interaction(data, continent)  # Build and cache for this version
+    for label, interaction in [('groupby', _groupby_interaction), ('rollups', _rollup_interaction)]:
+        seconds = min(timeit.repeat(lambda: interaction(data, continent), number=number, repeat=3)) / number
+        results[f'{label}_ms_per_interaction'] = round(seconds * 1000, 3)
+    results['speedup'] = round(results['groupby_ms_per_interaction'] / results['rollups_ms_per_interaction'], 1)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark prebuilt rollups against regrouping.')
+    parser.add_argument('--csv', help='saved copy of owid-covid-data.csv (synthetic if omitted)')
+    parser.add_argument('--scale', type=float, default=1.0, help='synthetic data scale')
+    args = parser.parse_args()
+
+    if args.csv:
+        data = load(args.csv)
+    else:
+        from synthetic import write_owid_csv
+
+        with tempfile.TemporaryDirectory() as tmp:
+            data = load(write_owid_csv(os.path.join(tmp, 'owid-covid-data.csv'), args.scale))
+    print(json.dumps(run(data), indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Memory load test: private per-session copies vs the shared dataset.
+
+Starts N worker processes (Streamlit workers), each serving S concurrent
+sessions. ``private`` mimics ``st.cache_data``: the worker keeps the
+pickled frame and every session unpickles its own copy. ``shared``
+mimics the shared mode of ``dataset_refresher``: every worker maps the published column
+files once and all sessions get that same frame. Each session touches
+every column, then RSS and PSS (proportional set size, which splits
+shared pages between processes) are read from /proc.
+
+    python benchmarks/bench_shared_sessions.py --workers 4 --sessions 1 5 20
+"""
+import argparse
+import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+def _memory_kb(pid):
+    """Return (rss_kb, pss_kb) of a process from /proc."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, rest = line.partition(':')
+            if key in ('Rss', 'Pss'):
+                values[key] = int(rest.split()[0])
+    return values['Rss'], values['Pss']
+
+def _touch(df):
+    """Read every value, as rendering different pages eventually does."""
+    for column in df.columns:
+        series = df[column]
+        values = series.cat.codes.to_numpy() if hasattr(series, 'cat') else series.to_numpy()
+        values.view('uint8').sum()
+
+def _worker(mode, source, sessions):
+    if mode == 'private':
+        import pandas as pd
+
+        blob = pickle.dumps(pd.read_parquet(source))
+        frames = [pickle.loads(blob) for _ in range(sessions)]
+    else:
+        from shared_dataset import attach_dataset
+
+        shared = attach_dataset(source)
+        frames = [shared] * sessions
+    for frame in frames:
+        _touch(frame)
+    print('ready', flush=True)
+    sys.stdin.read()  # Hold memory until the parent has measured
+
+def _measure(mode, source, workers, sessions):
+    procs = [
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--worker', mode, source, str(sessions)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+        )
+        for _ in range(workers)
+    ]
+    try:
+        for proc in procs:
+            proc.stdout.readline()
+        usage = [_memory_kb(proc.pid) for proc in procs]
+    finally:
+        for proc in procs:
+            proc.stdin.close()
+            proc.wait()
+    return {
+        'mode': mode,
+        'workers': workers,
+        'sessions_per_worker': sessions,
+        'rss_mb_per_worker': round(sum(rss for rss, _ in usage) / len(usage) / 1024, 1),
+        'pss_mb_total': round(sum(pss for _, pss in usage) / 1024, 1)
+    }
+
+def run(data, workers, session_counts, tmp):
+    from shared_dataset import publish_dataset
+
+    parquet_path = os.path.join(tmp, 'dataset.parquet')
+    data.to_parquet(parquet_path, index=False)
+    shared_dir = publish_dataset(data, os.path.join(tmp, 'shared'))
+
+    results = []
+    for sessions in session_counts:
+        results.append(_measure('private', parquet_path, workers, sessions))
+        results.append(_measure('shared', shared_dir, workers, sessions))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Memory load test for shared vs private datasets.')
+    parser.add_argument('--csv', help='saved copy of owid-covid-data.csv (synthetic if omitted)')
+    parser.add_argument('--scale', type=float, default=1.0, help='synthetic data scale')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 5, 20])
+    parser.add_argument('--worker', nargs=3, metavar=('MODE', 'SOURCE', 'SESSIONS'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        mode, source, sessions = args.worker
+        _worker(mode, source, int(sessions))
+        return
+
+    from bench_country_lookup import load
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.csv:
+            data = load(args.csv)
+        else:
+            from synthetic import write_owid_csv
+
+            data = load(write_owid_csv(os.path.join(tmp, 'owid-covid-data.csv'), args.scale))
+        results = run(data, args.workers, args.sessions, tmp)
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Measure cold, warm and changed-upstream starts of the app's loader.
+
+Each start is the first load of a fresh ``dataset_refresher``, as in a
+new process. A cold start downloads and parses the CSV and writes the
+Parquet snapshot; a warm start only revalidates (304) and reads the
+snapshot. Touching the served file makes the next start download again
+(only changed lines are parsed).
+
+    python benchmarks/bench_snapshot.py --csv owid-covid-data.csv
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+def _start(url):
+    import data_fetcher
+    from dataset_refresher import DatasetRefresher, _build_private
+
+    data_fetcher.OWID_URLS[:] = [url]
+    start = time.perf_counter()
+    df = DatasetRefresher(_build_private).get()
+    return time.perf_counter() - start, len(df)
+
+def run(csv_path, cache_dir):
+    os.environ['COVID_TRACKER_CACHE_DIR'] = cache_dir
+    from local_server import serve_csv
+
+    server, url = serve_csv(csv_path)
+    results = {}
+    try:
+        for label in ['cold', 'warm', 'warm_again']:
+            seconds, rows = _start(url)
+            results[label] = {'seconds': round(seconds, 3), 'rows': rows}
+
+        # New upstream version: same content, newer mtime -> new ETag
+        os.utime(csv_path)
+        seconds, rows = _start(url)
+        results['changed_upstream'] = {'seconds': round(seconds, 3), 'rows': rows}
+        results['conditional_requests'] = sum('If-None-Match' in h for h in server.requests_seen)
+    finally:
+        server.shutdown()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the on-disk snapshot cache.')
+    parser.add_argument('--csv', help='saved copy of owid-covid-data.csv (synthetic if omitted)')
+    parser.add_argument('--scale', type=float, default=1.0, help='synthetic data scale')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Work on a copy: the benchmark touches the file to simulate an update
+        csv_path = os.path.join(tmp, 'owid-covid-data.csv')
+        if args.csv:
+            shutil.copyfile(args.csv, csv_path)
+        else:
+            from synthetic import write_owid_csv
+
+            write_owid_csv(csv_path, args.scale)
+        results = run(csv_path, os.path.join(tmp, 'cache'))
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
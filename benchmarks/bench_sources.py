@@ -0,0 +1,136 @@
+"""
+Multi-source loading: sequential adapters vs the process pool.
+
+Serves a synthetic OWID CSV, JHU-style wide time series derived from it
+and a directory of regional CSVs, then loads all three with
+``sources.load_sources``. ``sequential`` runs the adapters one after the
+other in this process; ``pool`` is a cold and a warm (workers started)
+``load_sources``; ``slow_source`` delays the JHU files past the timeout,
+so JHU is served from its cached copy while the others are fresh.
+``jhu_reshape`` compares ``sources.jhu_frame`` with ``melt``.
+
+    python benchmarks/bench_sources.py --scale 1 --jhu-delay 5 --timeout 2
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+def _write_jhu_csvs(owid, tmp):
+    """JHU-style wide files (one column per date) with the synthetic countries' totals."""
+    countries = owid[owid['continent'].notna()]
+    paths = {}
+    for name, column in [('cases', 'total_cases'), ('deaths', 'total_deaths')]:
+        wide = countries.pivot_table(index='location', columns='date', values=column, aggfunc='max', observed=True)
+        wide = wide.ffill(axis=1).fillna(0)
+        wide.columns = [f"{d.month}/{d.day}/{d:%y}" for d in wide.columns]
+        ids = pd.DataFrame({'Province/State': None, 'Country/Region': wide.index.astype(str),
+                            'Lat': 0.0, 'Long': 0.0}, index=wide.index)
+        wide = pd.concat([ids, wide], axis=1)
+        paths[name] = os.path.join(tmp, f"jhu_{name}.csv")
+        wide.to_csv(paths[name], index=False)
+    return paths
+
+def _write_regional_csvs(owid, directory, regions=20):
+    """Regional CSVs with OWID column names, totals only (daily counts are derived)."""
+    os.makedirs(directory, exist_ok=True)
+    dates = np.sort(owid['date'].unique())
+    rng = np.random.default_rng(0)
+    totals = np.cumsum(rng.poisson(50, size=(regions, len(dates))), axis=1)
+    frame = pd.DataFrame({
+        'location': np.repeat([f"Region {i:02d}" for i in range(regions)], len(dates)),
+        'date': np.tile(dates, regions),
+        'total_cases': totals.ravel(),
+        'total_deaths': (totals // 100).ravel()
+    })
+    frame.to_csv(os.path.join(directory, 'regions.csv'), index=False)
+
+def _melt_jhu(cases):
+    long = cases.reset_index().melt(id_vars='Country/Region', var_name='date', value_name='cumulative_cases')
+    long = long.sort_values(['Country/Region', 'date'])
+    long['daily_cases'] = long.groupby('Country/Region')['cumulative_cases'].diff().fillna(long['cumulative_cases'])
+    return long
+
+def run(csv_path, tmp, jhu_delay, timeout):
+    os.environ['COVID_TRACKER_CACHE_DIR'] = os.path.join(tmp, 'cache')
+    os.environ['COVID_TRACKER_LOCAL_SOURCE_DIR'] = os.path.join(tmp, 'regional')
+    import data_fetcher
+    import sources
+    from local_server import serve_csv
+
+    with open(csv_path, 'rb') as f:
+        owid = data_fetcher._read_owid_csv(f)
+    jhu_paths = _write_jhu_csvs(owid, tmp)
+    _write_regional_csvs(owid, sources.LOCAL_SOURCE_DIR)
+
+    servers = []
+    server, url = serve_csv(csv_path)
+    servers.append(server)
+    data_fetcher.OWID_URLS[:] = [url]
+    for name, path in jhu_paths.items():
+        server, url = serve_csv(path)
+        servers.append(server)
+        sources.JHU_URLS[name] = url
+    names = ['owid', 'jhu', 'local']
+
+    try:
+        results = {'rows_owid': len(owid)}
+        cases, deaths = sources._read_jhu_csv(jhu_paths['cases']), sources._read_jhu_csv(jhu_paths['deaths'])
+        results['jhu_reshape'] = {
+            'vectorized_ms': round(min(timeit.repeat(lambda: sources.jhu_frame(cases, deaths), number=1, repeat=3)) * 1000, 3),
+            'melt_ms': round(min(timeit.repeat(lambda: (_melt_jhu(cases), _melt_jhu(deaths)), number=1, repeat=3)) * 1000, 3)
+        }
+
+        started = time.perf_counter()
+        frames = [sources.SOURCES[name]['load']() for name in names]
+        data = data_fetcher.prepare_dataset(data_fetcher.clean_covid_data(sources.merge_sources(frames)))
+        results['sequential_seconds'] = round(time.perf_counter() - started, 3)
+
+        for label in ['pool_cold_seconds', 'pool_warm_seconds']:
+            started = time.perf_counter()
+            data, notices = sources.load_sources(names, timeout=600)
+            results[label] = round(time.perf_counter() - started, 3)
+        results['rows_merged'] = len(data)
+        results['countries_merged'] = int(data['country'].nunique())
+
+        for server in servers[1:]:
+            server.delay = jhu_delay
+        started = time.perf_counter()
+        data, notices = sources.load_sources(names, timeout=timeout)
+        results['slow_source'] = {
+            'seconds': round(time.perf_counter() - started, 3),
+            'jhu_delay': jhu_delay,
+            'timeout': timeout,
+            'notices': [message for _, message in notices]
+        }
+    finally:
+        for server in servers:
+            server.shutdown()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark multi-source loading.')
+    parser.add_argument('--csv', help='saved copy of owid-covid-data.csv (synthetic if omitted)')
+    parser.add_argument('--scale', type=float, default=1.0, help='synthetic data scale')
+    parser.add_argument('--jhu-delay', type=float, default=5, help='seconds the slow JHU mirror waits')
+    parser.add_argument('--timeout', type=float, default=2, help='seconds to wait for a source')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = args.csv
+        if csv_path is None:
+            from synthetic import write_owid_csv
+
+            csv_path = write_owid_csv(os.path.join(tmp, 'owid-covid-data.csv'), args.scale)
+        print(json.dumps(run(csv_path, tmp, args.jhu_delay, args.timeout), indent=2))
+
+if __name__ == '__main__':
+    main()
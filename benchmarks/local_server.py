@@ -0,0 +1,129 @@
+"""
+Local HTTP stand-in for the OWID CSV mirrors.
+
+Serves a single file for every GET path so ``data_fetcher`` can be pointed
+at ``http://127.0.0.1:<port>/owid-covid-data.csv`` in benchmarks. The
+response carries an ETag and Last-Modified derived from the file's size
+and mtime, and conditional requests are answered with 304 like GitHub's
+raw file servers do. A single ``Range: bytes=<start>-[<end>]`` is
+answered with 206 and just those bytes.
+
+To stand in for unhealthy mirrors, a server can wait before answering
+(``delay``), answer with an error status (``status``) or trickle the body
+at ``rate`` bytes per second.
+"""
+import os
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def _validators(path):
+    stat = os.stat(path)
+    etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    return etag, formatdate(stat.st_mtime, usegmt=True), stat
+
+class _CSVHandler(BaseHTTPRequestHandler):
+    def _not_modified(self, etag, stat):
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            return etag in [tag.strip() for tag in if_none_match.split(',')]
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                return int(stat.st_mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _range(self, size):
+        """Parse a single byte range into ``(start, stop)``; None if absent."""
+        header = self.headers.get('Range', '')
+        if not header.startswith('bytes=') or ',' in header:
+            return None
+        start, _, end = header[len('bytes='):].partition('-')
+        try:
+            start = int(start)
+            stop = int(end) + 1 if end else size
+        except ValueError:
+            return None
+        return start, min(stop, size)
+
+    def do_GET(self):
+        path = self.server.csv_path
+        self.server.requests_seen.append(self.headers)
+
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        if self.server.status:
+            self.send_error(self.server.status)
+            return
+        try:
+            etag, last_modified, stat = _validators(path)
+        except OSError:
+            return  # File removed while a delayed request was waiting
+
+        if self._not_modified(etag, stat):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', last_modified)
+            self.end_headers()
+            return
+
+        byte_range = self._range(stat.st_size)
+        if byte_range is not None and byte_range[0] >= stat.st_size:
+            self.send_response(416)
+            self.send_header('Content-Range', f"bytes */{stat.st_size}")
+            self.end_headers()
+            return
+        start, stop = byte_range or (0, stat.st_size)
+
+        self.send_response(200 if byte_range is None else 206)
+        self.send_header('Content-Type', 'text/csv')
+        self.send_header('Content-Length', str(stop - start))
+        if byte_range is not None:
+            self.send_header('Content-Range', f"bytes {start}-{stop - 1}/{stat.st_size}")
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', last_modified)
+        self.end_headers()
+        chunk_size = min(1 << 16, self.server.rate) if self.server.rate else 1 << 16
+        with open(path, 'rb') as f:
+            f.seek(start)
+            remaining = stop - start
+            while remaining:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                try:
+                    self.wfile.write(chunk)
+                except OSError:
+                    return  # Client gave up (e.g. a cancelled hedged request)
+                remaining -= len(chunk)
+                if self.server.rate:
+                    time.sleep(len(chunk) / self.server.rate)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve_csv(csv_path, port=0, delay=0, status=None, rate=None):
+    """
+    Start a background server for ``csv_path``.
+
+    ``delay`` seconds pass before each response, ``status`` (e.g. 503)
+    replaces every response with that error, and ``rate`` caps the body
+    at that many bytes per second.
+
+    Returns ``(server, url)``; call ``server.shutdown()`` when done.
+    ``server.requests_seen`` records the headers of every request.
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', port), _CSVHandler)
+    server.daemon_threads = True
+    server.csv_path = csv_path
+    server.delay = delay
+    server.status = status
+    server.rate = rate
+    server.requests_seen = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address
+    return server, f"http://{host}:{port}/owid-covid-data.csv"
@@ -0,0 +1,203 @@
+"""
+Headless benchmark suite for the data and plotting hot paths.
+
+Every case runs against a synthetic OWID-shaped CSV at each ``--scales``
+multiple of the real file (1x is ~350k rows; 100x needs ~10 GB of disk
+and several GB of memory), or against ``--csv`` at 1x. Streamlit calls
+in the dashboard modules are replaced by ``streamlit_stub``, and the
+figure cache is cleared before each call, so ``plot_*`` cases measure
+figure construction. Dataset-level structures (date partitions, rollups,
+metrics) are timed as their own cases and are warm for the plot cases.
+
+Each case reports the best and median wall time over ``--repeat`` runs and
+the peak traced allocation (``tracemalloc``, a separate run). The JSON
+report records the commit and library versions; ``--baseline`` compares
+against an earlier report and flags cases that got slower.
+
+    python benchmarks/run.py --scales 1 10 --output bench.json
+    python benchmarks/run.py --scales 1 --baseline bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import data_fetcher  # noqa: E402
+import metrics  # noqa: E402
+import rollups  # noqa: E402
+import table_export  # noqa: E402
+import visualizations  # noqa: E402
+from figure_cache import FIGURE_CACHE  # noqa: E402
+from streamlit_stub import stub_streamlit  # noqa: E402
+
+# Slower than the baseline by more than this fraction counts as a regression
+REGRESSION_THRESHOLD = 0.2
+
+def _measure(fn, repeat):
+    """Return (best, median) seconds over ``repeat`` runs and the traced peak in MB."""
+    fn()  # Warm-up: imports, lazy caches, allocator
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(timings), statistics.median(timings), peak / 2**20
+
+def _parse(csv_path):
+    with open(csv_path, 'rb') as f:
+        return data_fetcher._read_owid_csv(f)
+
+def _uncached_figure(plot):
+    """Run a ``plot_*`` call with the figure cache emptied first."""
+    def run():
+        FIGURE_CACHE.clear()
+        plot()
+    return run
+
+def _cases(csv_path, data):
+    """(name, callable) pairs for one dataset."""
+    parsed = _parse(csv_path)
+    countries = [str(c) for c in data['country'].cat.categories]
+    country = 'United States' if 'United States' in countries else countries[0]
+    comparison = [c for c in ['United States', 'India', 'Brazil'] if c in countries] or countries[:3]
+    country_data = data_fetcher.filter_by_country(data, country)
+    dates = rollups.get_rollups(data)['dates']
+    start, end = dates[len(dates) // 4], dates[3 * len(dates) // 4]
+    latest = metrics.latest_metrics(data, country)
+    continent = rollups.rollup_groups(data)[0]
+
+    return [
+        ('fetch_covid_data.parse', lambda: _parse(csv_path)),
+        ('fetch_covid_data.clean', lambda: data_fetcher.clean_covid_data(parsed.copy())),
+        ('fetch_covid_data.prepare', lambda: data_fetcher.prepare_dataset(data.copy())),
+        ('filter_by_country', lambda: data_fetcher.filter_by_country(data, country)),
+        ('filter_by_date_range', lambda: data_fetcher.filter_by_date_range(data, start, end)),
+        ('get_latest_metrics', lambda: data_fetcher.get_latest_metrics(data, country)),
+        ('select_countries', lambda: data_fetcher.select_countries(data, comparison)),
+        ('select_countries.date_range', lambda: data_fetcher.select_countries(data, comparison, (start, end))),
+        ('build_date_partitions', lambda: data_fetcher._build_date_partitions(data)),
+        ('build_rollups', lambda: rollups._build_rollups(data)),
+        ('metrics.daily_cases_7d', lambda: metrics._uncached(data, 'daily_cases_7d', metrics._block_starts(data))),
+        ('metrics.cases_growth_wow', lambda: metrics._uncached(data, 'cases_growth_wow', metrics._block_starts(data))),
+        ('table_page', lambda: table_export.table_page(data, country, 'Date (Newest)', 1, 50, ['daily_cases_7d'])),
+        ('export_country.csv', lambda: table_export._build_country_export(
+            data, country, 'Date (Newest)', (), 'CSV (gzip)')),
+        ('plot_metrics_cards', lambda: visualizations.plot_metrics_cards(latest, country)),
+        ('plot_daily_metrics', _uncached_figure(
+            lambda: visualizations.plot_daily_metrics(country_data, country, 'Cases'))),
+        ('plot_case_fatality_rate', _uncached_figure(
+            lambda: visualizations.plot_case_fatality_rate(country_data, country))),
+        ('plot_country_comparison', _uncached_figure(
+            lambda: visualizations.plot_country_comparison(data, comparison, normalize=True))),
+        ('plot_global_map', _uncached_figure(
+            lambda: visualizations.plot_global_map(data, 'Cases', dates[-1]))),
+        ('plot_metric_map', _uncached_figure(
+            lambda: visualizations.plot_metric_map(data, 'daily_tests', dates[-1], per_100k=True))),
+        ('plot_latest_comparison', _uncached_figure(
+            lambda: visualizations.plot_latest_comparison(data, comparison, 'cumulative_cases', per_100k=True))),
+        ('plot_global_map_timeline', _uncached_figure(
+            lambda: visualizations.plot_global_map_timeline(data, 'Cases', 'Weekly'))),
+        ('plot_rollup_trend', _uncached_figure(
+            lambda: visualizations.plot_rollup_trend(data, continent, 'Cases', per_100k=True))),
+        ('plot_continent_breakdown', _uncached_figure(
+            lambda: visualizations.plot_continent_breakdown(data, 'Cases'))),
+        ('plot_metric_trend', _uncached_figure(
+            lambda: visualizations.plot_metric_trend(data, country, 'cases_doubling_days'))),
+    ]
+
+def run_scale(csv_path, scale, repeat, only=None):
+    data = data_fetcher.prepare_dataset(data_fetcher.clean_covid_data(_parse(csv_path)))
+    results = []
+    with stub_streamlit(visualizations):
+        for name, fn in _cases(csv_path, data):
+            if only and not any(pattern in name for pattern in only):
+                continue
+            best, median, peak_mb = _measure(fn, repeat)
+            results.append({
+                'case': name,
+                'scale': scale,
+                'rows': len(data),
+                'best_ms': round(best * 1000, 3),
+                'median_ms': round(median * 1000, 3),
+                'peak_mb': round(peak_mb, 2)
+            })
+    return results
+
+def _environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'machine': platform.machine()
+    }
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """Annotate ``results`` with the change against a baseline report; return the regressions."""
+    previous = {(r['case'], r['scale']): r for r in baseline['results']}
+    regressions = []
+    for result in results:
+        before = previous.get((result['case'], result['scale']))
+        if before is None or not before['best_ms']:
+            continue
+        result['baseline_best_ms'] = before['best_ms']
+        result['change'] = round(result['best_ms'] / before['best_ms'] - 1, 3)
+        if result['change'] > threshold:
+            regressions.append(f"{result['case']}@{result['scale']:g}x")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the headless benchmark suite.')
+    parser.add_argument('--csv', help='saved copy of owid-covid-data.csv, run as scale 1 (synthetic if omitted)')
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10, 100], help='synthetic data scales')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per case')
+    parser.add_argument('--cases', nargs='+', help='only run cases whose name contains one of these')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    parser.add_argument('--baseline', help='earlier JSON report to compare against')
+    args = parser.parse_args()
+
+    results = []
+    if args.csv:
+        results += run_scale(args.csv, 1, args.repeat, args.cases)
+    else:
+        from synthetic import write_owid_csv
+
+        for scale in args.scales:
+            with tempfile.TemporaryDirectory() as tmp:
+                csv_path = write_owid_csv(os.path.join(tmp, 'owid-covid-data.csv'), scale)
+                results += run_scale(csv_path, scale, args.repeat, args.cases)
+
+    report = {'environment': _environment(), 'results': results}
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['regressions'] = compare(results, json.load(f))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
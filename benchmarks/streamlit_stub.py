@@ -0,0 +1,53 @@
+"""
+Stand-in for the ``st`` module used by the dashboard modules.
+
+Rendering calls are recorded instead of sent to a browser, so plotting
+functions can be timed headlessly:
+
+    with stub_streamlit(visualizations) as st:
+        visualizations.plot_country_comparison(data, countries)
+    figure = st.charts[-1]
+"""
+import contextlib
+
+class _Column:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+class StreamlitStub:
+    def __init__(self, real):
+        self._real = real
+        self.charts = []
+        self.messages = []
+
+    def plotly_chart(self, figure_or_data, *args, **kwargs):
+        self.charts.append(figure_or_data)
+
+    def columns(self, spec, *args, **kwargs):
+        return [_Column() for _ in range(spec if isinstance(spec, int) else len(spec))]
+
+    def _record(self, kind):
+        # st.metric is called with keywords only
+        return lambda *args, **kwargs: self.messages.append((kind, args[0] if args else kwargs))
+
+    def __getattr__(self, name):
+        if name in ('success', 'info', 'warning', 'error', 'metric', 'caption', 'markdown'):
+            return self._record(name)
+        # Caching decorators and anything else behave like the real module
+        return getattr(self._real, name)
+
+@contextlib.contextmanager
+def stub_streamlit(*modules):
+    """Replace ``st`` in ``modules`` with one recording stub."""
+    real = modules[0].st
+    stub = StreamlitStub(real)
+    for module in modules:
+        module.st = stub
+    try:
+        yield stub
+    finally:
+        for module in modules:
+            module.st = real
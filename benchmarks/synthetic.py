@@ -0,0 +1,132 @@
+"""
+Generate OWID-shaped COVID-19 CSV files for offline benchmarks.
+
+The layout mirrors owid-covid-data.csv: the same 67 columns, one row per
+location and date, sorted by location then date, with OWID aggregate rows
+(World, continents) that have no continent.
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+OWID_COLUMNS = [
+    'iso_code', 'continent', 'location', 'date', 'total_cases', 'new_cases',
+    'new_cases_smoothed', 'total_deaths', 'new_deaths', 'new_deaths_smoothed',
+    'total_cases_per_million', 'new_cases_per_million', 'new_cases_smoothed_per_million',
+    'total_deaths_per_million', 'new_deaths_per_million', 'new_deaths_smoothed_per_million',
+    'reproduction_rate', 'icu_patients', 'icu_patients_per_million', 'hosp_patients',
+    'hosp_patients_per_million', 'weekly_icu_admissions', 'weekly_icu_admissions_per_million',
+    'weekly_hosp_admissions', 'weekly_hosp_admissions_per_million', 'total_tests', 'new_tests',
+    'total_tests_per_thousand', 'new_tests_per_thousand', 'new_tests_smoothed',
+    'new_tests_smoothed_per_thousand', 'positive_rate', 'tests_per_case', 'tests_units',
+    'total_vaccinations', 'people_vaccinated', 'people_fully_vaccinated', 'total_boosters',
+    'new_vaccinations', 'new_vaccinations_smoothed', 'total_vaccinations_per_hundred',
+    'people_vaccinated_per_hundred', 'people_fully_vaccinated_per_hundred',
+    'total_boosters_per_hundred', 'new_vaccinations_smoothed_per_million',
+    'new_people_vaccinated_smoothed', 'new_people_vaccinated_smoothed_per_hundred',
+    'stringency_index', 'population_density', 'median_age', 'aged_65_older', 'aged_70_older',
+    'gdp_per_capita', 'extreme_poverty', 'cardiovasc_death_rate', 'diabetes_prevalence',
+    'female_smokers', 'male_smokers', 'handwashing_facilities', 'hospital_beds_per_thousand',
+    'life_expectancy', 'human_development_index', 'population',
+    'excess_mortality_cumulative_absolute', 'excess_mortality_cumulative', 'excess_mortality',
+    'excess_mortality_cumulative_per_million'
+]
+
+CONTINENTS = ['Africa', 'Asia', 'Europe', 'North America', 'Oceania', 'South America']
+AGGREGATES = [('OWID_WRL', 'World')] + [
+    (f"OWID_{name[:3].upper()}", name) for name in CONTINENTS
+]
+BASE_COUNTRIES = 248
+START_DATE = '2020-01-03'
+
+def _iso_code(i):
+    letters = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    return letters[i // 676 % 26] + letters[i // 26 % 26] + letters[i % 26]
+
+def _country_count(scale):
+    return max(1, int(round(BASE_COUNTRIES * scale)))
+
+def generate_owid_frame(scale=1.0, days=1400, seed=0, countries=None):
+    """
+    Build a synthetic OWID-shaped DataFrame.
+
+    ``scale`` multiplies the number of locations (think sub-national
+    regions), so 1.0 gives roughly the ~350k rows of the real file.
+    ``countries`` is an optional ``range`` of country numbers to generate
+    (the aggregates come with the range that ends the set), so large
+    scales can be written in parts.
+    """
+    n_countries = _country_count(scale)
+    countries = countries if countries is not None else range(n_countries)
+    rng = np.random.default_rng(seed if countries.start == 0 else [seed, countries.start])
+    aggregates = AGGREGATES if countries.stop >= n_countries else []
+
+    iso_codes = [_iso_code(i) for i in countries] + [code for code, _ in aggregates]
+    locations = [f"Country {i:05d}" for i in countries] + [name for _, name in aggregates]
+    continents = [CONTINENTS[i % len(CONTINENTS)] for i in countries] + [None] * len(aggregates)
+    for i, name in enumerate(['Brazil', 'India', 'United States']):
+        if i in countries and n_countries >= 3:
+            locations[i - countries.start] = name
+
+    n_locations = len(locations)
+    dates = pd.date_range(START_DATE, periods=days, freq='D')
+    n_rows = n_locations * days
+
+    population = rng.integers(50_000, 300_000_000, size=n_locations).astype('float64')
+    daily_cases = rng.poisson(lam=np.repeat(population / 20_000, days)).astype('float64')
+    daily_deaths = rng.binomial(daily_cases.astype('int64'), 0.01).astype('float64')
+    # OWID reports a number of days without data; keep some gaps
+    gaps = rng.random(n_rows) < 0.05
+    daily_cases[gaps] = np.nan
+    daily_deaths[gaps] = np.nan
+    total_cases = np.nancumsum(daily_cases.reshape(n_locations, days), axis=1).ravel()
+    total_deaths = np.nancumsum(daily_deaths.reshape(n_locations, days), axis=1).ravel()
+
+    frame = {
+        'iso_code': np.repeat(iso_codes, days),
+        'continent': np.repeat(np.array(continents, dtype=object), days),
+        'location': np.repeat(locations, days),
+        'date': np.tile(dates.strftime('%Y-%m-%d').to_numpy(), n_locations),
+        'total_cases': total_cases,
+        'new_cases': daily_cases,
+        'total_deaths': total_deaths,
+        'new_deaths': daily_deaths,
+        'population': np.repeat(population, days),
+    }
+    for column in OWID_COLUMNS:
+        if column in frame:
+            continue
+        if column == 'tests_units':
+            frame[column] = np.where(rng.random(n_rows) < 0.5, 'tests performed', '')
+        else:
+            values = rng.random(n_rows) * 1000
+            values[rng.random(n_rows) < 0.6] = np.nan
+            frame[column] = values
+
+    return pd.DataFrame(frame, columns=OWID_COLUMNS).sort_values(['location', 'date'], kind='stable')
+
+def write_owid_csv(path, scale=1.0, days=1400, seed=0, chunk_countries=500):
+    """
+    Write a synthetic OWID-shaped CSV to ``path`` and return the path.
+
+    Up to ``chunk_countries`` countries are generated at a time, which
+    bounds memory at large scales; the file is then sorted by location
+    within each chunk only.
+    """
+    n_countries = _country_count(scale)
+    if n_countries <= chunk_countries:
+        generate_owid_frame(scale, days, seed).to_csv(path, index=False, float_format='%.6g')
+        return path
+    for first in range(0, n_countries, chunk_countries):
+        chunk = generate_owid_frame(scale, days, seed, range(first, min(first + chunk_countries, n_countries)))
+        chunk.to_csv(path, mode='w' if first == 0 else 'a', header=first == 0, index=False, float_format='%.6g')
+    return path
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('path')
+    parser.add_argument('--scale', type=float, default=1.0)
+    parser.add_argument('--days', type=int, default=1400)
+    args = parser.parse_args()
+    write_owid_csv(args.path, args.scale, args.days)
@@ -1,88 +1,905 @@
+import io
+import itertools
+import json
+import os
+import threading
+import time
+import weakref
+import zlib
+import numpy as np
 import pandas as pd
 import requests
-import streamlit as st
+import urllib3
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
-import io
+from requests.adapters import HTTPAdapter
+from dataset_cache import cache_per_version
+from instrumentation import timed
+import query_engine
+
+OWID_URLS = [
+    "https://raw.githubusercontent.com/owid/covid-19-data/master/public/data/owid-covid-data.csv",
+    "https://github.com/owid/covid-19-data/raw/master/public/data/owid-covid-data.csv",
+    "https://covid.ourworldindata.org/data/owid-covid-data.csv"
+]
+
+# Continents are fixed up front: pandas cannot merge the categoricals of
+# parser chunks when one chunk (e.g. a run of aggregate rows) has none
+OWID_CONTINENTS = ['Africa', 'Asia', 'Europe', 'North America', 'Oceania', 'South America']
+
+# Only these columns are parsed from the ~67 in the OWID file.
+# Counts are parsed as float64 (exact to 2**53): the daily counts of
+# World and the continents exceed float32's exact 2**24, and would be
+# rounded before _downcast_integral checks them.
+OWID_DTYPES = {
+    'iso_code': 'category',
+    'continent': pd.CategoricalDtype(OWID_CONTINENTS),
+    'location': 'category',
+    'new_cases': 'float64',
+    'new_deaths': 'float64',
+    'new_tests': 'float64',
+    'total_cases': 'float64',
+    'total_deaths': 'float64',
+    'population': 'float64'
+}
+
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept-Encoding': 'gzip, deflate'
+}
+
+# Seconds to give a mirror before also starting the next one (0 = all at once)
+HEDGE_DELAY = float(os.environ.get('COVID_TRACKER_HEDGE_DELAY', 3))
+
+def _make_session():
+    """Session with a connection pool sized for every mirror at once."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=len(OWID_URLS), pool_maxsize=2 * len(OWID_URLS))
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+# Shared by all downloads so connections to the mirrors are reused
+SESSION = _make_session()
+
+# Cleaned data is kept on disk between restarts and revalidated upstream
+SNAPSHOT_DIR = os.environ.get(
+    'COVID_TRACKER_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+)
+SNAPSHOT_DATA = os.path.join(SNAPSHOT_DIR, 'owid-covid-data.parquet')
+SNAPSHOT_META = os.path.join(SNAPSHOT_DIR, 'owid-covid-data.json')
+SNAPSHOT_LINES = os.path.join(SNAPSHOT_DIR, 'owid-covid-data.lines.npz')
+
+@timed('parse')
+def _read_owid_csv(buffer):
+    """Parse only the required OWID columns from a file-like object."""
+    return pd.read_csv(
+        buffer,
+        usecols=['date', *OWID_DTYPES],
+        dtype=OWID_DTYPES,
+        parse_dates=['date']
+    )
+
+class _Cancelled(Exception):
+    """Raised in a mirror download that another mirror already beat."""
+
+def _line_hashes(lines):
+    """64-bit fingerprint of each raw CSV line (crc32 and adler32 side by side)."""
+    return np.fromiter(
+        ((zlib.crc32(line) << 32) | zlib.adler32(line) for line in lines),
+        dtype=np.uint64, count=len(lines)
+    )
 
-@st.cache_data(ttl=3600)  # Cache for 1 hour
-def load_covid_data():
+class _TrackingReader(io.RawIOBase):
     """
-    Load COVID-19 data from Our World in Data.
-    Uses Streamlit caching instead of local file storage.
+    Raw stream wrapper that records what a later refresh needs to fetch
+    only the changes: the byte length, the header, the last TAIL_BYTES and
+    a fingerprint of every data line.
+
+    Given the unique fingerprints of a previous download as an Index
+    ``known``, each line's position in it is recorded as well (-1 if new)
+    and the lines not among them are kept in ``fresh``. Once the ``cancel``
+    event is set, the next read raises ``_Cancelled``.
     """
-    # Try multiple URLs in case one fails
-    urls = [
-        "https://raw.githubusercontent.com/owid/covid-19-data/master/public/data/owid-covid-data.csv",
-        "https://github.com/owid/covid-19-data/raw/master/public/data/owid-covid-data.csv",
-        "https://covid.ourworldindata.org/data/owid-covid-data.csv"
-    ]
-    
-    df = None
+    TAIL_BYTES = 1024
+
+    def __init__(self, raw, known=None, cancel=None):
+        self._raw = raw
+        self._known = known
+        self._cancel = cancel
+        self._partial = b''
+        self._hashes = []
+        self._positions = []
+        self.length = 0
+        self.header = None
+        self.tail = b''
+        self.fresh = []
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._cancel is not None and self._cancel.is_set():
+            raise _Cancelled()
+        chunk = self._raw.read(len(buffer))
+        size = len(chunk)
+        buffer[:size] = chunk
+        self.length += size
+        self.tail = (self.tail + chunk)[-self.TAIL_BYTES:]
+        
+        if size:
+            lines = (self._partial + chunk).split(b'\n')
+            self._partial = lines.pop()
+        else:
+            # End of body: a last line without a newline is still a row
+            lines, self._partial = [self._partial], b''
+        if self.header is None and lines:
+            self.header = lines.pop(0).decode('utf-8').strip().split(',')
+        # The parser skips blank lines, so fingerprints line up with rows
+        lines = [line for line in lines if line.strip()]
+        hashes = _line_hashes(lines)
+        self._hashes.append(hashes)
+        if self._known is not None:
+            positions = self._known.get_indexer(hashes)
+            self._positions.append(positions)
+            self.fresh.extend(line for line, position in zip(lines, positions) if position < 0)
+        return size
+
+    def line_hashes(self):
+        return np.concatenate(self._hashes) if self._hashes else np.empty(0, dtype=np.uint64)
+
+    def known_positions(self):
+        return np.concatenate(self._positions) if self._positions else np.empty(0, dtype=np.intp)
+
+    def validators(self):
+        """Byte-level facts about the body, stored alongside the snapshot."""
+        return {'length': self.length, 'header': self.header, 'tail': self.tail.hex()}
+
+def _read_owid_lines(header, lines):
+    """Parse raw data lines of the OWID CSV, given its header."""
+    return _read_owid_csv(io.BytesIO(','.join(header).encode('utf-8') + b'\n' + b'\n'.join(lines)))
+
+def _conditional_headers(meta):
+    """Request headers that revalidate against the ETag and Last-Modified in ``meta``."""
+    headers = dict(REQUEST_HEADERS)
+    if meta.get('etag'):
+        headers['If-None-Match'] = meta['etag']
+    if meta.get('last_modified'):
+        headers['If-Modified-Since'] = meta['last_modified']
+    return headers
+
+@timed('fetch')
+def _fetch_owid_csv(url, timeout=30, validators=None, cancel=None):
+    """
+    Stream the CSV at ``url`` straight into the parser.
+
+    The body is read in chunks from the socket, so the full file never
+    exists in memory as a Python string. ``validators`` holds the ETag and
+    Last-Modified of a previous download; if the source reports the file
+    unchanged (304) no body is transferred and the frame is None.
+
+    Returns ``(df, validators)`` for the response; ``validators['lines']``
+    is the line index written next to the snapshot (see ``_line_index``).
+    Setting the ``cancel`` event aborts the download.
+    """
+    with SESSION.get(url, headers=_conditional_headers(validators or {}), timeout=timeout, stream=True) as response:
+        if response.status_code == 304:
+            return None, validators
+        response.raise_for_status()
+        # Let urllib3 undo any gzip/deflate transfer encoding while reading
+        response.raw.decode_content = True
+        body = _TrackingReader(response.raw, cancel=cancel)
+        df = _read_owid_csv(io.BufferedReader(body, 1 << 16))
+        return df, dict(
+            body.validators(),
+            url=url,
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified'),
+            lines=_line_index(body.line_hashes(), df, body.length)
+        )
+
+def _fetch_hedged(urls, snapshot_meta=None, hedge_delay=None, timeout=30):
+    """
+    Fetch the CSV from whichever mirror delivers a valid dataset first.
+
+    Mirrors start in order, each ``hedge_delay`` seconds after the previous
+    one (or as soon as one fails), so a slow mirror only delays the result
+    by the hedge delay. The first non-empty frame, or a 304 from the mirror
+    that issued ``snapshot_meta``, wins; downloads still running are
+    cancelled. Returns ``(df, meta, url)`` and raises the last error if no
+    mirror succeeds.
+    """
+    hedge_delay = HEDGE_DELAY if hedge_delay is None else hedge_delay
+    cancel = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=len(urls), thread_name_prefix='owid-mirror')
+    waiting = list(urls)
+    running = {}
     last_error = None
+    try:
+        while waiting or running:
+            if waiting:
+                url = waiting.pop(0)
+                # Validators are only meaningful for the mirror that issued them
+                validators = snapshot_meta if snapshot_meta and snapshot_meta.get('url') == url else None
+                running[executor.submit(_fetch_owid_csv, url, timeout, validators, cancel)] = url
+            done, _ = wait(running, timeout=hedge_delay if waiting else None, return_when=FIRST_COMPLETED)
+            for future in done:
+                url = running.pop(future)
+                try:
+                    df, meta = future.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                if df is not None and df.empty:
+                    last_error = ValueError(f"No rows in the data from {url}")
+                    continue
+                return df, meta, url
+    finally:
+        # Losers stop at their next read; a mirror still connecting ends by timeout
+        cancel.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+    raise last_error
+
+def _read_snapshot_meta():
+    """Return the validators stored with the snapshot, or None (also when it has other columns)."""
+    try:
+        with open(SNAPSHOT_META) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get('columns') != list(OWID_DTYPES):
+        return None
+    return meta if os.path.exists(SNAPSHOT_DATA) else None
+
+@timed('snapshot_read')
+def _read_snapshot():
+    """Return ``(df, meta)`` for the on-disk snapshot, or ``(None, None)``."""
+    meta = _read_snapshot_meta()
+    if meta is None:
+        return None, None
+    try:
+        return pd.read_parquet(SNAPSHOT_DATA), meta
+    except (OSError, ValueError, ImportError):
+        return None, None
+
+def _write_snapshot(df, meta):
+    """
+    Store the cleaned frame as Parquet next to its HTTP validators.
+
+    Files are written under temporary names and renamed into place, so a
+    reader never sees a partial snapshot. The line index in ``meta['lines']``
+    goes to its own file. Failures (read-only disk, no pyarrow) only cost
+    the next start a full download.
+    """
+    meta = dict(meta)
+    lines = meta.pop('lines', None)
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        df.to_parquet(SNAPSHOT_DATA + '.tmp', index=False)
+        with open(SNAPSHOT_META + '.tmp', 'w') as f:
+            json.dump(dict(meta, columns=list(OWID_DTYPES), saved_at=datetime.now().isoformat(timespec='seconds')), f)
+        if lines is not None:
+            with open(SNAPSHOT_LINES + '.tmp', 'wb') as f:
+                np.savez(f, **lines)
+            os.replace(SNAPSHOT_LINES + '.tmp', SNAPSHOT_LINES)
+        elif os.path.exists(SNAPSHOT_LINES):
+            os.remove(SNAPSHOT_LINES)
+        os.replace(SNAPSHOT_DATA + '.tmp', SNAPSHOT_DATA)
+        os.replace(SNAPSHOT_META + '.tmp', SNAPSHOT_META)
+    except (OSError, ValueError, ImportError):
+        pass
+
+def _line_index(hashes, rows, length):
+    """
+    Pair the fingerprint of every data line with the row parsed from it.
+
+    ``keys`` packs each row's (location, date) against ``countries`` (see
+    ``_row_keys``); ``length`` ties the index to the body it came from.
+    None if lines and rows do not correspond one to one.
+    """
+    if len(hashes) != len(rows):
+        return None
+    countries = rows['location'].cat.categories
+    return {
+        'hashes': hashes,
+        'keys': _row_keys(rows, countries, 'location'),
+        'countries': countries.to_numpy(dtype=str),
+        'length': np.int64(length)
+    }
+
+def _read_line_index(meta):
+    """Return the line index of the snapshot described by ``meta``, or None."""
+    try:
+        with np.load(SNAPSHOT_LINES) as f:
+            lines = {name: f[name] for name in f.files}
+    except (OSError, ValueError, KeyError):
+        return None
+    return lines if int(lines['length']) == meta.get('length') else None
+
+OWID_RENAMES = {
+    'location': 'country',
+    'new_cases': 'daily_cases',
+    'new_deaths': 'daily_deaths',
+    'new_tests': 'daily_tests',
+    'total_cases': 'cumulative_cases',
+    'total_deaths': 'cumulative_deaths'
+}
+
+# Counts are whole numbers; once missing values are 0 they fit in int32
+# (population exceeds that for aggregates like World, so it gets int64)
+COUNT_COLUMNS = ['daily_cases', 'daily_deaths', 'daily_tests', 'cumulative_cases', 'cumulative_deaths']
+
+def memory_footprint(df):
+    """Bytes held by ``df``, including category labels."""
+    return int(df.memory_usage(deep=True, index=False).sum())
+
+def _downcast_integral(df, column, dtypes):
+    """Store ``column`` as the first integer dtype that holds it exactly."""
+    values = df[column].to_numpy()
+    if not np.all(np.mod(values, 1) == 0):
+        return
+    low, high = (values.min(), values.max()) if len(values) else (0, 0)
+    for dtype in dtypes:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            df[column] = values.astype(dtype)
+            return
+
+@timed('clean')
+def clean_covid_data(df):
+    """
+    Rename OWID columns and derive the fields the dashboard uses.
+
+    Counts are downcast to the narrowest integer dtype that holds them and
+    derivations are done in place. ``df.attrs['memory_footprint']`` records
+    the frame size as parsed and after compaction.
+    """
+    parsed_bytes = memory_footprint(df)
+    df.rename(columns=OWID_RENAMES, inplace=True)
     
-    for url in urls:
-        try:
-            # Use requests with proper headers
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=30)
-            response.raise_for_status()
-            
-            # Read CSV from response content
-            df = pd.read_csv(io.StringIO(response.text))
-            st.success(f"✅ Successfully loaded data from: {url.split('/')[2]}")
-            break  # Success! Exit loop
-            
-        except Exception as e:
-            last_error = e
-            continue  # Try next URL
-    
-    if df is None:
-        st.error(f"❌ Failed to load COVID-19 data from all sources.")
-        st.error(f"Last error: {last_error}")
-        st.info("The data source might be temporarily unavailable. Please try again later.")
-        st.stop()
+    # Data cleaning
+    if df['country'].isna().any() or df['date'].isna().any():
+        df = df.dropna(subset=['country', 'date'])
+    for column in [*COUNT_COLUMNS, 'population']:
+        df[column] = df[column].fillna(0)
+        _downcast_integral(df, column, ['int32', 'int64'])
+    
+    # Calculate case fatality rate (0 where there are no cases)
+    deaths = df['cumulative_deaths'].to_numpy(dtype='float32')
+    cases = df['cumulative_cases'].to_numpy(dtype='float32')
+    cfr = np.zeros(len(df), dtype='float32')
+    np.divide(deaths * 100, cases, out=cfr, where=cases > 0)
+    df['cfr'] = cfr
+    
+    # One contiguous, date-ordered block per country (see _attach_country_index)
+    if not (_has_default_index(df) and _is_sorted_by_country(df)):
+        df = df.sort_values(['country', 'date'], ignore_index=True)
+    
+    df.attrs['memory_footprint'] = {'parsed': parsed_bytes, 'compact': memory_footprint(df)}
+    return df
+
+def _has_default_index(df):
+    """True when rows are labelled 0..n-1 in order, as after load."""
+    return isinstance(df.index, pd.RangeIndex) and df.index.start == 0 and df.index.step == 1
+
+def _is_sorted_by_country(df):
+    """Check that rows are ordered by country code, then date."""
+    codes = np.diff(df['country'].cat.codes.to_numpy())
+    dates = np.diff(df['date'].to_numpy())
+    return bool(np.all((codes > 0) | ((codes == 0) & (dates >= np.timedelta64(0)))))
+
+class _Offsets(tuple):
+    """
+    Row offsets of the country index.
+
+    pandas deep-copies ``attrs`` on every column access and slice; these
+    are immutable, so the copies share them instead of copying every
+    offset. Tuples rather than arrays: pandas compares attrs with == on
+    concat.
+    """
+
+    def __deepcopy__(self, memo):
+        return self
+
+# Frames each country index was built for, by the index's ``frame`` token.
+# pandas copies ``attrs`` onto every frame derived from an indexed one
+# (sorted, filtered, copied); the token tells them apart from the original.
+_INDEXED_FRAMES = weakref.WeakValueDictionary()
+_index_tokens = itertools.count()
+
+def set_country_index(df, starts, stops):
+    """
+    Set ``df.attrs['country_index']`` to the blocks ``[start, stop)``,
+    valid for ``df`` itself only.
+    """
+    token = next(_index_tokens)
+    _INDEXED_FRAMES[token] = df
+    df.attrs['country_index'] = {'frame': token, 'starts': _Offsets(starts), 'stops': _Offsets(stops)}
+
+def _attach_country_index(df):
+    """
+    Record where each country's block of rows starts and stops.
+
+    The offsets live in ``df.attrs['country_index']``, aligned with
+    the categories of ``df['country']``, which turns country lookups into
+    a category lookup plus an ``iloc`` slice instead of a full-table scan.
+    """
+    if not _has_default_index(df) or not _is_sorted_by_country(df):
+        df = df.sort_values(['country', 'date'], ignore_index=True)
+    
+    codes = df['country'].cat.codes.to_numpy()
+    bounds = np.searchsorted(codes, np.arange(len(df['country'].cat.categories) + 1))
+    set_country_index(df, bounds[:-1].tolist(), bounds[1:].tolist())
+    return df
+
+def country_bounds(data, country):
+    """
+    Return the ``(start, stop)`` rows of ``country`` from the country index.
+
+    Returns None when ``data`` has no index or is not the frame it was
+    built for (see ``has_country_index``).
+    """
+    if not has_country_index(data):
         return None
+    try:
+        code = data['country'].cat.categories.get_loc(country)
+    except KeyError:
+        return 0, 0
+    index = data.attrs['country_index']
+    return index['starts'][code], index['stops'][code]
+
+def has_country_index(data):
+    """
+    True for the very frame a country index was built for.
+
+    Frames derived from it carry a copy of the index in ``attrs`` that no
+    longer matches their rows (even with the same length, e.g. re-sorted),
+    so they are recognized by identity.
+    """
+    index = data.attrs.get('country_index')
+    return index is not None and _INDEXED_FRAMES.get(index.get('frame')) is data
+
+def uses_query_engine(data):
+    """True when queries on ``data`` (a loaded dataset) go to the DuckDB backend."""
+    return query_engine.is_enabled() and has_country_index(data) and dataset_version(data) is not None
+
+@timed('prepare')
+def prepare_dataset(df):
+    """Attach the country index and a content version to a cleaned frame."""
+    df = _attach_country_index(df)
+    df.attrs['version'] = format(int(pd.util.hash_pandas_object(df, index=False).sum()), 'x')
+    return df
+
+def dataset_version(data):
+    """
+    Return the content hash of a loaded dataset (see ``prepare_dataset``).
+
+    Structures derived from the dataset are cached under this key, so they
+    are rebuilt exactly when the data changes. None for other frames.
+    """
+    return data.attrs.get('version')
+
+class DataUnavailableError(RuntimeError):
+    """No data source could be reached and there is no snapshot to fall back on."""
+
+class StaleDataError(DataUnavailableError):
+    """
+    No data source could be reached, but a snapshot was saved earlier.
+
+    ``data`` is the prepared snapshot and ``saved_at`` when it was taken
+    (a timestamp, or None if unknown).
+    """
+
+    def __init__(self, message, data, saved_at=None):
+        super().__init__(message)
+        self.data = data
+        self.saved_at = saved_at
+
+def fetch_covid_data(allow_stale=True):
+    """
+    Load the dataset without touching the page, so it can run off-session.
+
+    Returns ``(df, notices)`` where ``notices`` are ``(level, message)``
+    pairs for ``st``. When every source fails the snapshot is served with
+    a warning, or raised as StaleDataError with ``allow_stale=False`` (so
+    the refresher counts the failure); raises DataUnavailableError when
+    there is no snapshot.
+    """
+    snapshot_meta = _read_snapshot_meta()
+    last_error = None
     
-    # Select relevant columns
-    required_columns = ['iso_code', 'continent', 'location', 'date', 'new_cases', 
-                       'new_deaths', 'total_cases', 'total_deaths', 'population']
+    try:
+        df, meta, url = _fetch_hedged(OWID_URLS, snapshot_meta)
+        if df is None:
+            df, _ = _read_snapshot()
+            if df is not None:
+                return prepare_dataset(df), [('success', f"✅ Data unchanged at {url.split('/')[2]}, loaded local snapshot")]
+            # Snapshot vanished since revalidation; fetch in full
+            df, meta = _fetch_owid_csv(url)
+        
+        df = clean_covid_data(df)
+        _write_snapshot(df, meta)
+        return prepare_dataset(df), [('success', f"✅ Successfully loaded data from: {url.split('/')[2]}")]
+    except Exception as e:
+        last_error = e
     
-    # Check if all required columns exist
-    missing_cols = [col for col in required_columns if col not in df.columns]
-    if missing_cols:
-        st.error(f"Missing columns in data: {missing_cols}")
-        st.stop()
+    # Every source failed; a stale snapshot is better than nothing
+    df, meta = _read_snapshot()
+    if df is not None:
+        if not allow_stale:
+            saved_at = datetime.fromisoformat(meta['saved_at']).timestamp() if meta.get('saved_at') else None
+            raise StaleDataError(str(last_error), prepare_dataset(df), saved_at) from last_error
+        return prepare_dataset(df), [
+            ('warning', f"⚠️ Could not reach the data sources, showing snapshot saved {meta.get('saved_at', 'earlier')}.")
+        ]
+    raise DataUnavailableError(str(last_error)) from last_error
+
+def _row_keys(df, countries, column='country'):
+    """Pack each row's (country, date) into one int64; ``countries`` fixes the codes."""
+    codes = df[column].cat.set_categories(countries).cat.codes.to_numpy().astype('int64')
+    days = df['date'].to_numpy().astype('datetime64[D]').astype('int64')
+    return (codes << 32) | days
+
+def _recode_keys(keys, countries, target):
+    """Re-express keys packed against ``countries`` in terms of ``target``."""
+    codes = pd.Index(target).get_indexer(countries).astype('int64')[keys >> 32]
+    return (codes << 32) | (keys & 0xFFFFFFFF)
+
+def _unpack_keys(keys, countries):
+    """The (country, date) rows behind packed keys."""
+    return pd.DataFrame({
+        'country': pd.Categorical.from_codes(keys >> 32, categories=countries),
+        'date': pd.to_datetime(keys & 0xFFFFFFFF, unit='D')
+    })
+
+def _in_sorted(values, sorted_values):
+    """``np.isin`` against an already sorted array, by binary search."""
+    if not len(sorted_values):
+        return np.zeros(len(values), dtype=bool)
+    position = np.minimum(np.searchsorted(sorted_values, values), len(sorted_values) - 1)
+    return sorted_values[position] == values
+
+def _extend_line_index(index, hashes, rows, length):
+    """Line index of a body made of the indexed one plus ``rows`` appended."""
+    appended = _line_index(hashes, rows, length)
+    if index is None or appended is None:
+        return None
+    countries = pd.Index(index['countries']).union(appended['countries'])
+    return {
+        'hashes': np.concatenate([index['hashes'], hashes]),
+        'keys': np.concatenate([
+            _recode_keys(index['keys'], index['countries'], countries),
+            _recode_keys(appended['keys'], appended['countries'], countries)
+        ]),
+        'countries': countries.to_numpy(dtype=str),
+        'length': np.int64(length)
+    }
+
+def _fetch_appended_rows(meta, index, timeout=30):
+    """
+    Fetch only the rows appended to the CSV since the snapshot was taken.
+
+    Requests the bytes from just before the stored end of file with an HTTP
+    range and checks that they start with the stored tail, so a rewritten
+    file is not mistaken for an append. Returns ``(rows, meta)`` with the
+    raw appended rows (rows is None if the source reports the file
+    unchanged), or None when the source ignores ranges or the file changed
+    other than by appending.
+    """
+    tail = bytes.fromhex(meta.get('tail', ''))
+    if not meta.get('length') or not meta.get('header') or not tail.endswith(b'\n'):
         return None
     
-    df = df[required_columns]
+    # Byte offsets refer to the decoded file, so ask for it uncompressed
+    headers = _conditional_headers(meta)
+    headers['Range'] = f"bytes={meta['length'] - len(tail)}-"
+    headers['Accept-Encoding'] = 'identity'
+    with SESSION.get(meta['url'], headers=headers, timeout=timeout, stream=True) as response:
+        if response.status_code == 304:
+            return None, meta
+        if response.status_code != 206:
+            return None  # 200 (ranges ignored) or 416 (file shrank)
+        body = response.content
     
-    # Rename for clarity
-    df.rename(columns={
-        'location': 'country',
-        'new_cases': 'daily_cases',
-        'new_deaths': 'daily_deaths',
-        'total_cases': 'cumulative_cases',
-        'total_deaths': 'cumulative_deaths'
-    }, inplace=True)
+    appended = body[len(tail):]
+    if not body.startswith(tail) or not appended:
+        return None  # Rewritten, or edited without growing
+    lines = [line for line in appended.split(b'\n') if line.strip()]
+    rows = _read_owid_lines(meta['header'], lines)
+    length = meta['length'] + len(appended)
+    return rows, dict(
+        meta,
+        length=length,
+        tail=body[-_TrackingReader.TAIL_BYTES:].hex(),
+        etag=response.headers.get('ETag'),
+        last_modified=response.headers.get('Last-Modified'),
+        lines=_extend_line_index(index, _line_hashes(lines), rows, length)
+    )
+
+def _fetch_changed_rows(meta, index, timeout=30):
+    """
+    Download the CSV but parse only the lines that changed.
+
+    Every line of the new body is fingerprinted while streaming; lines
+    whose fingerprint is in the snapshot's line ``index`` are unchanged and
+    skipped. Returns ``(rows, removed, meta)``: the raw rows of new or
+    edited lines, the (country, date) of rows whose lines are gone without
+    a replacement, and the validators with the new line index. ``rows`` is
+    None if the source reports the file unchanged.
+    """
+    with SESSION.get(meta['url'], headers=_conditional_headers(meta), timeout=timeout, stream=True) as response:
+        if response.status_code == 304:
+            return None, None, meta
+        response.raise_for_status()
+        response.raw.decode_content = True
+        # Identical lines share a fingerprint and a key, so keep one of each
+        known, first = np.unique(index['hashes'], return_index=True)
+        body = _TrackingReader(response.raw, known=pd.Index(known))
+        buffer = bytearray(1 << 20)
+        while body.readinto(buffer):
+            pass
     
-    # Data cleaning
-    df['date'] = pd.to_datetime(df['date'])
-    df = df.dropna(subset=['country', 'date'])
-    df = df.fillna(0)
+    rows = _read_owid_lines(body.header, body.fresh)
+    hashes = body.line_hashes()
+    countries = pd.Index(index['countries']).union(rows['location'].cat.categories)
+    old_keys = _recode_keys(index['keys'], index['countries'], countries)
+    fresh_keys = _row_keys(rows, countries, 'location')
+    
+    # Rows whose line vanished and that no changed line re-supplies
+    gone = old_keys[~pd.Index(index['hashes']).isin(hashes)]
+    removed = _unpack_keys(gone[~_in_sorted(gone, np.sort(fresh_keys))], countries)
+    
+    lines = None
+    positions = body.known_positions()
+    fresh = positions < 0
+    if fresh.sum() == len(rows):
+        # Unchanged lines keep their key; changed ones take the parsed key
+        keys = np.empty(len(hashes), dtype='int64')
+        keys[fresh] = fresh_keys
+        keys[~fresh] = old_keys[first][positions[~fresh]]
+        lines = {'hashes': hashes, 'keys': keys, 'countries': countries.to_numpy(dtype=str), 'length': np.int64(body.length)}
+    
+    return rows, removed, dict(
+        meta,
+        **body.validators(),
+        etag=response.headers.get('ETag'),
+        last_modified=response.headers.get('Last-Modified'),
+        lines=lines
+    )
+
+def _apply_delta(old, rows, removed=None):
+    """
+    Patch the cleaned frame ``old`` with new or corrected raw ``rows``.
+
+    Only ``rows`` are cleaned (``cfr`` and the 0-filled counts are row-local),
+    and old rows are matched only inside the blocks of the countries
+    involved. Rows of ``old`` sharing a (country, date) with ``rows`` or
+    listed in ``removed`` are dropped. Returns ``(df, changes)`` with the
+    prepared frame and counts for ``refresh_covid_data``.
+    """
+    footprint = old.attrs.get('memory_footprint')
+    old = _attach_country_index(old)
+    delta = clean_covid_data(rows)
+    if removed is None:
+        removed = old[['country', 'date']].iloc[:0]
+    
+    countries = old['country'].cat.categories.union(delta['country'].cat.categories)
+    affected = set(delta['country'].unique()) | set(removed['country'].unique())
+    blocks = [country_bounds(old, country) for country in affected]
+    positions = np.concatenate([np.arange(start, stop) for start, stop in blocks] or [np.empty(0, dtype=int)])
+    dropped = np.sort(np.concatenate([_row_keys(delta, countries), _row_keys(removed, countries)]))
+    replaced = _in_sorted(_row_keys(old.iloc[positions], countries), dropped)
+    keep = np.ones(len(old), dtype=bool)
+    keep[positions[replaced]] = False
     
-    # Calculate case fatality rate
-    df['cfr'] = (df['cumulative_deaths'] / df['cumulative_cases'] * 100).replace([float('inf'), -float('inf')], 0)
+    old = old[keep]
+    old.attrs = {}  # Stale now, and deep-copied on every column access
+    delta = delta[old.columns]
+    for column in old.columns:
+        if isinstance(old[column].dtype, pd.CategoricalDtype):
+            categories = old[column].cat.categories.union(delta[column].cat.categories).sort_values()
+            old = old.assign(**{column: old[column].cat.set_categories(categories)})
+            delta = delta.assign(**{column: delta[column].cat.set_categories(categories)})
     
+    # An empty delta parses with generic dtypes; leave it out
+    df = pd.concat([old, delta], ignore_index=True) if len(delta) else old.reset_index(drop=True)
+    df = _match_full_load(df)
+    df.attrs = {'memory_footprint': dict(footprint or {}, compact=memory_footprint(df))}
+    return prepare_dataset(df), {'rows': len(delta), 'removed': len(removed), 'countries': len(affected)}
+
+def _match_full_load(df):
+    """
+    Give the patched frame ``df`` the dtypes a full load of its rows has.
+
+    Parsed categories are the sorted labels in use (a new country changes
+    the codes, so ``prepare_dataset`` re-sorts the rows). Counts are
+    downcast again: concat widens to the wider of the two dtypes, and the
+    rows that needed int64 or float may be gone.
+    """
+    sources = {column: source for source, column in OWID_RENAMES.items()}
+    for column in df.columns:
+        parsed = OWID_DTYPES.get(sources.get(column, column))
+        if parsed == 'category':
+            df[column] = df[column].cat.remove_unused_categories()
+        elif column in COUNT_COLUMNS or column == 'population':
+            if df[column].dtype.kind == 'f':
+                df[column] = df[column].astype(parsed)
+            if df[column].dtype != 'int32':
+                _downcast_integral(df, column, ['int32', 'int64'])
     return df
 
-def filter_by_country(data, country):
-    """Filter data for a specific country."""
-    filtered = data[data['country'] == country].sort_values('date').copy()
+# Failures of an incremental refresh (source unreachable or misbehaving,
+# unexpected CSV); anything else is a bug and is not hidden by a full reload
+_DELTA_ERRORS = (requests.RequestException, urllib3.exceptions.HTTPError, OSError, ValueError, KeyError)
+
+def refresh_covid_data(current=None):
+    """
+    Bring the snapshot up to date, transferring and parsing as little as possible.
+
+    Tries, in order: an HTTP range request for just the bytes appended to
+    the CSV (which also revalidates), then a full download in which only
+    lines that differ from the previous one are parsed. Changed rows are
+    cleaned and patched into the snapshot. Without a snapshot this is a
+    normal full load. Raises StaleDataError if no source can be reached
+    (DataUnavailableError without a snapshot).
+
+    Returns ``(df, summary)``: the updated dataset (``current``, the
+    dataset being served, if given and nothing changed upstream) and
+    ``mode`` (unchanged, append, diff or full), ``rows`` added or changed,
+    ``removed`` rows, ``countries`` affected, ``notices`` (``(level,
+    message)`` pairs like ``fetch_covid_data``'s) and ``seconds``.
+    """
+    started = time.perf_counter()
+    old, meta = _read_snapshot()
+    result = None
+    if old is not None and meta.get('url'):
+        try:
+            result = _refresh_snapshot(old, meta, current)
+        except _DELTA_ERRORS:
+            result = None  # Reload in full
+    if result is None:
+        df, notices = fetch_covid_data(allow_stale=False)
+        result = df, {
+            'mode': 'full', 'rows': len(df), 'removed': 0, 'countries': int(df['country'].nunique()),
+            'notices': notices
+        }
+    else:
+        host = meta['url'].split('/')[2]
+        result[1]['notices'] = [('success', f"✅ Data unchanged at {host}" if result[1]['mode'] == 'unchanged'
+                                 else f"✅ Updated {result[1]['rows']:,} rows from {host}")]
+    df, summary = result
+    summary['seconds'] = round(time.perf_counter() - started, 3)
+    return df, summary
+
+def _refresh_snapshot(old, meta, current=None):
+    """
+    Apply the cheapest available update to the snapshot ``old``.
+
+    Returns ``(df, summary)``, or None if there is no incremental update.
+    """
+    def unchanged():
+        return (prepare_dataset(old) if current is None else current), {
+            'mode': 'unchanged', 'rows': 0, 'removed': 0, 'countries': 0
+        }
+    index = _read_line_index(meta)
     
-    # Replace NaN with 0
-    filtered = filtered.fillna(0)
+    appended = _fetch_appended_rows(meta, index)
+    if appended is not None:
+        rows, new_meta = appended
+        if rows is None:
+            return unchanged()
+        df, changes = _apply_delta(old, rows)
+        _write_snapshot(df, new_meta)
+        return df, dict(changes, mode='append')
+    
+    if index is None:
+        return None
+    rows, removed, new_meta = _fetch_changed_rows(meta, index)
+    if rows is None:
+        return unchanged()
+    if rows.empty and removed.empty:
+        # New upstream version with the same content
+        _write_snapshot(old, new_meta)
+        return unchanged()
+    df, changes = _apply_delta(old, rows, removed)
+    _write_snapshot(df, new_meta)
+    return df, dict(changes, mode='diff')
+
+def _day(value, ceil=False):
+    """Days since 1970 of a date; ``ceil`` moves a time of day on to the next day."""
+    moment = pd.Timestamp(value).to_datetime64()
+    day = moment.astype('datetime64[D]')
+    return int(day.astype('int64')) + int(ceil and day != moment)
+
+@cache_per_version(max_entries=2)
+def _cached_date_keys(data, version):
+    keys = _date_keys(data)
+    keys.setflags(write=False)
+    return keys
+
+def _date_keys(data):
+    """
+    Pack each row's (country code, day) into one int64.
+
+    Rows are grouped by country and sorted by date within each block, so
+    the keys are sorted and a date range within any country is two
+    binary searches.
+    """
+    codes = data['country'].cat.codes.to_numpy().astype('int64')
+    return (codes << 32) | data['date'].to_numpy().astype('datetime64[D]').astype('int64')
+
+def _date_range_bounds(data, codes, start_date, end_date):
+    """
+    ``(starts, stops)`` rows of the countries ``codes`` dated within
+    ``[start_date, end_date]`` (either may be None for open-ended).
+
+    ``data`` must carry a country index; its keys are built once per
+    dataset version.
+    """
+    version = dataset_version(data)
+    keys = _date_keys(data) if version is None else _cached_date_keys(data, version)
+    first = 0 if start_date is None else min(max(_day(start_date, ceil=True), 0), 0xFFFFFFFF)
+    last = 0xFFFFFFFF if end_date is None else min(max(_day(end_date), -1), 0xFFFFFFFF)
+    codes = np.asarray(codes, dtype='int64') << 32
+    starts = np.searchsorted(keys, codes | first, 'left')
+    stops = starts if last < 0 else np.searchsorted(keys, codes | last, 'right')
+    return starts, np.maximum(starts, stops)
+
+def _country_blocks(data, countries, date_range=None):
+    """
+    ``(starts, stops)`` rows of each of ``countries`` in an indexed frame,
+    cut to ``date_range`` (start, end) if given; empty for unknown countries.
+    """
+    codes = data['country'].cat.categories.get_indexer(countries)
+    known = codes >= 0
+    starts = np.zeros(len(codes), dtype='int64')
+    stops = np.zeros(len(codes), dtype='int64')
+    if date_range is None:
+        index = data.attrs['country_index']
+        starts[known] = np.take(index['starts'], codes[known])
+        stops[known] = np.take(index['stops'], codes[known])
+    else:
+        starts[known], stops[known] = _date_range_bounds(data, codes[known], *date_range)
+    return starts, stops
+
+def _block_positions(starts, stops):
+    """Row positions covered by the ``[start, stop)`` blocks, in order."""
+    lengths = np.asarray(stops) - np.asarray(starts)
+    offsets = np.cumsum(lengths) - lengths
+    return np.repeat(np.asarray(starts) - offsets, lengths) + np.arange(lengths.sum())
+
+@timed('filter')
+def filter_by_country(data, country, date_range=None):
+    """
+    Filter data for a specific country, optionally within ``date_range`` (start, end).
+
+    Loaded datasets carry a country index, so this is a
+    slice of the country's rows rather than a scan and copy of the table;
+    a date range narrows the slice by binary search.
+    """
+    if uses_query_engine(data):
+        return query_engine.filter_by_country(data, country, date_range)
+    if has_country_index(data):
+        # Already sorted, 0-filled and cleaned at load time
+        starts, stops = _country_blocks(data, [country], date_range)
+        return data.iloc[starts[0]:stops[0]]
+    
+    filtered = _scan_country(data, country)
+    return filtered if date_range is None else filter_by_date_range(filtered, *date_range)
+
+def _scan_country(data, country):
+    """``filter_by_country`` for frames without a country index."""
+    mask = data['country'] == country
+    if dataset_version(data) is not None and mask.all() and data['date'].is_monotonic_increasing:
+        # Rows of a loaded frame (already cleaned) that hold just this country
+        return data
+    
+    filtered = data[mask].sort_values('date').copy()
+    
+    # Replace NaN with 0 (categorical text columns keep their missing values)
+    numeric_columns = filtered.select_dtypes('number').columns
+    filtered[numeric_columns] = filtered[numeric_columns].fillna(0)
     
     # Only keep rows where we have at least cumulative data
     # Don't filter out rows with 0 daily cases - those are valid!
@@ -90,13 +907,172 @@ def filter_by_country(data, country):
     
     return filtered
 
+@timed('filter')
+def select_countries(data, countries, date_range=None):
+    """
+    Fetch the rows of several countries in one pass.
+
+    Returns ``(rows, blocks)``: ``rows`` holds each country's date-ordered
+    rows back to back in the order given, and ``blocks`` maps each country
+    to its ``(start, stop)`` positions in ``rows`` (empty if it has no data).
+    ``date_range`` (start, end) keeps only the rows within it; on indexed
+    frames each block is cut by binary search before anything is copied.
+    """
+    countries = list(dict.fromkeys(countries))
+    
+    if uses_query_engine(data):
+        rows, lengths = query_engine.select_countries(data, countries, date_range)
+    elif has_country_index(data):
+        # Gather the indexed blocks; cost is proportional to the rows selected
+        starts, stops = _country_blocks(data, countries, date_range)
+        rows = data.take(_block_positions(starts, stops))
+        lengths = (stops - starts).tolist()
+    else:
+        rows = data[data['country'].isin(countries)]
+        if date_range is not None:
+            rows = filter_by_date_range(rows, *date_range)
+        order = pd.Categorical(rows['country'].astype(str), categories=countries).codes
+        rows = rows.iloc[np.lexsort((rows['date'].to_numpy(), order))].copy()
+        numeric_columns = rows.select_dtypes('number').columns
+        rows[numeric_columns] = rows[numeric_columns].fillna(0)
+        lengths = np.bincount(order, minlength=len(countries)).tolist()
+    
+    stops = np.cumsum(lengths)
+    blocks = {country: (int(stop - length), int(stop)) for country, length, stop in zip(countries, lengths, stops)}
+    return rows.reset_index(drop=True), blocks
+
+@timed('filter')
 def filter_by_date_range(data, start_date, end_date):
-    """Filter data for a date range."""
-    return data[(data['date'] >= start_date) & (data['date'] <= end_date)]
+    """
+    Filter data for a date range (both ends included).
+
+    Loaded datasets are cut by binary search within each
+    country's block and frames already in date order (such as one
+    country's rows) by one search over their dates, so only the result is
+    copied; a contiguous result is a slice of ``data``. Other frames are
+    compared row by row.
+    """
+    if uses_query_engine(data):
+        return query_engine.filter_by_date_range(data, start_date, end_date)
+    if has_country_index(data):
+        codes = np.arange(len(data['country'].cat.categories))
+        starts, stops = _date_range_bounds(data, codes, start_date, end_date)
+        nonempty = stops > starts
+        if nonempty.sum() <= 1:
+            return data.iloc[starts[nonempty].sum():stops[nonempty].sum()]
+        return data.take(_block_positions(starts, stops))
+    
+    dates = data['date']
+    if dates.is_monotonic_increasing:
+        values = dates.to_numpy()
+        start = values.searchsorted(pd.Timestamp(start_date).to_datetime64(), 'left')
+        stop = values.searchsorted(pd.Timestamp(end_date).to_datetime64(), 'right')
+        return data.iloc[start:max(start, stop)]
+    return data[(dates >= start_date) & (dates <= end_date)]
 
+@timed('filter')
 def get_latest_metrics(data, country):
     """Get latest metrics for a country."""
+    if uses_query_engine(data):
+        return query_engine.get_latest_metrics(data, country)
+    bounds = country_bounds(data, country)
+    if bounds is not None:
+        start, stop = bounds
+        return data.iloc[stop - 1] if stop > start else None
+    
     country_data = filter_by_country(data, country)
     if country_data.empty:
         return None
     return country_data.iloc[-1]
+
+def get_date_rows(data, selected_date):
+    """
+    Positions of the rows dated ``selected_date``, at most one per country.
+
+    Loaded frames are searched per country over their (country, date)
+    keys; other frames are compared row by row.
+    """
+    if has_country_index(data):
+        codes = np.arange(len(data['country'].cat.categories))
+        starts, stops = _date_range_bounds(data, codes, selected_date, selected_date)
+        return starts[stops > starts]
+    return np.flatnonzero((data['date'] == pd.Timestamp(selected_date)).to_numpy())
+
+# Metrics shown on the Global Map, kept as dense date x country matrices
+MAP_COLUMNS = ['cumulative_cases', 'cumulative_deaths', 'cfr']
+
+@timed('aggregate')
+def _build_date_partitions(data):
+    """
+    Pivot the map metrics into dense (date, country) matrices.
+
+    ``present`` marks the cells that had a row in ``data``, so a single
+    date's map is one matrix row instead of a scan of the whole table.
+    """
+    countries = data['country'].astype('category')
+    dates = pd.DatetimeIndex(data['date'].unique()).sort_values()
+    
+    row = dates.get_indexer(data['date'])
+    col = countries.cat.codes.to_numpy()
+    shape = (len(dates), len(countries.cat.categories))
+    
+    present = np.zeros(shape, dtype=bool)
+    present[row, col] = True
+    matrices = {}
+    for column in MAP_COLUMNS:
+        matrix = np.full(shape, np.nan)
+        matrix[row, col] = data[column].to_numpy()
+        matrices[column] = matrix
+    
+    # iso_code of each country (first row of its block)
+    iso_codes = pd.Series(data['iso_code'].to_numpy(), index=col).groupby(level=0).first()
+    
+    return {
+        'dates': dates,
+        'date_options': list(dates),
+        'countries': countries.cat.categories,
+        'iso_codes': iso_codes.reindex(range(shape[1])).to_numpy(),
+        'present': present,
+        'matrices': matrices
+    }
+
+@cache_per_version(max_entries=2)
+def _cached_date_partitions(data, version):
+    return _build_date_partitions(data)
+
+def get_date_partitions(data):
+    """
+    Return the date-partitioned view of ``data``.
+
+    Built once per dataset version and shared by all sessions; other
+    frames (including ones derived from a loaded dataset) are partitioned
+    on every call.
+    """
+    version = dataset_version(data)
+    if version is None or not has_country_index(data):
+        return _build_date_partitions(data)
+    return _cached_date_partitions(data, version)
+
+def get_date_snapshot(data, selected_date):
+    """
+    Return one row per country for ``selected_date``.
+
+    Equivalent to ``data[data['date'] == selected_date]`` deduplicated by
+    country, read from the date partitions in O(countries).
+    """
+    if uses_query_engine(data):
+        return query_engine.get_date_snapshot(data, selected_date, MAP_COLUMNS)
+    partitions = get_date_partitions(data)
+    position = partitions['dates'].get_indexer([selected_date])[0]
+    if position < 0:
+        return pd.DataFrame(columns=['country', 'iso_code', 'date', *MAP_COLUMNS])
+    
+    present = partitions['present'][position]
+    snapshot = pd.DataFrame({
+        'country': partitions['countries'][present],
+        'iso_code': partitions['iso_codes'][present],
+        'date': partitions['dates'][position]
+    })
+    for column, matrix in partitions['matrices'].items():
+        snapshot[column] = matrix[position, present]
+    return snapshot
@@ -0,0 +1,64 @@
+"""
+Process-wide caches of structures derived from a dataset version.
+
+The computation modules (``data_fetcher``, ``metrics``, ``rollups``,
+``query_engine``, ``table_export``, ``page_state``) build these once per
+data version and share them between sessions and threads, without
+Streamlit, so the API, tests and benchmarks use the same caches as the
+dashboard.
+"""
+import functools
+import threading
+from collections import OrderedDict
+
+class VersionCache:
+    """
+    Bounded LRU of ``build(data, version, *args)`` results keyed on
+    ``(version, *args)``; ``data`` itself is not part of the key.
+
+    Each key is built once: concurrent callers wait for the first build
+    instead of repeating it (other keys are not held up).
+    """
+
+    def __init__(self, build, max_entries=2):
+        self.max_entries = max_entries
+        self._build = build
+        self._entries = OrderedDict()
+        self._building = {}  # key -> lock held while it is built
+        self._lock = threading.Lock()
+
+    def _lookup(self, key):
+        """``(value, None)`` on a hit, else ``(None, lock of the key's build)``; call with the lock held."""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key], None
+        return None, self._building.setdefault(key, threading.Lock())
+
+    def __call__(self, data, version, *args):
+        key = (version, *args)
+        with self._lock:
+            value, building = self._lookup(key)
+        if building is None:
+            return value
+        with building:
+            with self._lock:
+                value, building = self._lookup(key)
+            if building is None:  # built by the caller we waited for
+                return value
+            value = self._build(data, version, *args)
+            with self._lock:
+                self._entries[key] = value
+                self._building.pop(key, None)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+def cache_per_version(max_entries=2):
+    """Decorator turning ``fn(data, version, *args)`` into a ``VersionCache``."""
+    def decorate(fn):
+        return functools.update_wrapper(VersionCache(fn, max_entries), fn)
+    return decorate
@@ -0,0 +1,220 @@
+import os
+import threading
+import time
+import streamlit as st
+from data_fetcher import (
+    DataUnavailableError, StaleDataError, dataset_version, refresh_covid_data
+)
+from instrumentation import count, timed
+from rollups import get_rollups
+from shared_dataset import SHARED_DATASET, published_dataset, share_dataset
+from sources import ENABLED_SOURCES, build_from_sources
+
+# Seconds between background refreshes of the dataset
+REFRESH_INTERVAL = float(os.environ.get('COVID_TRACKER_REFRESH_INTERVAL', 3600))
+
+# First retry after a failed refresh; doubles up to REFRESH_INTERVAL
+RETRY_DELAY = 60
+
+class DatasetRefresher:
+    """
+    Holds the current dataset and rebuilds it in a background thread.
+
+    Page renders always get the dataset already in memory: a refresh
+    builds the next version off to the side and swaps it in with a single
+    assignment, so readers see either the old or the new frame and never
+    wait for a download. Only the first load in a process, when there is
+    nothing to serve yet, runs in the calling request.
+
+    ``build(force, current)`` returns ``(df, summary)`` with a summary
+    like ``refresh_covid_data``'s (its ``notices`` are shown with the
+    freshness stats); ``force`` is set for user-requested
+    refreshes and ``current`` is the dataset being served (None at first).
+    A build that can only offer a saved snapshot raises StaleDataError:
+    it counts as a failure, and the snapshot is served only if there is
+    nothing else yet. A build that is partly from older copies (a warning
+    among its notices) is served but also counts as a failure, and its
+    summary's ``saved_at`` is the age of the data.
+    """
+
+    def __init__(self, build, interval=REFRESH_INTERVAL, retry_delay=RETRY_DELAY):
+        self.interval = interval
+        self.retry_delay = retry_delay
+        self._build = build
+        self._data = None
+        self._lock = threading.Lock()          # Guards the counters below
+        self._refresh_lock = threading.Lock()  # One refresh at a time
+        self._stop = threading.Event()
+        self._thread = None
+        self.refreshed_at = None
+        self.last_duration = None
+        self.last_summary = None
+        self.notices = []
+        self.refreshes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_error = None
+
+    def start(self):
+        """Start the background thread (once) and return self."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='dataset-refresher', daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def current(self):
+        """The dataset being served, or None before the first load."""
+        return self._data
+
+    def get(self):
+        """The current dataset; blocks only until the very first load is done."""
+        if self._data is None:
+            with self._refresh_lock:
+                if self._data is None:
+                    try:
+                        self._refresh(force=False)
+                    except StaleDataError:
+                        pass  # Serving the saved snapshot; counted as a failure
+        return self._data
+
+    def refresh(self, force=False):
+        """Build a new version now and swap it in. Returns the build summary; raises on failure."""
+        with self._refresh_lock:
+            return self._refresh(force)
+
+    @timed('refresh')
+    def _refresh(self, force):
+        started = time.perf_counter()
+        try:
+            data, summary = self._build(force, self._data)
+            # Derived views are built before the swap, not by the first render
+            get_rollups(data)
+        except Exception as e:
+            count('refresh_failure')
+            with self._lock:
+                self.failures += 1
+                self.consecutive_failures += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                self.notices = []
+                if isinstance(e, StaleDataError) and self._data is None:
+                    # Nothing to serve yet; its age is the snapshot's
+                    self._data = e.data
+                    self.refreshed_at = e.saved_at
+                    self.last_duration = time.perf_counter() - started
+                    self.last_summary = {'mode': 'stale'}
+            raise
+        problems = [message for level, message in summary.get('notices', []) if level != 'success']
+        if problems:
+            count('refresh_failure')
+        with self._lock:
+            self._data = data
+            self.refreshed_at = summary.get('saved_at') or time.time()
+            self.last_duration = time.perf_counter() - started
+            self.last_summary = summary
+            self.notices = list(summary.get('notices', []))
+            if problems:
+                # Served, but partly from older copies
+                self.failures += 1
+                self.consecutive_failures += 1
+                self.last_error = '; '.join(problems)
+            else:
+                self.refreshes += 1
+                self.consecutive_failures = 0
+        return summary
+
+    def _next_delay(self):
+        """Seconds until the next background refresh is due."""
+        with self._lock:
+            if self.consecutive_failures:
+                return min(self.retry_delay * 2 ** (self.consecutive_failures - 1), self.interval)
+            if self.refreshed_at is None:
+                return 0
+            return max(self.refreshed_at + self.interval - time.time(), 0)
+
+    def _run(self):
+        while True:
+            attempts = self.refreshes + self.failures
+            if self._stop.wait(self._next_delay()):
+                return
+            with self._refresh_lock:
+                # A page render or the Refresh button may have refreshed meanwhile
+                if self.refreshes + self.failures != attempts:
+                    continue
+                try:
+                    self._refresh(force=False)
+                except Exception:
+                    pass  # Counted in stats(); keep serving the previous version
+
+    def stats(self):
+        """Freshness and health counters for the sidebar and alerting."""
+        next_refresh_in = self._next_delay()
+        with self._lock:
+            return {
+                'version': dataset_version(self._data) if self._data is not None else None,
+                'refreshed_at': self.refreshed_at,
+                'age_seconds': time.time() - self.refreshed_at if self.refreshed_at else None,
+                'last_refresh_seconds': self.last_duration,
+                'last_refresh_mode': (self.last_summary or {}).get('mode'),
+                'notices': list(self.notices),
+                'next_refresh_in': next_refresh_in,
+                'refreshes': self.refreshes,
+                'failures': self.failures,
+                'consecutive_failures': self.consecutive_failures,
+                'last_error': self.last_error
+            }
+
+def _build_private(force, current=None):
+    """Patch the snapshot with upstream changes and serve the result (or merge the configured sources)."""
+    if ENABLED_SOURCES != ['owid']:
+        return build_from_sources(force)
+    return refresh_covid_data(current)
+
+def _build_shared(force, current=None):
+    """Like ``_build_private``, but reuse or publish the host-wide shared copy."""
+    if not force:
+        # Another worker process may have refreshed and published already
+        data = published_dataset(REFRESH_INTERVAL)
+        if data is not None:
+            return data, {
+                'mode': 'published', 'rows': 0, 'removed': 0, 'countries': 0,
+                'notices': [('success', "✅ Loaded the copy published by another worker")]
+            }
+    data, summary = _build_private(force, current)
+    try:
+        data = share_dataset(data)
+    except OSError:
+        pass  # Serve the private copy; the next refresh publishes again
+    return data, summary
+
+def create_refresher(interval=REFRESH_INTERVAL):
+    """A refresher for the configured dataset mode (not started)."""
+    return DatasetRefresher(_build_shared if SHARED_DATASET else _build_private, interval)
+
+@st.cache_resource
+def get_refresher():
+    """The process-wide refresher, started on first use."""
+    return create_refresher().start()
+
+def report_unavailable(error):
+    """Explain on the page that no data could be loaded, and stop the script."""
+    st.error("❌ Failed to load COVID-19 data from all sources.")
+    st.error(f"Last error: {error}")
+    st.info("The data source might be temporarily unavailable. Please try again later.")
+    st.stop()
+
+@timed('load')
+def load_current_dataset():
+    """
+    Return the dataset for this page render.
+
+    Served from the background refresher, so expired data never blocks a
+    render; stops the page with an explanation if no data can be loaded.
+    """
+    try:
+        return get_refresher().get()
+    except DataUnavailableError as e:
+        report_unavailable(e)
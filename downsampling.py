@@ -0,0 +1,116 @@
+import os
+import numpy as np
+
+# Upper bound on points sent to the browser per trace
+MAX_POINTS_PER_TRACE = int(os.environ.get('COVID_TRACKER_MAX_POINTS', 600))
+
+# Share of the budget kept for points outside the visible date range
+CONTEXT_SHARE = 0.1
+
+def _as_float(values):
+    """Return values as float64, with datetimes as nanoseconds."""
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        values = values.astype('datetime64[ns]').astype('int64')
+    return values.astype(float)
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Returns the sorted positions of ``n_out`` points that preserve the
+    visual shape of the series; first and last points are always kept.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Offset x so nanosecond timestamps keep their precision in the sums
+    x = _as_float(x)
+    x -= x[0]
+    y = _as_float(y)
+    # n_out - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    sizes = np.diff(edges)
+
+    # Third triangle vertex: the average of the following bucket (the
+    # last point for the final bucket), computed for all buckets at once
+    avg_x = np.append(np.add.reduceat(x, edges[:-1]) / sizes, x[-1])[1:]
+    avg_y = np.append(np.add.reduceat(y, edges[:-1]) / sizes, y[-1])[1:]
+
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    # Buckets are usually a handful of points, where plain Python floats
+    # beat per-bucket NumPy calls; large buckets use NumPy
+    xs, ys = x.tolist(), y.tolist()
+    previous = 0
+    for i in range(n_out - 2):
+        start, stop = int(edges[i]), int(edges[i + 1])
+        ax, ay, bx, by = xs[previous], ys[previous], avg_x[i], avg_y[i]
+        if stop - start > 64:
+            # Twice the triangle area for each candidate in the bucket
+            area = np.abs((ax - bx) * (y[start:stop] - ay) - (ax - x[start:stop]) * (by - ay))
+            previous = start + int(np.argmax(area))
+        else:
+            best_area = -1.0
+            for j in range(start, stop):
+                area = abs((ax - bx) * (ys[j] - ay) - (ax - xs[j]) * (by - ay))
+                if area > best_area:
+                    best_area, previous = area, j
+        selected[i + 1] = previous
+
+    return selected
+
+def minmax(y, n_out):
+    """
+    Min/max bucketing: keep each bucket's lowest and highest point.
+
+    Cheaper than LTTB and keeps every spike; returns at most ``n_out``
+    sorted positions.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 2:
+        return np.arange(n)
+
+    y = _as_float(y)
+    edges = np.linspace(0, n, n_out // 2 + 1).astype(int)
+    selected = []
+    for start, stop in zip(edges[:-1], edges[1:]):
+        if stop > start:
+            bucket = y[start:stop]
+            selected.extend({start + int(np.argmin(bucket)), start + int(np.argmax(bucket))})
+    return np.unique(selected)
+
+def downsample(x, y, max_points=None, visible_range=None, method='lttb'):
+    """
+    Choose which points of a time series to plot.
+
+    Points inside ``visible_range`` (a ``(start, end)`` pair comparable
+    with ``x``) get most of the ``max_points`` budget; the rest of the
+    history is kept at coarse min/max resolution so panning and the range
+    slider still show its shape. Returns sorted positions into ``x``.
+    """
+    max_points = max_points or MAX_POINTS_PER_TRACE
+    x = np.asarray(x)
+    n = len(x)
+    if n <= max_points:
+        return np.arange(n)
+
+    reduce = lttb if method == 'lttb' else (lambda x_part, y_part, k: minmax(y_part, k))
+    y = np.asarray(y)
+    if visible_range is None:
+        return reduce(x, y, max_points)
+
+    low, high = np.asarray(visible_range, dtype=x.dtype)
+    start = int(np.searchsorted(x, low, side='left'))
+    stop = int(np.searchsorted(x, high, side='right'))
+    context_points = max(2, int(max_points * CONTEXT_SHARE))
+    outside = n - (stop - start)
+
+    parts = []
+    if start > 0:
+        parts.append(minmax(y[:start], max(2, context_points * start // max(outside, 1))))
+    parts.append(start + reduce(x[start:stop], y[start:stop], max_points - context_points))
+    if stop < n:
+        parts.append(stop + minmax(y[stop:], max(2, context_points * (n - stop) // max(outside, 1))))
+    return np.concatenate(parts)
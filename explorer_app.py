@@ -0,0 +1,98 @@
+"""
+Metric explorer: any count (new or total cases, deaths, tests) across
+countries over time, on the latest day and on a map, optionally per 100K.
+
+Runs as the "Metric Explorer" page of ``app.py`` or on its own with
+``streamlit run explorer_app.py``. Either way it reads the dataset from
+``dataset_refresher`` and its figures from ``figures``, so it has no
+download, cleaning or cache of its own.
+"""
+import pandas as pd
+import streamlit as st
+from dataset_refresher import load_current_dataset
+from metrics import country_metric
+from page_state import get_dimensions, session_cached
+from rollups import GLOBAL_GROUP, rollup_latest
+from visualizations import plot_country_comparison, plot_latest_comparison, plot_metric_map
+
+# Sidebar label -> dataset column
+EXPLORER_METRICS = {
+    "New cases": "daily_cases",
+    "New deaths": "daily_deaths",
+    "Total cases": "cumulative_cases",
+    "Total deaths": "cumulative_deaths",
+    "New tests": "daily_tests"
+}
+
+def _format(value, per_100k):
+    return f"{value:,.2f}" if per_100k else f"{value:,.0f}"
+
+def _latest_values(data, countries, name):
+    """Last value of metric ``name`` for each of ``countries`` that has data."""
+    latest = {}
+    for country in countries:
+        values = country_metric(data, country, name)
+        if len(values):
+            latest[country] = values[-1]
+    return latest
+
+def render_explorer(data):
+    """Draw the explorer for the loaded dataset ``data``."""
+    st.sidebar.header("Controls")
+    metric_label = st.sidebar.selectbox("Metric", list(EXPLORER_METRICS), key="explorer_metric")
+    column = EXPLORER_METRICS[metric_label]
+    per_100k = st.sidebar.checkbox("Normalize per 100k population", value=False, key="explorer_per_100k")
+    name = f"{column}_per_100k" if per_100k else column
+
+    dimensions = get_dimensions(data)
+    selected_countries = st.sidebar.multiselect("Countries (for comparison)", dimensions['countries'],
+                                                default=dimensions['default_countries'], key="explorer_countries")
+
+    dates = dimensions['dates']
+    min_date, max_date = dates[0].date(), dates[-1].date()
+    date_range = st.sidebar.date_input("Date range", value=(min_date, max_date), min_value=min_date,
+                                       max_value=max_date, key="explorer_range")
+
+    col1, col2 = st.columns([2, 1])
+
+    with col1:
+        st.subheader(f"Time series — {metric_label}")
+        if not selected_countries:
+            st.info("Select one or more countries from the sidebar to view comparison.")
+        else:
+            # Until both ends are picked the input holds one date
+            visible = pd.to_datetime(list(date_range)) if len(date_range) == 2 else None
+            plot_country_comparison(data, selected_countries, per_100k, date_range=visible, column=column,
+                                    key="explorer_series")
+
+        st.subheader("Global choropleth")
+        map_date = st.slider("Map date", min_value=min_date, max_value=max_date, value=max_date,
+                             format="YYYY-MM-DD", key="explorer_map_date")
+        plot_metric_map(data, column, pd.Timestamp(map_date), per_100k, key="explorer_map")
+
+    with col2:
+        st.subheader("Latest comparison (bar)")
+        if not selected_countries:
+            st.info("Choose countries to compare latest available values.")
+        else:
+            plot_latest_comparison(data, selected_countries, column, per_100k, key="explorer_bar")
+
+        st.markdown("### Quick stats")
+        if selected_countries:
+            latest = session_cached(data, 'explorer_stats', (tuple(selected_countries), name),
+                                    lambda: _latest_values(data, selected_countries, name))
+            for country, value in latest.items():
+                st.metric(label=country, value=_format(value, per_100k))
+        else:
+            # Worldwide sums from the prebuilt rollups
+            global_latest = rollup_latest(data, GLOBAL_GROUP)
+            if global_latest is not None:
+                st.metric(label="Global", value=_format(global_latest[name], per_100k))
+
+    st.markdown("---")
+    st.caption("Data source: Our World in Data (OWID). App built with Streamlit + Plotly.")
+
+if __name__ == '__main__':
+    st.set_page_config(layout="wide", page_title="COVID-19 Data Tracker")
+    st.title("🦠 COVID-19 Data Tracker")
+    render_explorer(load_current_dataset())
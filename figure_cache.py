@@ -0,0 +1,113 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from data_fetcher import dataset_version
+from instrumentation import count, span
+
+def _to_json(figure):
+    if figure is None:
+        return None
+    return json.dumps(figure) if isinstance(figure, dict) else figure.to_json()
+
+class FigureCache:
+    """
+    Bounded LRU cache of serialized Plotly figures.
+
+    Entries hold the figure JSON plus the notices (warnings/info) raised
+    while building it, so a hit renders exactly what a rebuild would.
+    One instance is shared by every session in the process.
+    """
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_build(self, key, build):
+        """
+        Return ``(figure, notices)`` for ``key``, calling ``build`` on a miss.
+
+        ``build`` returns ``(figure, notices)`` with a Plotly figure, a
+        figure dict (or None) and a list of ``(level, message)`` pairs. Cached figures come
+        back as plain dicts, ready for ``st.plotly_chart``.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        count('figure_cache_hit' if entry is not None else 'figure_cache_miss')
+
+        if entry is None:
+            # Build outside the lock; concurrent misses may both build
+            with span('figure_build'):
+                figure, notices = build()
+            with span('figure_serialize'):
+                entry = (_to_json(figure), tuple(notices))
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+
+        figure_json, notices = entry
+        return (None if figure_json is None else json.loads(figure_json)), list(notices)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Counters for the sidebar and monitoring."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+FIGURE_CACHE = FigureCache(int(os.environ.get('COVID_TRACKER_FIGURE_CACHE_SIZE', 128)))
+
+def _row_bounds(data):
+    """
+    Which rows of the loaded frame ``data`` holds.
+
+    Slices and query results keep each row's position in the loaded frame
+    as its label, so a contiguous run is ``(start, stop)``; any other
+    selection is keyed on the hash of all its labels.
+    """
+    index = data.index
+    if isinstance(index, pd.RangeIndex) and index.step == 1:
+        return index.start, index.stop
+    if index.dtype.kind in 'iu' and len(index):
+        start = int(index[0])
+        if np.array_equal(index.to_numpy(), np.arange(start, start + len(index))):
+            return start, start + len(index)
+    return hash(pd.util.hash_pandas_object(index).to_numpy().tobytes())
+
+def cached_figure(view, data, params, build):
+    """
+    Build a figure through ``FIGURE_CACHE``.
+
+    The key is the view name, the dataset version of ``data``, the rows
+    it holds (slices of a loaded frame share its version) and the
+    hashable view ``params``. Frames without a version are never cached.
+    """
+    version = dataset_version(data)
+    if version is None:
+        with span('figure_build'):
+            return build()
+    return FIGURE_CACHE.get_or_build((view, version, _row_bounds(data), *params), build)
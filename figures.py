@@ -0,0 +1,510 @@
+import numpy as np
+import plotly.graph_objects as go
+import plotly.express as px
+import pandas as pd
+from data_fetcher import (
+    filter_by_country, get_date_partitions, get_date_rows, get_date_snapshot, get_latest_metrics, select_countries
+)
+from downsampling import downsample
+from figure_cache import cached_figure
+from metrics import country_metric, get_metric, metric_format, metric_label
+from rollups import ROLLING_DAYS, rollup_series, rollup_snapshot
+
+# Map type -> (column, title, color scale)
+MAP_TYPES = {
+    "Cases": ("cumulative_cases", "Global COVID-19 Cases", 'Reds'),
+    "Deaths": ("cumulative_deaths", "Global COVID-19 Deaths", 'Purples'),
+    "Case Fatality Rate": ("cfr", "Case Fatality Rate (%)", 'YlOrRd')
+}
+
+# Dataset count column -> label; ``{column}_per_100k`` is its registered per-100K metric
+COLUMN_LABELS = {
+    'daily_cases': "Daily New Cases",
+    'daily_deaths': "Daily New Deaths",
+    'daily_tests': "Daily New Tests",
+    'cumulative_cases': "Cumulative Cases",
+    'cumulative_deaths': "Cumulative Deaths"
+}
+
+# Rollup metric -> (daily column, label)
+ROLLUP_METRICS = {
+    "Cases": ("daily_cases", "Daily New Cases"),
+    "Deaths": ("daily_deaths", "Daily New Deaths")
+}
+
+def _range_key(date_range):
+    """Hashable form of a (start, end) date range for cache keys."""
+    return None if date_range is None else tuple(pd.to_datetime(list(date_range)))
+
+def daily_metrics_figure(data, country, metric_type, date_range=None):
+    """Build the daily metrics line chart; returns ``(figure, notices)``."""
+    country_data = filter_by_country(data, country)
+    
+    # Check if we have data
+    if country_data.empty:
+        return None, [("warning", f"No data available for {country}")]
+    
+    if metric_type == "Cases":
+        column = "daily_cases"
+        title = f"Daily New Cases - {country}"
+        y_label = "Daily New Cases"
+    elif metric_type == "Deaths":
+        column = "daily_deaths"
+        title = f"Daily New Deaths - {country}"
+        y_label = "Daily New Deaths"
+    else:
+        column = "cumulative_cases"
+        title = f"Cumulative Cases - {country}"
+        y_label = "Cumulative Cases"
+    
+    # Remove rows where the column value is NaN
+    plot_data = country_data[country_data[column].notna()].copy()
+    
+    if plot_data.empty:
+        return None, [("info", f"No {metric_type.lower()} data available for {country}")]
+    
+    # Keep the payload bounded however long the history is
+    keep = downsample(plot_data['date'].to_numpy(), plot_data[column].to_numpy(), visible_range=date_range)
+    plot_data = plot_data.iloc[keep]
+    
+    # Create the plot with proper hover data
+    fig = px.line(plot_data, x='date', y=column, title=title)
+    
+    # Update traces for better hover
+    fig.update_traces(
+        mode='lines+markers',
+        hovertemplate='<b>Date:</b> %{x|%Y-%m-%d}<br><b>' + y_label + ':</b> %{y:,.0f}<extra></extra>',
+        line=dict(width=2),
+        marker=dict(size=4)
+    )
+    
+    fig.update_layout(
+        hovermode='x unified',
+        template='plotly_white',
+        height=500,
+        xaxis_title='Date',
+        yaxis_title=y_label,
+        yaxis=dict(tickformat=','),
+        showlegend=False
+    )
+    
+    # Add range slider
+    fig.update_xaxes(rangeslider_visible=True)
+    if date_range is not None:
+        fig.update_xaxes(range=list(date_range))
+    
+    return fig, []
+
+def case_fatality_rate_figure(data, country):
+    """Build the CFR trend chart; returns ``(figure, notices)``."""
+    country_data = filter_by_country(data, country)
+    if country_data.empty:
+        return None, [("warning", f"No data available for {country}")]
+    
+    fig = px.line(country_data, x='date', y='cfr', 
+                 title=f"Case Fatality Rate - {country}",
+                 markers=True, labels={'cfr': 'CFR (%)', 'date': 'Date'})
+    fig.update_layout(height=500, template='plotly_white', hovermode='x unified')
+    return fig, []
+
+def country_comparison_figure(data, countries, normalize=False, date_range=None, column='cumulative_cases'):
+    """Build the country comparison chart of a ``COLUMN_LABELS`` column; returns ``(figure, notices)``."""
+    notices = []
+    rows, blocks = select_countries(data, countries)
+    dates = rows['date'].to_numpy()
+    y_values = rows[column].to_numpy(dtype=float)
+    keep = np.ones(len(rows), dtype=bool)
+    value_format = ',.0f'
+    
+    if normalize and 'population' in rows.columns:
+        # NaN where the population is unknown
+        y_values = get_metric(rows, f"{column}_per_100k")
+        keep = ~np.isnan(y_values)
+        y_label = metric_label(f"{column}_per_100k")
+        value_format = ',.2f'
+    else:
+        y_label = COLUMN_LABELS[column]
+    
+    fig = go.Figure()
+    
+    for country, (start, stop) in blocks.items():
+        if start == stop:
+            notices.append(("warning", f"No data available for {country}"))
+            continue
+        
+        block_keep = keep[start:stop]
+        if not block_keep.any():
+            continue
+        
+        x = dates[start:stop][block_keep]
+        y = y_values[start:stop][block_keep]
+        points = downsample(x, y, visible_range=date_range)
+        
+        fig.add_trace(go.Scatter(
+            x=x[points],
+            y=y[points],
+            name=country,
+            mode='lines+markers',
+            hovertemplate='<b>%{fullData.name}</b><br>Date: %{x}<br>Count: %{y:' + value_format + '}<extra></extra>'
+        ))
+    
+    if len(fig.data) == 0:
+        notices.append(("warning", "No data available for selected countries"))
+        return None, notices
+    
+    fig.update_layout(
+        title=f"Country Comparison - {COLUMN_LABELS[column]}",
+        xaxis_title='Date',
+        yaxis_title=y_label,
+        hovermode='x unified',
+        template='plotly_white',
+        height=500,
+        legend=dict(
+            yanchor="top",
+            y=0.99,
+            xanchor="left",
+            x=0.01
+        )
+    )
+    if date_range is not None:
+        fig.update_xaxes(range=list(date_range))
+    
+    return fig, notices
+
+def latest_comparison_figure(data, countries, column='cumulative_cases', per_100k=False):
+    """Build bars of each country's latest value of a ``COLUMN_LABELS`` column; returns ``(figure, notices)``."""
+    name = f"{column}_per_100k" if per_100k else column
+    label = metric_label(name) if per_100k else COLUMN_LABELS[column]
+    notices, names, values = [], [], []
+    for country in countries:
+        latest = get_latest_metrics(data, country)
+        if latest is None:
+            notices.append(("warning", f"No data available for {country}"))
+            continue
+        names.append(country)
+        values.append(country_metric(data, country, name)[-1] if per_100k else float(latest[column]))
+    if not names:
+        return None, notices
+    
+    fig = px.bar(x=names, y=values, title=f"Latest {label}", labels={'x': 'Country', 'y': label})
+    value_format = ',.2f' if per_100k else ',.0f'
+    fig.update_traces(hovertemplate='<b>%{x}</b><br>%{y:' + value_format + '}<extra></extra>')
+    fig.update_layout(template='plotly_white', height=400)
+    return fig, notices
+
+def metric_map_figure(data, column, selected_date, per_100k=False):
+    """
+    Build a single-date choropleth of a ``COLUMN_LABELS`` column (or its
+    per-100K metric); returns ``(figure, notices)``.
+
+    The date's rows are found by binary search and their values read from
+    the cached all-country metric, so nothing is regrouped per date.
+    """
+    positions = get_date_rows(data, selected_date)
+    if len(positions) == 0:
+        return None, [("warning", f"No data available for {pd.Timestamp(selected_date):%Y-%m-%d}")]
+    
+    name = f"{column}_per_100k" if per_100k else column
+    label = metric_label(name) if per_100k else COLUMN_LABELS[column]
+    map_data = pd.DataFrame({
+        'country': data['country'].iloc[positions].to_numpy(),
+        'iso_code': data['iso_code'].iloc[positions].to_numpy(),
+        name: get_metric(data, name)[positions]
+    })
+    map_data = map_data[map_data[name].notna() & map_data['iso_code'].notna()]
+    if map_data.empty:
+        return None, [("info", f"No {label.lower()} data available for this date")]
+    
+    fig = px.choropleth(
+        map_data,
+        locations='iso_code',
+        color=name,
+        hover_name='country',
+        hover_data={'iso_code': False, name: ':,.2f' if per_100k else ':,.0f'},
+        color_continuous_scale='OrRd',
+        title=f"{label} - {pd.Timestamp(selected_date):%Y-%m-%d}",
+        labels={name: label}
+    )
+    fig.update_layout(
+        height=600,
+        geo=dict(showframe=False, showcoastlines=True, projection_type='natural earth')
+    )
+    return fig, []
+
+def global_map_figure(data, map_type, selected_date):
+    """Build the single-date choropleth; returns ``(figure, notices)``."""
+    # Get data for selected date
+    map_data = get_date_snapshot(data, selected_date)
+    
+    if map_data.empty:
+        return None, [("warning", f"No data available for {selected_date}")]
+    
+    column, title, color_scale = MAP_TYPES.get(map_type, MAP_TYPES["Case Fatality Rate"])
+    title = f"{title} - {selected_date.strftime('%Y-%m-%d')}"
+    
+    # Remove rows with invalid data
+    map_data = map_data[map_data[column].notna() & (map_data[column] >= 0)]
+    
+    if map_data.empty or map_data[column].sum() == 0:
+        return None, [("info", f"No {map_type.lower()} data available for this date")]
+    
+    fig = px.choropleth(
+        map_data,
+        locations='iso_code',
+        color=column,
+        hover_name='country',
+        hover_data={
+            'iso_code': False,
+            column: ':,.0f' if map_type != "Case Fatality Rate" else ':.2f'
+        },
+        color_continuous_scale=color_scale,
+        title=title,
+        labels={column: map_type}
+    )
+    
+    fig.update_layout(
+        height=600,
+        geo=dict(
+            showframe=False,
+            showcoastlines=True,
+            projection_type='natural earth'
+        )
+    )
+    
+    return fig, []
+
+def _timeline_positions(dates, granularity):
+    """Date rows used as frames: every day, or every 7th day ending on the latest."""
+    if granularity == "Weekly":
+        return np.arange(len(dates) - 1, -1, -7)[::-1]
+    return np.arange(len(dates))
+
+def global_map_timeline_spec(data, map_type, granularity):
+    """
+    Build an animated choropleth spec with one frame per date.
+
+    Frames come straight from the date partitions and are assembled as a
+    plain dict, which skips Plotly's per-frame validation. Returns None
+    when the metric has no data.
+    """
+    partitions = get_date_partitions(data)
+    column, title, color_scale = MAP_TYPES.get(map_type, MAP_TYPES["Case Fatality Rate"])
+    matrix = partitions['matrices'][column]
+    valid = partitions['present'] & (matrix >= 0)
+    if not valid.any():
+        return None
+    
+    value_format = ':.2f' if map_type == "Case Fatality Rate" else ':,.0f'
+    hovertemplate = '<b>%{text}</b><br>' + map_type + ': %{z' + value_format + '}<extra></extra>'
+    
+    frames = []
+    for position in _timeline_positions(partitions['dates'], granularity):
+        mask = valid[position]
+        frames.append({
+            'name': partitions['dates'][position].strftime('%Y-%m-%d'),
+            'data': [{
+                'type': 'choropleth',
+                'locations': partitions['iso_codes'][mask].tolist(),
+                'z': matrix[position, mask].tolist(),
+                'text': partitions['countries'][mask].tolist(),
+                'coloraxis': 'coloraxis',
+                'hovertemplate': hovertemplate
+            }]
+        })
+    
+    play = {'frame': {'duration': 150, 'redraw': True}, 'fromcurrent': True, 'transition': {'duration': 0}}
+    jump = {'frame': {'duration': 0, 'redraw': True}, 'mode': 'immediate', 'transition': {'duration': 0}}
+    return {
+        'data': frames[0]['data'],
+        'frames': frames,
+        'layout': {
+            'title': {'text': f"{title} - {granularity} Timeline"},
+            'height': 650,
+            'geo': {'showframe': False, 'showcoastlines': True, 'projection': {'type': 'natural earth'}},
+            # Fixed color range so frames are comparable
+            'coloraxis': {
+                'colorscale': color_scale,
+                'cmin': 0,
+                'cmax': float(np.max(matrix[valid])),
+                'colorbar': {'title': {'text': map_type}}
+            },
+            'updatemenus': [{
+                'type': 'buttons',
+                'direction': 'left',
+                'x': 0.1, 'y': 0, 'xanchor': 'right', 'yanchor': 'top',
+                'pad': {'t': 60, 'r': 10},
+                'showactive': False,
+                'buttons': [
+                    {'label': '▶ Play', 'method': 'animate', 'args': [None, play]},
+                    {'label': '⏸ Pause', 'method': 'animate', 'args': [[None], dict(jump, frame={'duration': 0, 'redraw': False})]}
+                ]
+            }],
+            'sliders': [{
+                'active': 0,
+                'x': 0.1, 'y': 0, 'len': 0.9,
+                'pad': {'t': 50},
+                'currentvalue': {'prefix': 'Date: '},
+                'steps': [
+                    {'label': frame['name'], 'method': 'animate', 'args': [[frame['name']], jump]}
+                    for frame in frames
+                ]
+            }]
+        }
+    }
+
+def metric_trend_figure(data, country, name):
+    """Build the line chart of one registered metric; returns ``(figure, notices)``."""
+    country_data = filter_by_country(data, country)
+    if country_data.empty:
+        return None, [("warning", f"No data available for {country}")]
+    
+    label = metric_label(name)
+    dates = country_data['date'].to_numpy()
+    values = country_metric(data, country, name)
+    present = ~np.isnan(values)
+    if not present.any():
+        return None, [("info", f"Not enough data for {label.lower()} in {country}")]
+    dates, values = dates[present], values[present]
+    points = downsample(dates, values)
+    
+    fig = go.Figure(go.Scatter(
+        x=dates[points], y=values[points], mode='lines', line=dict(width=2),
+        hovertemplate='<b>Date:</b> %{x|%Y-%m-%d}<br><b>' + label + ':</b> %{y:' + metric_format(name) + '}<extra></extra>'
+    ))
+    fig.update_layout(
+        title=f"{label} - {country}",
+        xaxis_title='Date',
+        yaxis_title=label,
+        hovermode='x unified',
+        template='plotly_white',
+        height=500
+    )
+    return fig, []
+
+def rollup_trend_figure(data, group, metric_type, per_100k=False):
+    """Build a group's daily bars with their trailing average; returns ``(figure, notices)``."""
+    column, y_label = ROLLUP_METRICS[metric_type]
+    suffix = "_per_100k" if per_100k else ""
+    series = rollup_series(data, group)
+    if series.empty:
+        return None, [("warning", f"No data available for {group}")]
+    if per_100k:
+        y_label += " per 100K"
+    
+    dates = series['date'].to_numpy()
+    daily = series[column + suffix].to_numpy()
+    average = series[f"{column}_{ROLLING_DAYS}d{suffix}"].to_numpy()
+    bars = downsample(dates, daily, method='minmax')
+    line = downsample(dates, average)
+    value_format = ',.2f' if per_100k else ',.0f'
+    
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=dates[bars], y=daily[bars], name="Daily", marker_color='lightgray',
+        hovertemplate='%{y:' + value_format + '}<extra>Daily</extra>'
+    ))
+    fig.add_trace(go.Scatter(
+        x=dates[line], y=average[line], name=f"{ROLLING_DAYS}-day average", mode='lines',
+        line=dict(width=2),
+        hovertemplate='%{y:' + value_format + '}<extra>' + f"{ROLLING_DAYS}-day average" + '</extra>'
+    ))
+    fig.update_layout(
+        title=f"{y_label} - {group}",
+        xaxis_title='Date',
+        yaxis_title=y_label,
+        hovermode='x unified',
+        template='plotly_white',
+        height=500,
+        bargap=0,
+        legend=dict(yanchor="top", y=0.99, xanchor="left", x=0.01)
+    )
+    return fig, []
+
+def continent_breakdown_figure(data, metric_type, per_100k=False):
+    """Build the latest trailing average of every continent as bars; returns ``(figure, notices)``."""
+    column, y_label = ROLLUP_METRICS[metric_type]
+    suffix = "_per_100k" if per_100k else ""
+    latest = rollup_snapshot(data, f"{column}_{ROLLING_DAYS}d{suffix}").sort_values(ascending=False)
+    if latest.empty:
+        return None, [("info", "No continent data available")]
+    y_label = f"{y_label}, {ROLLING_DAYS}-day average" + (" per 100K" if per_100k else "")
+    
+    fig = px.bar(
+        x=latest.index, y=latest.to_numpy(), title=f"{y_label} by Continent",
+        labels={'x': 'Continent', 'y': y_label}
+    )
+    fig.update_traces(hovertemplate='<b>%{x}</b><br>%{y:,.2f}<extra></extra>')
+    fig.update_layout(template='plotly_white', height=400)
+    return fig, []
+
+def global_map_timeline_figure(data, map_type, granularity="Weekly"):
+    """Build the animated choropleth as a figure dict; returns ``(figure, notices)``."""
+    spec = global_map_timeline_spec(data, map_type, granularity)
+    if spec is None:
+        return None, [("info", f"No {map_type.lower()} data available")]
+    return spec, []
+
+def metric_cards(latest):
+    """
+    Headline numbers of a country or group as ``label, value, delta`` dicts.
+
+    ``latest`` is a row from ``metrics.latest_metrics`` or
+    ``rollups.rollup_latest``.
+    """
+    cumulative_cases = int(latest['cumulative_cases']) if pd.notna(latest['cumulative_cases']) else 0
+    daily_cases = int(latest['daily_cases']) if pd.notna(latest['daily_cases']) else 0
+    cumulative_deaths = int(latest['cumulative_deaths']) if pd.notna(latest['cumulative_deaths']) else 0
+    daily_deaths = int(latest['daily_deaths']) if pd.notna(latest['daily_deaths']) else 0
+    cfr_value = float(latest['cfr']) if pd.notna(latest['cfr']) and latest['cfr'] != float('inf') else 0
+    cases_per_100k = latest.get('cumulative_cases_per_100k')
+    cases_per_100k = float(cases_per_100k) if pd.notna(cases_per_100k) else 0
+    
+    return [
+        {
+            'label': "Total Cases",
+            'value': f"{cumulative_cases:,}",
+            'delta': f"+{daily_cases:,}" if daily_cases > 0 else "0 new cases"
+        },
+        {
+            'label': "Total Deaths",
+            'value': f"{cumulative_deaths:,}",
+            'delta': f"+{daily_deaths:,}" if daily_deaths > 0 else "0 new deaths"
+        },
+        {'label': "Case Fatality Rate", 'value': f"{cfr_value:.2f}%", 'delta': "Per confirmed case"},
+        {'label': "Cases per 100K", 'value': f"{cases_per_100k:.1f}", 'delta': "Population normalized"}
+    ]
+
+# View name -> builder returning ``(figure, notices)``
+FIGURES = {
+    'daily_metrics': daily_metrics_figure,
+    'case_fatality_rate': case_fatality_rate_figure,
+    'country_comparison': country_comparison_figure,
+    'latest_comparison': latest_comparison_figure,
+    'global_map': global_map_figure,
+    'metric_map': metric_map_figure,
+    'global_map_timeline': global_map_timeline_figure,
+    'metric_trend': metric_trend_figure,
+    'rollup_trend': rollup_trend_figure,
+    'continent_breakdown': continent_breakdown_figure
+}
+
+def _cache_param(name, value):
+    """Hashable, canonical form of a builder argument for the cache key."""
+    if name == 'date_range':
+        return _range_key(value)
+    if name == 'selected_date':
+        return pd.Timestamp(value)
+    if isinstance(value, list):
+        return tuple(value)
+    return value
+
+def get_figure(view, data, **params):
+    """
+    Return ``(figure, notices)`` for one of the ``FIGURES`` views.
+
+    Served from the figure cache when ``data`` is a loaded (versioned)
+    frame, so the same spec is shared by every session and by callers
+    outside Streamlit. Figures are shared: copy before modifying.
+    """
+    key = tuple((name, _cache_param(name, value)) for name, value in sorted(params.items()))
+    return cached_figure(view, data, key, lambda: FIGURES[view](data, **params))
@@ -0,0 +1,187 @@
+"""
+Timing spans and counters around the dashboard's hot paths.
+
+Stages (``fetch``, ``parse``, ``clean``, ``filter``, ``aggregate``,
+``figure_build``, ``chart_send`` ...) are timed with ``span`` or
+``timed`` and events such as cache hits with ``count``. Totals are kept
+per process for monitoring (``prometheus_text``, ``snapshot``); between
+``start_rerun`` and ``finish_rerun`` the same records are also collected
+for the current script run, for the sidebar debug panel and JSON logs.
+
+Off by default. When off, ``span`` returns a shared no-op context and
+``timed`` wrappers call straight through, so the cost is one global
+lookup per call. Switch with ``COVID_TRACKER_INSTRUMENTATION=1`` or
+``set_enabled`` at runtime.
+"""
+import contextlib
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+ENABLED = os.environ.get('COVID_TRACKER_INSTRUMENTATION', '0') == '1'
+
+# Log each rerun's breakdown as one JSON line on the ``covid_tracker.metrics`` logger
+LOG_JSON = os.environ.get('COVID_TRACKER_METRICS_LOG', '0') == '1'
+
+# Upper bounds (seconds) of the Prometheus histogram buckets
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+
+logger = logging.getLogger('covid_tracker.metrics')
+if LOG_JSON and not logger.handlers:
+    # The root logger only passes warnings; give the lines a handler of their own
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+_lock = threading.Lock()
+_spans = {}  # name -> [count, total seconds, max seconds, per-bucket counts]
+_counters = {}
+_local = threading.local()  # .rerun: records of the script run on this thread
+
+_NOOP = contextlib.nullcontext()
+
+def set_enabled(enabled):
+    global ENABLED
+    ENABLED = bool(enabled)
+
+def is_enabled():
+    return ENABLED
+
+def record(name, seconds):
+    """Add one timing of stage ``name``."""
+    with _lock:
+        stats = _spans.get(name)
+        if stats is None:
+            stats = _spans[name] = [0, 0.0, 0.0, [0] * len(BUCKETS)]
+        stats[0] += 1
+        stats[1] += seconds
+        stats[2] = max(stats[2], seconds)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                stats[3][i] += 1
+                break
+    rerun = getattr(_local, 'rerun', None)
+    if rerun is not None:
+        calls, total = rerun['spans'].get(name, (0, 0.0))
+        rerun['spans'][name] = (calls + 1, total + seconds)
+
+def count(name, n=1):
+    """Add ``n`` to counter ``name`` (no-op when disabled)."""
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+    rerun = getattr(_local, 'rerun', None)
+    if rerun is not None:
+        rerun['counters'][name] = rerun['counters'].get(name, 0) + n
+
+class _Span:
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.started)
+        return False
+
+def span(name):
+    """Context manager timing stage ``name``."""
+    return _Span(name) if ENABLED else _NOOP
+
+def timed(name):
+    """Decorator timing every call of the function as stage ``name``."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+def start_rerun():
+    """Start collecting the spans and counters of the script run on this thread."""
+    _local.rerun = {'started': time.perf_counter(), 'spans': {}, 'counters': {}} if ENABLED else None
+
+def rerun_breakdown():
+    """
+    Records of the current script run so far, or None when not collecting.
+
+    ``spans`` maps each stage to its calls and milliseconds (nested stages
+    are counted in their parents too), ``total_ms`` is the run time so far.
+    """
+    rerun = getattr(_local, 'rerun', None)
+    if rerun is None:
+        return None
+    return {
+        'total_ms': (time.perf_counter() - rerun['started']) * 1000,
+        'spans': {name: {'calls': calls, 'ms': total * 1000}
+                  for name, (calls, total) in sorted(rerun['spans'].items(), key=lambda item: -item[1][1])},
+        'counters': dict(rerun['counters'])
+    }
+
+def finish_rerun(**fields):
+    """End the current script run; logs it as JSON if enabled. Returns ``rerun_breakdown()``."""
+    breakdown = rerun_breakdown()
+    _local.rerun = None
+    if breakdown is not None and LOG_JSON:
+        logger.info(json.dumps({'event': 'rerun', **fields, **breakdown}, default=str))
+    return breakdown
+
+def snapshot():
+    """Process-wide totals per stage and counter, for JSON export."""
+    with _lock:
+        return {
+            'spans': {name: {'count': n, 'seconds': total, 'max_seconds': longest}
+                      for name, (n, total, longest, _) in _spans.items()},
+            'counters': dict(_counters)
+        }
+
+def reset():
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def prometheus_text(prefix='covid_tracker'):
+    """Process-wide totals in the Prometheus text exposition format."""
+    with _lock:
+        spans = {name: (n, total, list(buckets)) for name, (n, total, _, buckets) in _spans.items()}
+        counters = dict(_counters)
+
+    lines = [
+        f"# HELP {prefix}_stage_seconds Time spent in each instrumented stage.",
+        f"# TYPE {prefix}_stage_seconds histogram"
+    ]
+    for name, (n, total, buckets) in sorted(spans.items()):
+        stage = _label(name)
+        cumulative = 0
+        for bound, hits in zip(BUCKETS, buckets):
+            cumulative += hits
+            lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{bound:g}"}} {cumulative}')
+        lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {n}')
+        lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {total:.6f}')
+        lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {n}')
+    lines += [
+        f"# HELP {prefix}_events_total Instrumented events such as cache hits and misses.",
+        f"# TYPE {prefix}_events_total counter"
+    ]
+    for name, value in sorted(counters.items()):
+        lines.append(f'{prefix}_events_total{{event="{_label(name)}"}} {value}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,167 @@
+import threading
+import numpy as np
+import pandas as pd
+from data_fetcher import country_bounds, dataset_version, filter_by_country, get_latest_metrics, has_country_index
+from dataset_cache import cache_per_version
+from instrumentation import count, span
+
+# name -> {'label', 'format', 'compute'}; see _register
+METRICS = {}
+
+def _register(name, label, value_format, compute):
+    """
+    Add a derived metric to the registry.
+
+    ``compute(get, starts)`` returns one float per row: ``get(name)`` reads
+    a column or another metric as floats and ``starts`` holds the first
+    row of each row's country block.
+    """
+    METRICS[name] = {'label': label, 'format': value_format, 'compute': compute}
+
+def per_100k(values, population):
+    """``values`` per 100,000 people; NaN where the population is unknown."""
+    population = np.asarray(population, dtype=float)
+    return np.divide(np.asarray(values, dtype=float) * 100000, population,
+                     out=np.full(np.broadcast(values, population).shape, np.nan), where=population > 0)
+
+def case_fatality_rate(deaths, cases):
+    """Deaths per 100 confirmed cases; 0 where there are no cases."""
+    cases = np.asarray(cases, dtype=float)
+    return np.divide(np.asarray(deaths, dtype=float) * 100, cases,
+                     out=np.zeros(np.broadcast(deaths, cases).shape), where=cases > 0)
+
+def _block_starts(data):
+    """First row of each row's country block (rows are grouped by country, then date)."""
+    countries = data['country']
+    codes = countries.cat.codes.to_numpy() if isinstance(countries.dtype, pd.CategoricalDtype) else pd.factorize(countries)[0]
+    change = np.ones(len(codes), dtype=bool)
+    change[1:] = codes[1:] != codes[:-1]
+    return np.maximum.accumulate(np.where(change, np.arange(len(codes)), 0))
+
+def rolling_sum(values, window, starts):
+    """Trailing sum over ``window`` rows, restarting at each country block."""
+    rows = np.arange(len(values))
+    totals = np.concatenate([[0.0], np.cumsum(np.nan_to_num(values))])
+    low = np.maximum(rows - window + 1, starts)
+    return totals[rows + 1] - totals[low], rows + 1 - low
+
+def rolling_mean(values, window, starts):
+    """Trailing mean over ``window`` rows; a block's first rows average what is available."""
+    totals, counts = rolling_sum(values, window, starts)
+    return totals / counts
+
+def lagged(values, periods, starts):
+    """``values`` shifted down ``periods`` rows within each block (NaN before the block)."""
+    rows = np.arange(len(values))
+    out = np.full(len(values), np.nan)
+    valid = rows - periods >= starts
+    out[valid] = values[rows[valid] - periods]
+    return out
+
+def _week_over_week(column):
+    def compute(get, starts):
+        week, counts = rolling_sum(get(column), 7, starts)
+        week[counts < 7] = np.nan
+        previous = lagged(week, 7, starts)
+        return np.divide(week - previous, previous, out=np.full(len(week), np.nan), where=previous > 0) * 100
+    return compute
+
+def _doubling_time(column, days=7):
+    def compute(get, starts):
+        current = get(column)
+        previous = lagged(current, days, starts)
+        ratio = np.divide(current, previous, out=np.full(len(current), np.nan), where=previous > 0)
+        growing = ratio > 1
+        return np.divide(days * np.log(2), np.log(ratio, out=np.zeros(len(ratio)), where=growing),
+                         out=np.full(len(ratio), np.nan), where=growing)
+    return compute
+
+for _column, _noun in [('daily_cases', 'Cases'), ('daily_deaths', 'Deaths')]:
+    for _window in (7, 14):
+        _register(f"{_column}_{_window}d", f"Daily {_noun} ({_window}-day avg)", ',.0f',
+                  lambda get, starts, c=_column, w=_window: rolling_mean(get(c), w, starts))
+        _register(f"{_column}_{_window}d_per_100k", f"Daily {_noun} per 100K ({_window}-day avg)", ',.2f',
+                  lambda get, starts, c=_column, w=_window: per_100k(get(f"{c}_{w}d"), get('population')))
+    _register(f"{_noun.lower()}_growth_wow", f"{_noun} Week-over-Week Growth (%)", '+,.1f',
+              _week_over_week(_column))
+
+for _column, _noun in [('cumulative_cases', 'Cases'), ('cumulative_deaths', 'Deaths')]:
+    _register(f"{_column}_per_100k", f"Total {_noun} per 100K", ',.1f',
+              lambda get, starts, c=_column: per_100k(get(c), get('population')))
+    _register(f"{_noun.lower()}_doubling_days", f"{_noun} Doubling Time (days)", ',.1f',
+              _doubling_time(_column))
+
+for _column, _noun in [('daily_cases', 'Cases'), ('daily_deaths', 'Deaths'), ('daily_tests', 'Tests')]:
+    _register(f"{_column}_per_100k", f"Daily {_noun} per 100K", ',.2f',
+              lambda get, starts, c=_column: per_100k(get(c), get('population')))
+
+_register('cfr', "Case Fatality Rate (%)", '.2f',
+          lambda get, starts: case_fatality_rate(get('cumulative_deaths'), get('cumulative_cases')))
+
+def metric_label(name):
+    return METRICS[name]['label']
+
+def metric_format(name):
+    return METRICS[name]['format']
+
+def _is_loaded_frame(data):
+    """True for a whole loaded dataset (not a slice of one)."""
+    return dataset_version(data) is not None and has_country_index(data)
+
+@cache_per_version(max_entries=2)
+def _metric_store(data, version):
+    return {'starts': _block_starts(data), 'values': {}, 'lock': threading.Lock()}
+
+def get_metric(data, name):
+    """
+    Return metric ``name`` (or a plain column) for every row of ``data`` as floats.
+
+    Window metrics run over each country's block of consecutive rows for
+    all countries at once. For the loaded dataset a metric
+    is computed the first time it is asked for, then cached for that
+    dataset version and shared by all sessions (read-only); other frames,
+    such as a country's slice, are computed on every call.
+    """
+    if name not in METRICS:
+        return data[name].to_numpy(dtype=float)
+    if not _is_loaded_frame(data):
+        return _uncached(data, name, _block_starts(data))
+
+    store = _metric_store(data, dataset_version(data))
+    values = store['values'].get(name)
+    if values is None:
+        count('metric_cache_miss')
+        with span('metric'):
+            values = METRICS[name]['compute'](lambda n: get_metric(data, n), store['starts'])
+        values.setflags(write=False)
+        with store['lock']:
+            values = store['values'].setdefault(name, values)
+    else:
+        count('metric_cache_hit')
+    return values
+
+def _uncached(data, name, starts):
+    if name not in METRICS:
+        return data[name].to_numpy(dtype=float)
+    return METRICS[name]['compute'](lambda n: _uncached(data, n, starts), starts)
+
+def country_metric(data, country, name):
+    """Metric ``name`` for one country's rows, cut from the all-country result."""
+    bounds = country_bounds(data, country)
+    if bounds is None:
+        return get_metric(filter_by_country(data, country), name)
+    return get_metric(data, name)[bounds[0]:bounds[1]]
+
+def with_metrics(data, names, country=None):
+    """A copy of ``data`` (or of one country's rows) with the named metrics added as columns."""
+    if country is None:
+        return data.assign(**{name: get_metric(data, name) for name in names})
+    return filter_by_country(data, country).assign(**{name: country_metric(data, country, name) for name in names})
+
+def latest_metrics(data, country, names=('cumulative_cases_per_100k',)):
+    """``get_latest_metrics`` with the named metrics added (None without data)."""
+    latest = get_latest_metrics(data, country)
+    if latest is None:
+        return None
+    values = {name: country_metric(data, country, name)[-1] for name in names}
+    return pd.concat([latest, pd.Series(values, dtype=object)])
@@ -0,0 +1,93 @@
+"""
+Widget dimensions and per-session page results.
+
+Every widget change reruns ``app.py`` from the top. The country list,
+date axis and per-country date ranges the widgets are built from are
+derived once per data version and shared by all sessions
+(``get_dimensions``), and a page's intermediate results are kept in the
+session's state under the inputs they came from (``session_cached``), so
+a rerun only recomputes what the change touched.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+from data_fetcher import dataset_version, has_country_index
+from dataset_cache import cache_per_version
+from instrumentation import count, timed
+
+# Countries preselected in comparisons, where the data has them
+DEFAULT_COUNTRIES = ["United States", "India", "Brazil"]
+
+# st.session_state key of this session's page results
+SESSION_KEY = '_page_results'
+
+@timed('dimensions')
+def _build_dimensions(data):
+    """
+    Sorted country names, the date axis and each country's first and last
+    date. Loaded frames read the ranges off their country index; other
+    frames are grouped.
+    """
+    if has_country_index(data):
+        index = data.attrs['country_index']
+        starts, stops = np.asarray(index['starts']), np.asarray(index['stops'])
+        present = stops > starts
+        dates = data['date'].to_numpy()
+        names = data['country'].cat.categories[present]
+        first, last = dates[starts[present]], dates[stops[present] - 1]
+    else:
+        ranges = data.groupby('country', observed=True)['date'].agg(['min', 'max'])
+        names, first, last = ranges.index, ranges['min'].to_numpy(), ranges['max'].to_numpy()
+
+    country_dates = dict(zip(map(str, names), zip(pd.DatetimeIndex(first).date, pd.DatetimeIndex(last).date)))
+    countries = sorted(country_dates)
+    date_axis = pd.DatetimeIndex(np.unique(data['date'].to_numpy()))
+    return {
+        'countries': countries,
+        'dates': date_axis,
+        'date_options': list(date_axis),
+        'country_dates': country_dates,
+        'default_countries': [c for c in DEFAULT_COUNTRIES if c in country_dates] or countries[:3]
+    }
+
+@cache_per_version(max_entries=2)
+def _cached_dimensions(data, version):
+    return _build_dimensions(data)
+
+def get_dimensions(data):
+    """
+    Return the widget dimensions of ``data``.
+
+    ``countries`` (sorted names with rows), ``dates`` (DatetimeIndex of
+    every date) and ``date_options`` (the same as a list), ``country_dates``
+    (country -> ``(first, last)`` dates) and ``default_countries`` (the
+    ``DEFAULT_COUNTRIES`` present, else the first three). Built once per
+    dataset version and shared by all sessions (read-only); other frames
+    are measured on every call.
+    """
+    version = dataset_version(data)
+    if version is None or not has_country_index(data):
+        return _build_dimensions(data)
+    return _cached_dimensions(data, version)
+
+def session_cached(data, slot, inputs, build):
+    """
+    Return ``build()``, reusing this session's result for ``slot`` while
+    ``inputs`` (compared with ==) and the version of ``data`` are unchanged.
+
+    One result is kept per slot and all are dropped when the data version
+    changes, so a session holds at most one result per page. Frames
+    without a version are never cached.
+    """
+    version = dataset_version(data)
+    if version is None:
+        return build()
+    results = st.session_state.get(SESSION_KEY)
+    if results is None or results['version'] != version:
+        results = st.session_state[SESSION_KEY] = {'version': version, 'slots': {}}
+    entry = results['slots'].get(slot)
+    hit = entry is not None and entry[0] == inputs
+    count('session_cache_hit' if hit else 'session_cache_miss')
+    if not hit:
+        entry = results['slots'][slot] = (inputs, build())
+    return entry[1]
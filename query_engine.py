@@ -0,0 +1,205 @@
+"""
+Optional DuckDB backend for the dataset queries.
+
+With ``COVID_TRACKER_QUERY_BACKEND=duckdb`` the loaded dataset is copied
+once per version into an in-memory DuckDB table (from Arrow, in the
+dataset's country, date order, so DuckDB's per-block min/max statistics
+skip every block outside a country or date range) and the country,
+date-range, latest-value, snapshot and rollup queries of ``data_fetcher``
+and ``rollups`` run as SQL on DuckDB's worker threads. Results have the
+same columns, dtypes and index as the pandas paths.
+
+The default ``pandas`` backend answers from the in-process indexes. If
+``duckdb`` is not installed the setting is ignored.
+"""
+import os
+import numpy as np
+import pandas as pd
+from dataset_cache import cache_per_version
+from instrumentation import timed
+
+try:
+    import duckdb
+except ImportError:  # Optional dependency; queries stay on pandas without it
+    duckdb = None
+
+BACKENDS = ('pandas', 'duckdb')
+
+QUERY_BACKEND = os.environ.get('COVID_TRACKER_QUERY_BACKEND', 'pandas')
+
+# Worker threads per query (0 leaves DuckDB's default, one per core)
+QUERY_THREADS = int(os.environ.get('COVID_TRACKER_QUERY_THREADS', 0))
+
+def set_backend(name):
+    global QUERY_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown query backend {name!r} (known: {', '.join(BACKENDS)})")
+    QUERY_BACKEND = name
+
+def is_enabled():
+    """True when queries go to DuckDB."""
+    return QUERY_BACKEND == 'duckdb' and duckdb is not None
+
+@timed('engine_load')
+def _load_table(data):
+    """
+    A DuckDB connection holding ``data`` as table ``covid``.
+
+    Categorical columns are stored as their integer codes (as in
+    ``shared_dataset``), so the country filter compares small integers
+    against the sorted column and results convert back without building
+    categories; ``_row`` is each row's position in ``data``.
+    """
+    connection = duckdb.connect(':memory:')
+    if QUERY_THREADS:
+        connection.execute(f"SET threads = {QUERY_THREADS}")
+    frame = pd.DataFrame({
+        column: data[column].cat.codes.to_numpy() if isinstance(dtype, pd.CategoricalDtype) else data[column].to_numpy()
+        for column, dtype in data.dtypes.items()
+    })
+    frame['_row'] = np.arange(len(frame), dtype='int64')
+    connection.register('frame', frame)
+    connection.execute("CREATE TABLE covid AS SELECT * FROM frame ORDER BY _row")
+    connection.unregister('frame')
+    return connection
+
+@cache_per_version(max_entries=2)
+def _cached_table(data, version):
+    return _load_table(data)
+
+def _query(data, sql, params=()):
+    """
+    Run ``sql`` against the table of ``data`` on a cursor of its own
+    (cursors are per thread); returns a dict of column arrays.
+
+    Scans keep the table's order (DuckDB preserves insertion order), so
+    row queries need no ORDER BY.
+    """
+    with _cached_table(data, data.attrs['version']).cursor() as cursor:
+        return cursor.execute(sql, list(params)).fetchnumpy()
+
+def _rows(data, result):
+    """
+    Rows of ``covid`` back in the dataset's dtypes, labelled by their
+    position in ``data``.
+
+    Like a slice of ``data`` they carry its version, so figure cache keys
+    and the shortcuts for loaded rows match the pandas backend; the
+    country index describes the whole table and is left out.
+    """
+    columns = {
+        column: pd.Categorical.from_codes(result[column], dtype=dtype) if isinstance(dtype, pd.CategoricalDtype)
+        else result[column].astype(dtype, copy=False)
+        for column, dtype in data.dtypes.items()
+    }
+    rows = pd.DataFrame(columns, index=pd.Index(result['_row']))
+    rows.attrs = {'version': data.attrs['version']}
+    return rows
+
+def _code(data, country):
+    """Category code of ``country``, -1 if it is not in the data."""
+    return int(data.dtypes['country'].categories.get_indexer([country])[0])
+
+def _date_clause(date_range):
+    """SQL condition and parameters for an inclusive (start, end) range; either end may be None."""
+    clauses, params = [], []
+    if date_range is not None:
+        start, end = date_range
+        if start is not None:
+            clauses.append("date >= ?")
+            params.append(pd.Timestamp(start).to_pydatetime())
+        if end is not None:
+            clauses.append("date <= ?")
+            params.append(pd.Timestamp(end).to_pydatetime())
+    return ''.join(f" AND {clause}" for clause in clauses), params
+
+def filter_by_country(data, country, date_range=None):
+    clause, params = _date_clause(date_range)
+    return _rows(data, _query(data, f"SELECT * FROM covid WHERE country = ?{clause}", [_code(data, country), *params]))
+
+def select_countries(data, countries, date_range=None):
+    """
+    Rows of ``countries`` (unique) in the order given, and each one's row count.
+
+    ``data_fetcher.select_countries`` turns the counts into blocks.
+    """
+    codes = data.dtypes['country'].categories.get_indexer(countries)
+    known = codes[codes >= 0].tolist() or [-1]
+    clause, params = _date_clause(date_range)
+    # An IN list of constants is checked against each block's min/max; a list parameter is not
+    result = _query(data, f"SELECT * FROM covid WHERE country IN ({', '.join(map(str, known))}){clause}", params)
+    # Rows come in category order; put the countries in the order asked for
+    rank = np.zeros(len(data.dtypes['country'].categories), dtype='int64')
+    rank[codes[codes >= 0]] = np.flatnonzero(codes >= 0)
+    rows = _rows(data, result)
+    rows = rows.take(np.argsort(rank[result['country']], kind='stable'))
+    counts = np.bincount(result['country'], minlength=len(rank))
+    return rows, [int(counts[code]) if code >= 0 else 0 for code in codes]
+
+def filter_by_date_range(data, start_date, end_date):
+    clause, params = _date_clause((start_date, end_date))
+    return _rows(data, _query(data, f"SELECT * FROM covid WHERE true{clause}", params))
+
+def get_latest_metrics(data, country):
+    rows = _rows(data, _query(data, "SELECT * FROM covid WHERE _row = (SELECT max(_row) FROM covid WHERE country = ?)",
+                              [_code(data, country)]))
+    return rows.iloc[0] if len(rows) else None
+
+def get_date_snapshot(data, selected_date, columns):
+    """One row per country on ``selected_date``: country, iso_code, date and ``columns`` as floats."""
+    values = ''.join(f", {column}::DOUBLE AS {column}" for column in columns)
+    result = _query(data, f"SELECT country, iso_code, date{values} FROM covid WHERE date = ?",
+                    [pd.Timestamp(selected_date).to_pydatetime()])
+    if not len(result['country']):
+        return pd.DataFrame(columns=list(result))
+    snapshot = pd.DataFrame(result)
+    for column in ['country', 'iso_code']:
+        categories = data.dtypes[column].categories
+        snapshot[column] = pd.Categorical.from_codes(result[column], categories).astype(categories.dtype)
+    return snapshot
+
+def rollup_sums(data):
+    """
+    Daily and cumulative totals per continent and date, for ``rollups``.
+
+    A country's cumulative total on a date is its running maximum, carried
+    over missing days; it is summed as the daily rises of that maximum
+    (one window over each country's rows) and accumulated over dates.
+    Returns ``(dates, continents, population, sums)`` with ``sums`` as
+    ``(continent, date)`` arrays.
+    """
+    totals = _query(data, """
+        WITH rises AS (
+            SELECT continent, date, daily_cases, daily_deaths, daily_tests,
+                   greatest(cumulative_cases - coalesce(max(cumulative_cases) OVER w, 0), 0) AS cases,
+                   greatest(cumulative_deaths - coalesce(max(cumulative_deaths) OVER w, 0), 0) AS deaths
+            FROM covid WHERE continent >= 0
+            WINDOW w AS (PARTITION BY country ORDER BY date ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING)
+        )
+        SELECT continent, date,
+               sum(daily_cases)::DOUBLE AS daily_cases,
+               sum(daily_deaths)::DOUBLE AS daily_deaths,
+               sum(daily_tests)::DOUBLE AS daily_tests,
+               sum(cases)::DOUBLE AS cumulative_cases,
+               sum(deaths)::DOUBLE AS cumulative_deaths
+        FROM rises GROUP BY continent, date
+    """)
+    population = _query(data, """
+        SELECT continent, sum(population)::DOUBLE AS population FROM (
+            SELECT arg_min(continent, _row) AS continent, max(population) AS population
+            FROM covid WHERE continent >= 0 GROUP BY country
+        ) GROUP BY continent
+    """)
+
+    used = np.unique(totals['continent'])
+    continents = data.dtypes['continent'].categories[used]
+    dates = pd.DatetimeIndex(np.unique(totals['date']))
+    row, col = np.searchsorted(used, totals['continent']), dates.get_indexer(totals['date'])
+    sums = {}
+    for column in [name for name in totals if name not in ('continent', 'date')]:
+        matrix = np.zeros((len(used), len(dates)))
+        matrix[row, col] = np.nan_to_num(totals[column])
+        sums[column] = np.cumsum(matrix, axis=1) if column.startswith('cumulative') else matrix
+    totals_by_continent = np.zeros(len(used))
+    totals_by_continent[np.searchsorted(used, population['continent'])] = population['population']
+    return dates, continents, totals_by_continent, sums
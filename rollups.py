@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+import query_engine
+from data_fetcher import dataset_version, has_country_index, uses_query_engine
+from dataset_cache import cache_per_version
+from instrumentation import timed
+from metrics import case_fatality_rate, per_100k
+
+GLOBAL_GROUP = 'World'
+
+# Daily and cumulative totals summed over the countries of each group
+ROLLUP_COLUMNS = ['daily_cases', 'daily_deaths', 'daily_tests', 'cumulative_cases', 'cumulative_deaths']
+
+# Window of the trailing averages of the daily series
+ROLLING_DAYS = 7
+
+def _trailing_mean(values, window=ROLLING_DAYS):
+    """Trailing mean along the last axis; the first days average what is available."""
+    totals = np.cumsum(values, axis=-1)
+    totals[..., window:] = totals[..., window:] - totals[..., :-window]
+    counts = np.minimum(np.arange(1, values.shape[-1] + 1), window)
+    return totals / counts
+
+def _rollup_sums(data):
+    """
+    ``(dates, continents, population, sums)`` of the country rows, with
+    the sums of each ``ROLLUP_COLUMNS`` column as ``(continent, date)``
+    arrays; see ``_build_rollups``.
+    """
+    countries = data[data['continent'].notna()]
+    continent = countries['continent'].astype('category').cat.remove_unused_categories()
+    country = countries['country'].astype('category').cat.remove_unused_categories()
+    dates = pd.DatetimeIndex(countries['date'].unique()).sort_values()
+
+    row = dates.get_indexer(countries['date'])
+    col = country.cat.codes.to_numpy()
+    n_dates, n_countries, n_continents = len(dates), len(country.cat.categories), len(continent.cat.categories)
+
+    # Continent of each country (its first row)
+    country_continent = pd.Series(continent.cat.codes.to_numpy(), index=col).groupby(level=0).first()
+    country_continent = country_continent.reindex(range(n_countries)).to_numpy(dtype=np.intp)
+    population = pd.Series(countries['population'].to_numpy(dtype=float), index=col).groupby(level=0).max()
+    population = np.bincount(country_continent, weights=population.reindex(range(n_countries)).to_numpy(),
+                             minlength=n_continents)
+
+    sums = {}
+    for column in ROLLUP_COLUMNS:
+        values = countries[column].to_numpy(dtype=float)
+        if column.startswith('cumulative'):
+            matrix = np.zeros((n_countries, n_dates))
+            matrix[col, row] = np.nan_to_num(values)
+            np.maximum.accumulate(matrix, axis=1, out=matrix)
+            sums[column] = np.zeros((n_continents, n_dates))
+            np.add.at(sums[column], country_continent, matrix)
+        else:
+            codes = country_continent[col]
+            sums[column] = np.bincount(codes * n_dates + row, weights=np.nan_to_num(values),
+                                       minlength=n_continents * n_dates).reshape(n_continents, n_dates)
+    return dates, pd.Index(continent.cat.categories), population, sums
+
+@timed('aggregate')
+def _build_rollups(data):
+    """
+    Sum the country rows into per-continent and global daily series.
+
+    Aggregate rows that OWID ships (World, continents, income groups) have
+    no continent and are left out, so nothing is counted twice. Each
+    series is a dense ``(group, date)`` float array: groups are the
+    continents followed by ``GLOBAL_GROUP``, dates are every date in
+    ``data``. Cumulative totals take each country's running maximum, so a
+    missing or zero-filled day does not dip the sum. With the DuckDB
+    backend the sums are one SQL aggregation.
+    """
+    if uses_query_engine(data):
+        dates, continents, population, sums = query_engine.rollup_sums(data)
+    else:
+        dates, continents, population, sums = _rollup_sums(data)
+
+    series = {column: np.vstack([values, values.sum(axis=0)]) for column, values in sums.items()}
+    population = np.append(population, population.sum())
+
+    for column in ['daily_cases', 'daily_deaths']:
+        series[f"{column}_{ROLLING_DAYS}d"] = _trailing_mean(series[column])
+    series['cfr'] = case_fatality_rate(series['cumulative_deaths'], series['cumulative_cases'])
+    for column in [*ROLLUP_COLUMNS, f"daily_cases_{ROLLING_DAYS}d", f"daily_deaths_{ROLLING_DAYS}d"]:
+        series[f"{column}_per_100k"] = per_100k(series[column], population[:, None])
+
+    return {
+        'dates': dates,
+        'groups': pd.Index([*continents, GLOBAL_GROUP]),
+        'population': population,
+        'series': series
+    }
+
+@cache_per_version(max_entries=2)
+def _cached_rollups(data, version):
+    return _build_rollups(data)
+
+def get_rollups(data):
+    """
+    Return the continent and global rollups of ``data``.
+
+    Built once per dataset version and shared by all sessions; other
+    frames (including ones derived from a loaded dataset) are aggregated
+    on every call.
+    """
+    version = dataset_version(data)
+    if version is None or not has_country_index(data):
+        return _build_rollups(data)
+    return _cached_rollups(data, version)
+
+def rollup_groups(data):
+    """Continents in the dataset, followed by ``GLOBAL_GROUP``."""
+    return list(get_rollups(data)['groups'])
+
+def _group_position(rollups, group):
+    position = rollups['groups'].get_indexer([group])[0]
+    if position < 0:
+        raise KeyError(group)
+    return position
+
+def rollup_series(data, group):
+    """
+    Return the daily series of one continent (or ``GLOBAL_GROUP``).
+
+    One row per date with every rollup column; a view over the prebuilt
+    arrays, so the cost depends on the number of dates, not rows.
+    """
+    rollups = get_rollups(data)
+    position = _group_position(rollups, group)
+    series = {column: values[position] for column, values in rollups['series'].items()}
+    return pd.DataFrame({'date': rollups['dates'], **series})
+
+def rollup_latest(data, group):
+    """Latest day of one group, shaped like ``get_latest_metrics`` rows (None if empty)."""
+    rollups = get_rollups(data)
+    position = _group_position(rollups, group)
+    if len(rollups['dates']) == 0:
+        return None
+    latest = {column: values[position, -1] for column, values in rollups['series'].items()}
+    return pd.Series({
+        'country': group,
+        'date': rollups['dates'][-1],
+        'population': rollups['population'][position],
+        **latest
+    })
+
+def rollup_snapshot(data, column):
+    """Latest value of ``column`` for every continent, indexed by continent."""
+    rollups = get_rollups(data)
+    values = rollups['series'][column][:-1, -1] if len(rollups['dates']) else []
+    return pd.Series(values, index=rollups['groups'][:-1], name=column)
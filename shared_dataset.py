@@ -0,0 +1,125 @@
+import json
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+from data_fetcher import SNAPSHOT_DIR, dataset_version, set_country_index
+
+# Set to 1 to share one memory-mapped copy of the dataset per host
+SHARED_DATASET = os.environ.get('COVID_TRACKER_SHARED_DATASET', '0') == '1'
+
+SHARED_DIR = os.path.join(SNAPSHOT_DIR, 'shared')
+
+# Published versions kept on disk; older ones may still be mapped elsewhere
+KEEP_VERSIONS = 2
+
+def publish_dataset(df, shared_dir=None):
+    """
+    Write ``df`` as one ``.npy`` file per column for memory mapping.
+
+    Categorical columns are stored as their integer codes with the labels
+    in ``meta.json``. The version directory is written under a temporary
+    name and renamed into place, then ``latest.json`` is pointed at it.
+    Returns the version directory.
+    """
+    shared_dir = shared_dir or SHARED_DIR
+    version = dataset_version(df) or format(int(pd.util.hash_pandas_object(df, index=False).sum()), 'x')
+    target = os.path.join(shared_dir, version)
+
+    if not os.path.isdir(target):
+        staging = f"{target}.{os.getpid()}.tmp"
+        os.makedirs(staging, exist_ok=True)
+        columns = []
+        for position, column in enumerate(df.columns):
+            series = df[column]
+            entry = {'name': column, 'file': f"{position}.npy"}
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                entry['categories'] = series.cat.categories.tolist()
+                values = series.cat.codes.to_numpy()
+            else:
+                values = series.to_numpy()
+            np.save(os.path.join(staging, entry['file']), values)
+            columns.append(entry)
+        with open(os.path.join(staging, 'meta.json'), 'w') as f:
+            json.dump({'rows': len(df), 'columns': columns, 'attrs': dict(df.attrs, version=version)}, f)
+        try:
+            os.rename(staging, target)
+        except OSError:
+            # Another process published the same version first
+            shutil.rmtree(staging, ignore_errors=True)
+
+    pointer = os.path.join(shared_dir, 'latest.json')
+    with open(pointer + '.tmp', 'w') as f:
+        json.dump({'version': version, 'published_at': time.time()}, f)
+    os.replace(pointer + '.tmp', pointer)
+    _remove_old_versions(shared_dir, version)
+    return target
+
+def _remove_old_versions(shared_dir, current):
+    """Delete all but the newest KEEP_VERSIONS published versions."""
+    versions = [
+        entry for entry in os.scandir(shared_dir)
+        if entry.is_dir() and not entry.name.endswith('.tmp') and entry.name != current
+    ]
+    versions.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in versions[KEEP_VERSIONS - 1:]:
+        # Mapped files stay readable for processes that still use them
+        # (POSIX); on Windows removal fails and is retried next publish
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+def attach_dataset(version_dir):
+    """
+    Build a read-only DataFrame over the column files in ``version_dir``.
+
+    Every column is a memory map of the published file, so all processes
+    attached to the same version share one copy in the OS page cache.
+    """
+    with open(os.path.join(version_dir, 'meta.json')) as f:
+        meta = json.load(f)
+
+    columns = {}
+    for entry in meta['columns']:
+        values = np.load(os.path.join(version_dir, entry['file']), mmap_mode='r')
+        if 'categories' in entry:
+            values = pd.Categorical.from_codes(
+                values, dtype=pd.CategoricalDtype(entry['categories']), validate=False
+            )
+        columns[entry['name']] = values
+
+    df = pd.DataFrame(columns, copy=False)
+    df.attrs.update(meta['attrs'])
+    if 'country_index' in df.attrs:
+        index = df.attrs['country_index']
+        set_country_index(df, index['starts'], index['stops'])
+    return df
+
+def _published_version(shared_dir, max_age):
+    """Return the directory of the latest version younger than ``max_age``."""
+    try:
+        with open(os.path.join(shared_dir, 'latest.json')) as f:
+            pointer = json.load(f)
+    except (OSError, ValueError):
+        return None
+    version_dir = os.path.join(shared_dir, pointer['version'])
+    if time.time() - pointer['published_at'] > max_age or not os.path.isdir(version_dir):
+        return None
+    return version_dir
+
+def published_dataset(max_age=3600):
+    """Attach to the latest published version if it is younger than ``max_age`` seconds, else None."""
+    version_dir = _published_version(SHARED_DIR, max_age)
+    if version_dir is None:
+        return None
+    try:
+        return attach_dataset(version_dir)
+    except (OSError, ValueError):
+        return None  # Removed by a newer publish; load and publish again
+
+def share_dataset(data):
+    """
+    Publish ``data`` and return the memory-mapped copy in its place.
+
+    Raises OSError when the shared directory cannot be written.
+    """
+    return attach_dataset(publish_dataset(data))
@@ -0,0 +1,314 @@
+"""
+Source adapters that load several datasets into one.
+
+Each adapter returns a frame with ``SOURCE_COLUMNS`` (the cleaned
+column names, before ``clean_covid_data`` fills and downcasts them), so
+the merged data is cleaned and indexed exactly like the OWID file alone.
+
+Adapters run concurrently in worker processes. A worker stores its
+result as the source's cached copy (Parquet under the cache directory),
+which is also how it is handed back. A source that fails, or is still
+running after ``SOURCE_TIMEOUT``, is served from its previous copy while
+its fetch finishes in the background, so one slow source never holds up
+the others.
+"""
+import glob
+import io
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import data_fetcher
+from data_fetcher import (
+    OWID_CONTINENTS, OWID_RENAMES, REQUEST_HEADERS, SESSION, SNAPSHOT_DIR, DataUnavailableError, StaleDataError,
+    clean_covid_data, prepare_dataset, refresh_covid_data
+)
+
+# Sources merged into the dataset, highest priority first: where two
+# sources have a row for the same country and date, the first one wins
+ENABLED_SOURCES = [name.strip() for name in os.environ.get('COVID_TRACKER_SOURCES', 'owid').split(',') if name.strip()]
+
+# Directory of internal regional CSVs (OWID column names) for the ``local`` source
+LOCAL_SOURCE_DIR = os.environ.get(
+    'COVID_TRACKER_LOCAL_SOURCE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'regional')
+)
+
+# Seconds to wait for a source before serving its cached copy
+SOURCE_TIMEOUT = float(os.environ.get('COVID_TRACKER_SOURCE_TIMEOUT', 60))
+
+SOURCE_CACHE_DIR = os.path.join(SNAPSHOT_DIR, 'sources')
+
+SOURCE_COLUMNS = [
+    'country', 'iso_code', 'continent', 'date',
+    'daily_cases', 'daily_deaths', 'daily_tests', 'cumulative_cases', 'cumulative_deaths', 'population'
+]
+
+JHU_URLS = {
+    'cases': "https://raw.githubusercontent.com/CSSEGISandData/COVID-19/master/csse_covid_19_data/"
+             "csse_covid_19_time_series/time_series_covid19_confirmed_global.csv",
+    'deaths': "https://raw.githubusercontent.com/CSSEGISandData/COVID-19/master/csse_covid_19_data/"
+              "csse_covid_19_time_series/time_series_covid19_deaths_global.csv"
+}
+
+# JHU country names that OWID spells differently
+JHU_COUNTRY_NAMES = {
+    'US': 'United States',
+    'Korea, South': 'South Korea',
+    'Korea, North': 'North Korea',
+    'Taiwan*': 'Taiwan',
+    'Burma': 'Myanmar',
+    'Congo (Kinshasa)': 'Democratic Republic of Congo',
+    'Congo (Brazzaville)': 'Congo',
+    'Cabo Verde': 'Cape Verde',
+    'Timor-Leste': 'East Timor',
+    'West Bank and Gaza': 'Palestine',
+    'Holy See': 'Vatican',
+    'Micronesia': 'Micronesia (country)'
+}
+
+# name -> {'label', 'load'}; see _register
+SOURCES = {}
+
+def _register(name, label, load):
+    """
+    Add a source adapter.
+
+    ``load()`` runs in a worker process and returns a frame with
+    ``SOURCE_COLUMNS``; unknown values (e.g. population) may be missing.
+    """
+    SOURCES[name] = {'label': label, 'load': load}
+
+def _load_owid():
+    # Same incremental refresh and snapshot as the OWID-only mode
+    try:
+        df, _ = refresh_covid_data()
+    except StaleDataError as e:
+        # Fail like any other source (its cached copy is served); the
+        # snapshot in the error would not survive the trip between processes
+        raise DataUnavailableError(str(e)) from None
+    return df
+
+def _fetch_bytes(url, timeout=30):
+    if os.path.exists(url):
+        with open(url, 'rb') as f:
+            return f.read()
+    response = SESSION.get(url, headers=REQUEST_HEADERS, timeout=timeout)
+    response.raise_for_status()
+    return response.content
+
+def _read_jhu_csv(url):
+    """One JHU time-series file as a (country, date) matrix of totals, provinces summed."""
+    wide = pd.read_csv(io.BytesIO(_fetch_bytes(url)))
+    totals = wide.drop(columns=['Province/State', 'Lat', 'Long']).groupby('Country/Region', sort=True).sum()
+    totals.columns = pd.to_datetime(totals.columns, format='%m/%d/%y')
+    return totals
+
+def jhu_frame(cases, deaths):
+    """
+    Reshape JHU's wide cumulative totals into one row per country and date.
+
+    ``cases`` and ``deaths`` are (country, date) frames as from
+    ``_read_jhu_csv``. The matrices are aligned, differenced along the
+    date axis for the daily counts and flattened in one go, no per-country
+    loop or melt.
+    """
+    countries = cases.index.union(deaths.index)
+    dates = cases.columns.union(deaths.columns)
+    totals = {
+        column: frame.reindex(index=countries, columns=dates).ffill(axis=1).fillna(0).to_numpy(dtype=float)
+        for column, frame in [('cumulative_cases', cases), ('cumulative_deaths', deaths)]
+    }
+    names = pd.Index(countries).map(lambda name: JHU_COUNTRY_NAMES.get(name, name))
+    n_countries, n_dates = len(countries), len(dates)
+    return pd.DataFrame({
+        'country': np.repeat(names.to_numpy(dtype=object), n_dates),
+        'iso_code': None,
+        'continent': None,
+        'date': np.tile(dates.to_numpy(), n_countries),
+        'daily_cases': np.diff(totals['cumulative_cases'], axis=1, prepend=0).ravel(),
+        'daily_deaths': np.diff(totals['cumulative_deaths'], axis=1, prepend=0).ravel(),
+        'daily_tests': np.nan,
+        'cumulative_cases': totals['cumulative_cases'].ravel(),
+        'cumulative_deaths': totals['cumulative_deaths'].ravel(),
+        'population': np.nan
+    })
+
+def _load_jhu():
+    # The two files download and parse side by side
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix='jhu') as pool:
+        cases, deaths = pool.map(_read_jhu_csv, [JHU_URLS['cases'], JHU_URLS['deaths']])
+    return jhu_frame(cases, deaths)
+
+def _complete_counts(frame):
+    """Fill missing daily counts from the totals and vice versa, per country in date order."""
+    frame = frame.sort_values(['country', 'date'], ignore_index=True)
+    for daily, cumulative in [('daily_cases', 'cumulative_cases'), ('daily_deaths', 'cumulative_deaths')]:
+        if daily not in frame and cumulative in frame:
+            frame[daily] = frame.groupby('country', sort=False)[cumulative].diff().fillna(frame[cumulative])
+        elif cumulative not in frame and daily in frame:
+            frame[cumulative] = frame[daily].fillna(0).groupby(frame['country'], sort=False).cumsum()
+    return frame.reindex(columns=SOURCE_COLUMNS)
+
+def _load_local():
+    paths = sorted(glob.glob(os.path.join(LOCAL_SOURCE_DIR, '*.csv')))
+    if not paths:
+        raise FileNotFoundError(f"No CSV files in {LOCAL_SOURCE_DIR}")
+    wanted = {'location', 'iso_code', 'continent', 'date', 'population', *OWID_RENAMES}
+    frames = [
+        pd.read_csv(path, usecols=lambda column: column in wanted, parse_dates=['date']).rename(columns=OWID_RENAMES)
+        for path in paths
+    ]
+    return pd.concat([_complete_counts(frame) for frame in frames], ignore_index=True)
+
+_register('owid', "Our World in Data", _load_owid)
+_register('jhu', "Johns Hopkins University", _load_jhu)
+_register('local', "Regional CSVs", _load_local)
+
+def _cache_path(name):
+    return os.path.join(SOURCE_CACHE_DIR, f"{name}.parquet")
+
+def _settings():
+    """Module settings a worker must share with this process (tests and benchmarks change them)."""
+    return {'owid_urls': list(data_fetcher.OWID_URLS), 'jhu_urls': dict(JHU_URLS), 'local_dir': LOCAL_SOURCE_DIR}
+
+def _run_source(name, settings):
+    """Worker: load one source and store it as its cached copy. Returns the row count."""
+    global LOCAL_SOURCE_DIR
+    data_fetcher.OWID_URLS[:] = settings['owid_urls']
+    JHU_URLS.update(settings['jhu_urls'])
+    LOCAL_SOURCE_DIR = settings['local_dir']
+
+    frame = SOURCES[name]['load']()[SOURCE_COLUMNS]
+    frame.attrs = {}  # Parquet would keep the OWID frame's index and version
+    for column in ['country', 'iso_code', 'continent']:
+        frame[column] = frame[column].astype(object)
+    os.makedirs(SOURCE_CACHE_DIR, exist_ok=True)
+    path = _cache_path(name)
+    frame.to_parquet(f"{path}.{os.getpid()}.tmp", index=False)
+    os.replace(f"{path}.{os.getpid()}.tmp", path)
+    return len(frame)
+
+def _read_cached(name):
+    """The last stored copy of a source and when it was written, or ``(None, None)``."""
+    try:
+        path = _cache_path(name)
+        return pd.read_parquet(path), os.path.getmtime(path)
+    except (OSError, ValueError, ImportError):
+        return None, None
+
+_pool = None
+_pool_lock = threading.Lock()
+_pending = {}  # source name -> future of its latest fetch
+
+def _submit(names):
+    """Start a fetch of each source, reusing one that is still running."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: the app process has threads, and it is the only choice on Windows
+            _pool = ProcessPoolExecutor(max_workers=len(SOURCES), mp_context=multiprocessing.get_context('spawn'))
+        futures = {}
+        for name in names:
+            future = _pending.get(name)
+            if future is None or future.done():
+                try:
+                    future = _pool.submit(_run_source, name, _settings())
+                except BrokenProcessPool:
+                    _pool = ProcessPoolExecutor(max_workers=len(SOURCES), mp_context=multiprocessing.get_context('spawn'))
+                    future = _pool.submit(_run_source, name, _settings())
+                _pending[name] = future
+            futures[name] = future
+        return futures
+
+def merge_sources(frames):
+    """
+    Combine normalized source frames, the first frame winning where two
+    have the same country and date.
+
+    Countries keep their iso code, continent and population from
+    whichever source has them, so JHU rows of an OWID country are
+    attributed to its continent.
+    """
+    combined = pd.concat([
+        frame.astype({'country': object, 'iso_code': object, 'continent': object})[SOURCE_COLUMNS]
+        for frame in frames
+    ], ignore_index=True)
+    combined = combined.drop_duplicates(['country', 'date'], keep='first', ignore_index=True)
+    by_country = combined.groupby('country', sort=False)
+    for column in ['iso_code', 'continent', 'population']:
+        combined[column] = combined[column].fillna(by_country[column].transform('first'))
+    return combined.astype({
+        'country': 'category',
+        'iso_code': 'category',
+        'continent': pd.CategoricalDtype(OWID_CONTINENTS)
+    })
+
+def load_sources(names=None, timeout=None):
+    """
+    Load and merge ``names`` (default ``ENABLED_SOURCES``), in priority order.
+
+    Returns ``(df, notices)`` like ``fetch_covid_data``. Sources that fail
+    or time out are served from their cached copy with a warning; raises
+    DataUnavailableError when none of them has any data.
+    """
+    df, notices, _ = _load_sources(names, timeout)
+    return df, notices
+
+def _load_sources(names, timeout):
+    """``load_sources``, plus when the oldest cached copy served was written (None if all are fresh)."""
+    names = list(names or ENABLED_SOURCES)
+    unknown = [name for name in names if name not in SOURCES]
+    if unknown:
+        raise ValueError(f"Unknown data sources: {', '.join(unknown)} (known: {', '.join(SOURCES)})")
+
+    futures = _submit(names)
+    wait(list(futures.values()), timeout=SOURCE_TIMEOUT if timeout is None else timeout)
+    frames, loaded, notices, errors, stale = [], [], [], [], []
+    for name in names:
+        future, label = futures[name], SOURCES[name]['label']
+        fresh = future.done() and future.exception() is None
+        frame, saved_at = _read_cached(name)
+        if frame is None:
+            problem = (future.exception() or 'no stored copy') if future.done() else 'still loading'
+            errors.append(f"{label}: {problem}")
+            notices.append(('warning', f"⚠️ {label} is unavailable ({problem})"))
+            continue
+        if not fresh:
+            problem = 'failed' if future.done() else 'is slow'
+            notices.append(('warning', f"⚠️ {label} {problem}, showing its copy from "
+                                       f"{datetime.fromtimestamp(saved_at):%Y-%m-%d %H:%M}"))
+            stale.append(saved_at)
+        frames.append(frame)
+        loaded.append(SOURCES[name]['label'])
+
+    if not frames:
+        raise DataUnavailableError('; '.join(errors))
+    labels = ', '.join(loaded)
+    notices.insert(0, ('success', f"✅ Loaded data from: {labels}"))
+    return prepare_dataset(clean_covid_data(merge_sources(frames))), notices, min(stale, default=None)
+
+def build_from_sources(force=False):
+    """
+    Refresher build function for multi-source mode; see ``dataset_refresher``.
+
+    A source served from its cached copy shows up as a warning in
+    ``notices``, which makes the refresh count as failed, and ``saved_at``
+    dates the data by the oldest copy.
+    """
+    started = time.perf_counter()
+    data, notices, saved_at = _load_sources(None, None)
+    return data, {
+        'mode': 'sources',
+        'rows': len(data),
+        'removed': 0,
+        'countries': int(data['country'].nunique()),
+        'notices': notices,
+        'saved_at': saved_at,
+        'seconds': round(time.perf_counter() - started, 3)
+    }
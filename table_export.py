@@ -0,0 +1,172 @@
+import glob
+import gzip
+import io
+import os
+import numpy as np
+from data_fetcher import SNAPSHOT_DIR, dataset_version, filter_by_country
+from dataset_cache import cache_per_version
+from instrumentation import timed
+from metrics import country_metric, metric_label
+
+# Dataset column -> table heading
+TABLE_COLUMNS = {
+    'date': 'Date',
+    'daily_cases': 'Daily Cases',
+    'daily_deaths': 'Daily Deaths',
+    'cumulative_cases': 'Cumulative Cases',
+    'cumulative_deaths': 'Cumulative Deaths',
+    'cfr': 'CFR (%)'
+}
+
+# Counts are shown as integers; derived metrics keep NaN where undefined
+COUNT_COLUMNS = ['daily_cases', 'daily_deaths', 'cumulative_cases', 'cumulative_deaths']
+
+SORT_ORDERS = ["Date (Newest)", "Date (Oldest)", "Cases (High to Low)"]
+
+# Label -> (file extension, mime type)
+EXPORT_FORMATS = {
+    "CSV (gzip)": ('csv.gz', 'application/gzip'),
+    "Parquet": ('parquet', 'application/vnd.apache.parquet')
+}
+
+# Rows formatted and written at a time by the all-countries export
+EXPORT_CHUNK_ROWS = 100000
+
+def sort_positions(rows, sort_by):
+    """Positions of ``rows`` (one country, by date) in the order of ``sort_by``."""
+    if sort_by == "Date (Newest)":
+        return np.arange(len(rows))[::-1]
+    if sort_by == "Date (Oldest)":
+        return np.arange(len(rows))
+    # Like nlargest: highest first, ties in date order
+    return np.argsort(-rows['cumulative_cases'].to_numpy(dtype=float), kind='stable')
+
+def format_table(rows, extra_metrics=(), dates_as_text=True):
+    """Rename ``rows`` to table headings with counts as integers."""
+    table = rows[[*TABLE_COLUMNS, *extra_metrics]].fillna({column: 0 for column in [*COUNT_COLUMNS, 'cfr']})
+    table = table.astype({column: 'int' for column in COUNT_COLUMNS})
+    if dates_as_text:
+        table['date'] = table['date'].dt.strftime('%Y-%m-%d')
+    return table.rename(columns={**TABLE_COLUMNS, **{name: metric_label(name) for name in extra_metrics}})
+
+def _country_rows(data, country):
+    rows = filter_by_country(data, country)
+    rows.attrs = {}  # Otherwise every later column access deep-copies the country index
+    return rows
+
+def _country_table(data, country, rows, positions, extra_metrics, dates_as_text=True):
+    table = rows.iloc[positions].assign(**{name: country_metric(data, country, name)[positions] for name in extra_metrics})
+    return format_table(table, extra_metrics, dates_as_text)
+
+@timed('table')
+def table_page(data, country, sort_by, page, page_size, extra_metrics=()):
+    """
+    Return one page of a country's table and the total row count.
+
+    Only the rows on the page are copied and formatted, so the cost does
+    not grow with the length of the country's history.
+    """
+    rows = _country_rows(data, country)
+    positions = sort_positions(rows, sort_by)
+    page_positions = positions[page * page_size:(page + 1) * page_size]
+    return _country_table(data, country, rows, page_positions, list(extra_metrics)), len(positions)
+
+def _encode(table, export_format):
+    buffer = io.BytesIO()
+    if EXPORT_FORMATS[export_format][0] == 'parquet':
+        table.to_parquet(buffer, index=False)
+    else:
+        with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=6, mtime=0) as f:
+            f.write(table.to_csv(index=False).encode())
+    return buffer.getvalue()
+
+def _build_country_export(data, country, sort_by, extra_metrics, export_format):
+    rows = _country_rows(data, country)
+    table = _country_table(data, country, rows, sort_positions(rows, sort_by), list(extra_metrics), dates_as_text=False)
+    return _encode(table, export_format)
+
+@cache_per_version(max_entries=32)
+def _cached_country_export(data, version, country, sort_by, extra_metrics, export_format):
+    return _build_country_export(data, country, sort_by, extra_metrics, export_format)
+
+@timed('export')
+def export_country(data, country, sort_by, extra_metrics, export_format):
+    """
+    Return a country's whole table as ``export_format`` bytes.
+
+    Meant to be passed (wrapped in a lambda) as a download button's
+    ``data`` so it only runs on click; cached per country, sort order,
+    metrics and data version.
+    """
+    version = dataset_version(data)
+    if version is None:
+        return _build_country_export(data, country, sort_by, tuple(extra_metrics), export_format)
+    return _cached_country_export(data, version, country, sort_by, tuple(extra_metrics), export_format)
+
+def _export_chunks(data):
+    """The whole table, ``EXPORT_CHUNK_ROWS`` rows at a time, formatted for export."""
+    for start in range(0, len(data), EXPORT_CHUNK_ROWS):
+        chunk = data.iloc[start:start + EXPORT_CHUNK_ROWS]
+        chunk.attrs = {}
+        table = format_table(chunk, dates_as_text=False)
+        table.insert(0, 'Country', chunk['country'].astype(str).to_numpy())
+        yield table
+
+def _write_all_export(data, path, export_format):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    if EXPORT_FORMATS[export_format][0] == 'parquet':
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for table in _export_chunks(data):
+                batch = pa.Table.from_pandas(table, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp, batch.schema)
+                writer.write_table(batch)
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        # Named explicitly, or the member takes the staging file's name
+        with open(tmp, 'wb') as raw, \
+                gzip.GzipFile(filename='covid_data.csv', mode='wb', compresslevel=6, fileobj=raw) as compressed, \
+                io.TextIOWrapper(compressed, encoding='utf-8', newline='') as f:
+            for i, table in enumerate(_export_chunks(data)):
+                table.to_csv(f, index=False, header=i == 0)
+    os.replace(tmp, path)
+
+@timed('export')
+def export_all_path(data, export_format):
+    """
+    Path of a file with every country's rows as ``export_format``.
+
+    The file is written chunk by chunk to the cache directory, so no full
+    CSV string is ever held in memory, and reused for the data version
+    (files of older versions are removed).
+    """
+    extension = EXPORT_FORMATS[export_format][0]
+    version = dataset_version(data)
+    path = os.path.join(SNAPSHOT_DIR, f"export-{version or 'unversioned'}.{extension}")
+    if version is None or not os.path.exists(path):
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        _write_all_export(data, path, export_format)
+        for old in glob.glob(os.path.join(SNAPSHOT_DIR, f"export-*.{extension}")):
+            if old != path:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+    return path
+
+def export_all_countries(data, export_format):
+    """
+    Every country's rows as ``export_format`` bytes, for the callable
+    ``data`` of ``st.download_button``.
+
+    Streamlit keeps the bytes in its media storage for the download; the
+    HTTP API's ``/api/export/{format}`` streams the file from disk instead.
+    """
+    with open(export_all_path(data, export_format), 'rb') as f:
+        return f.read()
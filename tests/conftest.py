@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+# The app's modules, and the synthetic data and local mirror of the benchmarks
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'benchmarks')]
+
+import data_fetcher  # noqa: E402
+from local_server import serve_csv  # noqa: E402
+from synthetic import write_owid_csv  # noqa: E402
+
+@pytest.fixture(scope='session')
+def dataset_csv(tmp_path_factory):
+    """A small synthetic OWID file: 12 countries and 7 aggregates over 60 days."""
+    return write_owid_csv(str(tmp_path_factory.mktemp('owid') / 'owid-covid-data.csv'), scale=0.05, days=60)
+
+@pytest.fixture
+def dataset(dataset_csv):
+    """The file of ``dataset_csv`` loaded as the app loads it (cleaned, indexed, versioned)."""
+    with open(dataset_csv, 'rb') as f:
+        return data_fetcher.prepare_dataset(data_fetcher.clean_covid_data(data_fetcher._read_owid_csv(f)))
+
+@pytest.fixture
+def mirror(tmp_path, monkeypatch):
+    """A small OWID file served locally as the only source, with a snapshot of it taken."""
+    cache = tmp_path / 'cache'
+    monkeypatch.setattr(data_fetcher, 'SNAPSHOT_DIR', str(cache))
+    monkeypatch.setattr(data_fetcher, 'SNAPSHOT_DATA', str(cache / 'owid-covid-data.parquet'))
+    monkeypatch.setattr(data_fetcher, 'SNAPSHOT_META', str(cache / 'owid-covid-data.json'))
+    monkeypatch.setattr(data_fetcher, 'SNAPSHOT_LINES', str(cache / 'owid-covid-data.lines.npz'))
+    csv = write_owid_csv(str(tmp_path / 'owid-covid-data.csv'), scale=0.05, days=30)
+    server, url = serve_csv(csv)
+    monkeypatch.setattr(data_fetcher, 'OWID_URLS', [url])
+    data_fetcher.fetch_covid_data()
+    yield server
+    server.shutdown()
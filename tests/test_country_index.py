@@ -0,0 +1,48 @@
+"""
+The country index is only used on the frame it was built for: frames
+derived from a loaded dataset carry a copy of it in ``attrs`` (pandas
+copies them), and must be answered as if they had none.
+"""
+import pandas as pd
+import pytest
+
+import data_fetcher
+import page_state
+import rollups
+
+DERIVED = {
+    'sorted': lambda data: data.sort_values('cumulative_cases', ignore_index=True),
+    'reversed': lambda data: data.iloc[::-1].reset_index(drop=True),
+    'copy': lambda data: data.copy(),
+    'one_continent': lambda data: data[data['continent'] == 'Asia'].reset_index(drop=True)
+}
+
+def _countries(data):
+    return [str(country) for country in data['country'].unique()]
+
+def _mask_filter(data, country):
+    return data[data['country'] == country].sort_values('date').reset_index(drop=True)
+
+@pytest.mark.parametrize('derive', DERIVED.values(), ids=DERIVED)
+def test_lookups_on_derived_frames(dataset, derive):
+    derived = derive(dataset)
+    assert data_fetcher.has_country_index(dataset)
+    assert not data_fetcher.has_country_index(derived)
+    for country in _countries(derived):
+        expected = _mask_filter(derived, country)
+        rows = data_fetcher.filter_by_country(derived, country).reset_index(drop=True)
+        pd.testing.assert_frame_equal(rows, expected)
+        latest = data_fetcher.get_latest_metrics(derived, country)
+        assert (latest['country'], latest['date']) == (country, expected['date'].iloc[-1])
+
+@pytest.mark.parametrize('derive', DERIVED.values(), ids=DERIVED)
+def test_dataset_caches_skip_derived_frames(dataset, derive):
+    # Warm the caches of the loaded dataset first
+    data_fetcher.get_date_partitions(dataset)
+    rollups.get_rollups(dataset)
+    page_state.get_dimensions(dataset)
+    derived = derive(dataset)
+    assert page_state.get_dimensions(derived)['countries'] == sorted(_countries(derived))
+    partitions = data_fetcher.get_date_partitions(derived)
+    assert partitions['present'].sum() == len(derived)
+    assert rollups.get_rollups(derived)['groups'].tolist()[:-1] == sorted(derived['continent'].dropna().unique())
@@ -0,0 +1,90 @@
+"""
+An outage is a failed refresh: the served data and its age stay as they
+were, and a cold start serves the saved snapshot with the snapshot's age.
+"""
+import json
+import os
+
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+import data_fetcher
+from dataset_refresher import DatasetRefresher, _build_private, get_refresher
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+@pytest.fixture
+def outage(mirror):
+    mirror.status = 503
+    return mirror
+
+def _drop_saved_at():
+    with open(data_fetcher.SNAPSHOT_META) as f:
+        meta = json.load(f)
+    del meta['saved_at']
+    with open(data_fetcher.SNAPSHOT_META, 'w') as f:
+        json.dump(meta, f)
+
+def test_outage_is_a_failure(mirror):
+    refresher = DatasetRefresher(_build_private)
+    data = refresher.get()
+    refreshed_at = refresher.stats()['refreshed_at']
+    mirror.status = 503
+    with pytest.raises(data_fetcher.StaleDataError):
+        refresher.refresh(force=True)
+    stats = refresher.stats()
+    assert refresher.current() is data
+    assert (stats['refreshes'], stats['failures'], stats['consecutive_failures']) == (1, 1, 1)
+    assert stats['refreshed_at'] == refreshed_at
+
+def test_notices_of_the_last_build(mirror):
+    refresher = DatasetRefresher(_build_private)
+    refresher.get()
+    (level, message), = refresher.stats()['notices']
+    assert level == 'success' and message.startswith('✅ Data unchanged at 127.0.0.1')
+    mirror.status = 503
+    with pytest.raises(data_fetcher.StaleDataError):
+        refresher.refresh(force=True)
+    assert refresher.stats()['notices'] == []
+
+def test_build_partly_from_older_copies_is_a_failure(mirror):
+    data, _ = data_fetcher.fetch_covid_data()
+    stale = ('warning', "⚠️ Johns Hopkins University failed, showing its copy from 2024-01-01 00:00")
+    summary = {'mode': 'sources', 'notices': [('success', "✅ Loaded data from: OWID, JHU"), stale], 'saved_at': 1e9}
+    refresher = DatasetRefresher(lambda force, current: (data, summary))
+    assert refresher.get() is data
+    stats = refresher.stats()
+    assert (stats['refreshes'], stats['failures'], stats['consecutive_failures']) == (0, 1, 1)
+    assert stats['refreshed_at'] == 1e9
+    assert stats['last_error'] == stale[1]
+    assert stale in stats['notices']
+
+def test_stale_cold_start(outage):
+    refresher = DatasetRefresher(_build_private)
+    data = refresher.get()
+    stats = refresher.stats()
+    assert len(data) and data_fetcher.dataset_version(data) is not None
+    assert (stats['refreshes'], stats['failures']) == (0, 1)
+    assert stats['age_seconds'] is not None
+    assert stats['last_refresh_seconds'] is not None
+    assert stats['last_refresh_mode'] == 'stale'
+
+def test_stale_cold_start_without_saved_at(outage):
+    _drop_saved_at()
+    refresher = DatasetRefresher(_build_private)
+    refresher.get()
+    assert refresher.stats()['age_seconds'] is None
+
+def test_app_renders_stale_cold_start(outage):
+    _drop_saved_at()
+    st.cache_resource.clear()  # A fresh process-wide refresher
+    app = AppTest.from_file(os.path.join(ROOT, 'app.py'), default_timeout=60).run()
+    try:
+        assert not app.exception
+        assert any('unreachable' in warning.value for warning in app.sidebar.warning)
+        captions = [caption.value for caption in app.sidebar.caption]
+        assert any(caption.startswith('Age: n/a min') for caption in captions)
+    finally:
+        get_refresher().stop()
+        st.cache_resource.clear()
@@ -0,0 +1,89 @@
+"""
+Date ranges on a loaded dataset are cut by binary search (within each
+country's block of the index, or over a date-ordered frame's dates); they
+select exactly the rows the plain boolean masks did.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_fetcher
+
+DAY = pd.Timedelta(days=1)
+
+# (start, end) from the dataset's first and last dates; both ends included
+RANGES = {
+    'middle': lambda first, last: (first + 10 * DAY, last - 10 * DAY),
+    'single_day': lambda first, last: (first + 5 * DAY, first + 5 * DAY),
+    'times_of_day': lambda first, last: (first + 5 * DAY + pd.Timedelta(hours=3), last - 5 * DAY + pd.Timedelta(hours=3)),
+    'covering': lambda first, last: (pd.Timestamp('1900-01-01'), pd.Timestamp('2200-01-01')),
+    'before_data': lambda first, last: (pd.Timestamp('1900-01-01'), first - DAY),
+    'after_data': lambda first, last: (last + DAY, pd.Timestamp('2200-01-01')),
+    'reversed': lambda first, last: (last, first)
+}
+
+# Ranges open at one or both ends, as filter_by_country and select_countries take them
+OPEN_RANGES = {
+    'open_start': lambda first, last: (None, first + 10 * DAY),
+    'open_end': lambda first, last: (last - 10 * DAY + pd.Timedelta(hours=3), None),
+    'open': lambda first, last: (None, None)
+}
+
+def _range(data, make):
+    return make(data['date'].min(), data['date'].max())
+
+def _mask(data, start, end):
+    """The row-by-row comparison the binary searches replaced."""
+    mask = np.ones(len(data), dtype=bool)
+    if start is not None:
+        mask &= (data['date'] >= start).to_numpy()
+    if end is not None:
+        mask &= (data['date'] <= end).to_numpy()
+    return mask
+
+def _countries(data):
+    return [str(country) for country in data['country'].cat.categories]
+
+@pytest.mark.parametrize('make', RANGES.values(), ids=RANGES)
+def test_filter_by_date_range(dataset, make):
+    start, end = _range(dataset, make)
+    expected = dataset[_mask(dataset, start, end)]
+    pd.testing.assert_frame_equal(data_fetcher.filter_by_date_range(dataset, start, end), expected)
+
+@pytest.mark.parametrize('make', RANGES.values(), ids=RANGES)
+def test_filter_by_date_range_of_date_ordered_rows(dataset, make):
+    # One country's rows without the index: one search over their dates
+    rows = dataset[dataset['country'] == _countries(dataset)[3]].reset_index(drop=True)
+    assert not data_fetcher.has_country_index(rows)
+    start, end = _range(dataset, make)
+    pd.testing.assert_frame_equal(data_fetcher.filter_by_date_range(rows, start, end), rows[_mask(rows, start, end)])
+
+@pytest.mark.parametrize('make', [*RANGES.values(), *OPEN_RANGES.values()], ids=[*RANGES, *OPEN_RANGES])
+def test_filter_by_country(dataset, make):
+    date_range = _range(dataset, make)
+    dates = _mask(dataset, *date_range)
+    for country in _countries(dataset):
+        expected = dataset[(dataset['country'] == country).to_numpy() & dates]
+        pd.testing.assert_frame_equal(data_fetcher.filter_by_country(dataset, country, date_range), expected)
+
+@pytest.mark.parametrize('make', [*RANGES.values(), *OPEN_RANGES.values()], ids=[*RANGES, *OPEN_RANGES])
+def test_select_countries(dataset, make):
+    date_range = _range(dataset, make)
+    dates = _mask(dataset, *date_range)
+    names = _countries(dataset)
+    countries = [names[6], 'Atlantis', names[0], names[-1], names[6]]
+    rows, blocks = data_fetcher.select_countries(dataset, countries, date_range)
+
+    parts = [dataset[(dataset['country'] == country).to_numpy() & dates] for country in dict.fromkeys(countries)]
+    pd.testing.assert_frame_equal(rows, pd.concat(parts).reset_index(drop=True))
+    stops = np.cumsum([len(part) for part in parts])
+    assert blocks == {
+        country: (int(stop - len(part)), int(stop)) for country, part, stop in zip(dict.fromkeys(countries), parts, stops)
+    }
+
+def test_get_date_rows(dataset):
+    first, last = dataset['date'].min(), dataset['date'].max()
+    dates = [first, first + 7 * DAY, last, first - DAY, last + DAY, first + 7 * DAY + pd.Timedelta(hours=3)]
+    for date in dates:
+        expected = np.flatnonzero((dataset['date'] == date).to_numpy())
+        np.testing.assert_array_equal(data_fetcher.get_date_rows(dataset, date), expected)
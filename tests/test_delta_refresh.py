@@ -0,0 +1,139 @@
+"""
+``refresh_covid_data`` patches the snapshot with only the lines that
+changed upstream; the result must be the frame a full load of the new
+file gives, down to dtypes, category order and row order.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_fetcher
+
+LOCATION, DATE, NEW_CASES = 2, 3, 5
+
+@pytest.fixture
+def source(mirror):
+    return mirror.csv_path
+
+def _read_lines(csv):
+    with open(csv, 'rb') as f:
+        return f.read().splitlines(keepends=True)
+
+def _write_lines(csv, lines):
+    """Replace the file, moving its mtime on so the ETag changes."""
+    mtime = os.stat(csv).st_mtime_ns
+    with open(csv, 'wb') as f:
+        f.writelines(lines)
+    os.utime(csv, ns=(mtime + 10**9, mtime + 10**9))
+
+def _set_field(line, field, value):
+    parts = line.split(b',')
+    parts[field] = value
+    return b','.join(parts)
+
+def _location(line):
+    return line.split(b',')[LOCATION]
+
+def _next_day(line, days=1):
+    day = pd.Timestamp(line.split(b',')[DATE].decode()) + pd.Timedelta(days=days)
+    return _set_field(line, DATE, str(day.date()).encode())
+
+def _full_load(csv):
+    with open(csv, 'rb') as f:
+        return data_fetcher.prepare_dataset(data_fetcher.clean_covid_data(data_fetcher._read_owid_csv(f)))
+
+def _refresh_matches_full_load(csv, mode):
+    df, summary = data_fetcher.refresh_covid_data()
+    expected = _full_load(csv)
+    assert summary['mode'] == mode
+    pd.testing.assert_frame_equal(df, expected)
+    assert df.dtypes.to_dict() == expected.dtypes.to_dict()
+    for column in ['country', 'iso_code', 'continent']:
+        assert list(df[column].cat.categories) == list(expected[column].cat.categories)
+    assert data_fetcher.dataset_version(df) == data_fetcher.dataset_version(expected)
+    for bounds in ['starts', 'stops']:
+        assert df.attrs['country_index'][bounds] == expected.attrs['country_index'][bounds]
+    return df, summary
+
+def test_unchanged(source):
+    df, summary = _refresh_matches_full_load(source, 'unchanged')
+    assert summary['rows'] == 0
+
+def test_appended_rows(source):
+    lines = _read_lines(source)
+    _write_lines(source, lines + [_next_day(lines[-1], days) for days in (1, 2, 3)])
+    df, summary = _refresh_matches_full_load(source, 'append')
+    assert (summary['rows'], summary['countries']) == (3, 1)
+
+def test_inserted_edited_and_removed_rows(source):
+    lines = _read_lines(source)
+    # A day after the end of the first location's block, inside the file
+    last = max(i for i, line in enumerate(lines) if _location(line) == _location(lines[1]))
+    lines.insert(last + 1, _next_day(lines[last]))
+    lines[100] = _set_field(lines[100], NEW_CASES, b'99999')
+    del lines[200]
+    _write_lines(source, lines)
+    df, summary = _refresh_matches_full_load(source, 'diff')
+    assert (summary['rows'], summary['removed']) == (2, 1)
+
+def test_edits_that_change_count_dtypes(source):
+    lines = _read_lines(source)
+    assert _full_load(source)['daily_cases'].dtype == 'int32'
+    lines[100] = _set_field(lines[100], NEW_CASES, b'2.5')
+    _write_lines(source, lines)
+    df, _ = _refresh_matches_full_load(source, 'diff')
+    assert df['daily_cases'].dtype == 'float64'
+
+    lines[100] = _set_field(lines[100], NEW_CASES, b'3')
+    _write_lines(source, lines)
+    df, _ = _refresh_matches_full_load(source, 'diff')
+    assert df['daily_cases'].dtype == 'int32'
+
+def test_counts_beyond_float32_stay_exact(source):
+    lines = _read_lines(source)
+    world = max(i for i, line in enumerate(lines) if _location(line) == b'World')
+    lines[world] = _set_field(lines[world], NEW_CASES, b'16777217')
+    _write_lines(source, lines)
+    df, _ = _refresh_matches_full_load(source, 'diff')
+    assert df['daily_cases'].max() == 2**24 + 1
+
+def test_new_country_appended(source):
+    lines = _read_lines(source)
+    # Sorts between existing names, so the category codes move
+    country = _location(lines[1])
+    renamed = [line.replace(country, country + b' North') for line in lines if _location(line) == country]
+    _write_lines(source, lines + renamed)
+    df, summary = _refresh_matches_full_load(source, 'append')
+    assert summary['countries'] == 1
+    assert (country + b' North').decode() in df['country'].cat.categories
+
+def test_new_country_inserted(source):
+    lines = _read_lines(source)
+    country = _location(lines[1])
+    renamed = [line.replace(country, b'Atlantis') for line in lines if _location(line) == country]
+    _write_lines(source, lines[:1] + renamed + lines[1:])
+    df, summary = _refresh_matches_full_load(source, 'diff')
+    assert 'Atlantis' in df['country'].cat.categories
+
+def test_country_removed(source):
+    lines = _read_lines(source)
+    country = _location(lines[1])
+    _write_lines(source, [line for line in lines if _location(line) != country])
+    df, summary = _refresh_matches_full_load(source, 'diff')
+    assert country.decode() not in df['country'].cat.categories
+
+def test_line_index_mismatch_reloads_in_full(source):
+    # Fingerprints of another body: the diff cannot trust them
+    with np.load(data_fetcher.SNAPSHOT_LINES) as f:
+        index = {name: f[name] for name in f.files}
+    np.savez(data_fetcher.SNAPSHOT_LINES, **dict(index, length=index['length'] + 1))
+    lines = _read_lines(source)
+    lines[100] = _set_field(lines[100], NEW_CASES, b'99999')
+    _write_lines(source, lines)
+    _refresh_matches_full_load(source, 'full')
+    # The reload wrote a fresh index, so the next change is a diff again
+    lines[200] = _set_field(lines[200], NEW_CASES, b'99999')
+    _write_lines(source, lines)
+    _refresh_matches_full_load(source, 'diff')
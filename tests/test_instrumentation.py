@@ -0,0 +1,36 @@
+"""
+With ``COVID_TRACKER_METRICS_LOG=1`` every rerun is written to stderr as
+one JSON line; both switches are read at import, so each case runs in a
+fresh interpreter.
+"""
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+def _run(code, **env):
+    return subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=dict(os.environ, **env),
+                          capture_output=True, text=True, timeout=60, check=True)
+
+RERUN = (
+    "import instrumentation as i\n"
+    "i.start_rerun()\n"
+    "with i.span('filter'):\n"
+    "    i.count('figure_cache_hit')\n"
+    "i.finish_rerun(page='Country Dashboard')\n"
+)
+
+def test_rerun_logged_as_one_json_line():
+    result = _run(RERUN, COVID_TRACKER_INSTRUMENTATION='1', COVID_TRACKER_METRICS_LOG='1')
+    lines = result.stderr.splitlines()
+    assert len(lines) == 1
+    line = json.loads(lines[0])
+    assert (line['event'], line['page']) == ('rerun', 'Country Dashboard')
+    assert line['spans']['filter']['calls'] == 1
+    assert line['counters'] == {'figure_cache_hit': 1}
+
+def test_nothing_logged_by_default():
+    result = _run(RERUN, COVID_TRACKER_INSTRUMENTATION='1', COVID_TRACKER_METRICS_LOG='0')
+    assert result.stderr == ''
@@ -0,0 +1,87 @@
+"""
+The DuckDB backend answers every dataset query exactly as the pandas
+paths do: same rows, order, dtypes and values.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_fetcher
+import query_engine
+import rollups
+
+pytest.importorskip('duckdb')
+
+def _dates(data):
+    dates = data_fetcher.get_date_partitions(data)['dates']
+    return dates[len(dates) // 4], dates[len(dates) // 2]
+
+def _country(data, n):
+    return str(data['country'].cat.categories[n])
+
+FRAMES = {
+    'country': lambda data: data_fetcher.filter_by_country(data, _country(data, 5)),
+    'country_range': lambda data: data_fetcher.filter_by_country(data, _country(data, 5), _dates(data)),
+    'country_open_start': lambda data: data_fetcher.filter_by_country(data, _country(data, 5), (None, _dates(data)[1])),
+    'country_open_end': lambda data: data_fetcher.filter_by_country(data, _country(data, 5), (_dates(data)[0], None)),
+    'country_unknown': lambda data: data_fetcher.filter_by_country(data, 'Atlantis'),
+    'date_range': lambda data: data_fetcher.filter_by_date_range(data, *_dates(data)),
+    'date_range_times': lambda data: data_fetcher.filter_by_date_range(
+        data, *(date + pd.Timedelta(hours=3) for date in _dates(data))
+    ),
+    'date_range_empty': lambda data: data_fetcher.filter_by_date_range(data, '1900-01-01', '1900-12-31'),
+    'snapshot': lambda data: data_fetcher.get_date_snapshot(data, _dates(data)[1]),
+    'snapshot_missing': lambda data: data_fetcher.get_date_snapshot(data, '1900-01-01')
+}
+
+SELECTIONS = {
+    'repeated_and_unknown': lambda data: ([_country(data, 7), 'Atlantis', _country(data, 2), _country(data, 7)], None),
+    'date_range': lambda data: ([_country(data, 9), _country(data, 1)], _dates(data)),
+    'unknown_only': lambda data: (['Atlantis'], None)
+}
+
+def _on_both(monkeypatch, query):
+    """``(pandas, duckdb)`` results of ``query()``."""
+    results = []
+    for backend in query_engine.BACKENDS:
+        monkeypatch.setattr(query_engine, 'QUERY_BACKEND', backend)
+        results.append(query())
+    return tuple(results)
+
+def test_backend_is_used(dataset, monkeypatch):
+    monkeypatch.setattr(query_engine, 'QUERY_BACKEND', 'duckdb')
+    assert data_fetcher.uses_query_engine(dataset)
+
+@pytest.mark.parametrize('query', FRAMES.values(), ids=FRAMES)
+def test_frames_match(dataset, monkeypatch, query):
+    expected, result = _on_both(monkeypatch, lambda: query(dataset))
+    pd.testing.assert_frame_equal(result, expected, check_index_type=False, check_column_type=False)
+
+@pytest.mark.parametrize('arguments', SELECTIONS.values(), ids=SELECTIONS)
+def test_select_countries_matches(dataset, monkeypatch, arguments):
+    countries, date_range = arguments(dataset)
+    (expected, expected_blocks), (result, blocks) = _on_both(
+        monkeypatch, lambda: data_fetcher.select_countries(dataset, countries, date_range)
+    )
+    pd.testing.assert_frame_equal(result, expected)
+    assert blocks == expected_blocks
+
+@pytest.mark.parametrize('country', [3, 'Atlantis'])
+def test_latest_metrics_match(dataset, monkeypatch, country):
+    if isinstance(country, int):
+        country = _country(dataset, country)
+    expected, result = _on_both(monkeypatch, lambda: data_fetcher.get_latest_metrics(dataset, country))
+    if expected is None:
+        assert result is None
+    else:
+        pd.testing.assert_series_equal(result, expected)
+
+def test_rollup_sums_match(dataset):
+    dates, continents, population, sums = rollups._rollup_sums(dataset)
+    result = query_engine.rollup_sums(dataset)
+    assert result[0].equals(dates)
+    assert result[1].equals(continents)
+    np.testing.assert_allclose(result[2], population)
+    assert result[3].keys() == sums.keys()
+    for column, values in sums.items():
+        np.testing.assert_allclose(result[3][column], values, rtol=1e-12, err_msg=column)
@@ -1,212 +1,97 @@
-import plotly.graph_objects as go
-import plotly.express as px
 import streamlit as st
-import pandas as pd
-from data_fetcher import filter_by_country
+from figures import get_figure, metric_cards
+from instrumentation import span
 
 def plot_metrics_cards(latest, country):
     """Display metric cards with current statistics."""
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        cumulative_cases = int(latest['cumulative_cases']) if pd.notna(latest['cumulative_cases']) else 0
-        daily_cases = int(latest['daily_cases']) if pd.notna(latest['daily_cases']) else 0
-        st.metric(
-            label="Total Cases",
-            value=f"{cumulative_cases:,}",
-            delta=f"+{daily_cases:,}" if daily_cases > 0 else "0 new cases"
-        )
-    
-    with col2:
-        cumulative_deaths = int(latest['cumulative_deaths']) if pd.notna(latest['cumulative_deaths']) else 0
-        daily_deaths = int(latest['daily_deaths']) if pd.notna(latest['daily_deaths']) else 0
-        st.metric(
-            label="Total Deaths",
-            value=f"{cumulative_deaths:,}",
-            delta=f"+{daily_deaths:,}" if daily_deaths > 0 else "0 new deaths"
-        )
-    
-    with col3:
-        cfr_value = float(latest['cfr']) if pd.notna(latest['cfr']) and latest['cfr'] != float('inf') else 0
-        st.metric(
-            label="Case Fatality Rate",
-            value=f"{cfr_value:.2f}%",
-            delta="Per confirmed case"
-        )
-    
-    with col4:
-        population = float(latest['population']) if pd.notna(latest['population']) and latest['population'] > 0 else 1
-        cumulative_cases_val = float(latest['cumulative_cases']) if pd.notna(latest['cumulative_cases']) else 0
-        cases_per_100k = (cumulative_cases_val / population * 100000) if population > 1 else 0
-        st.metric(
-            label="Cases per 100K",
-            value=f"{cases_per_100k:.1f}",
-            delta="Population normalized"
-        )
-
-def plot_daily_metrics(data, country, metric_type, key_suffix=""):
-    """Create line chart for daily metrics."""
-    country_data = filter_by_country(data, country)
-    
-    # Check if we have data
-    if country_data.empty:
-        st.warning(f"No data available for {country}")
-        return
-    
-    if metric_type == "Cases":
-        column = "daily_cases"
-        title = f"Daily New Cases - {country}"
-        y_label = "Daily New Cases"
-    elif metric_type == "Deaths":
-        column = "daily_deaths"
-        title = f"Daily New Deaths - {country}"
-        y_label = "Daily New Deaths"
-    else:
-        column = "cumulative_cases"
-        title = f"Cumulative Cases - {country}"
-        y_label = "Cumulative Cases"
-    
-    # Remove rows where the column value is NaN
-    plot_data = country_data[country_data[column].notna()].copy()
-    
-    if plot_data.empty:
-        st.info(f"No {metric_type.lower()} data available for {country}")
-        return
-    
-    # Create the plot with proper hover data
-    fig = px.line(plot_data, x='date', y=column, title=title)
-    
-    # Update traces for better hover
-    fig.update_traces(
-        mode='lines+markers',
-        hovertemplate='<b>Date:</b> %{x|%Y-%m-%d}<br><b>' + y_label + ':</b> %{y:,.0f}<extra></extra>',
-        line=dict(width=2),
-        marker=dict(size=4)
-    )
-    
-    fig.update_layout(
-        hovermode='x unified',
-        template='plotly_white',
-        height=500,
-        xaxis_title='Date',
-        yaxis_title=y_label,
-        yaxis=dict(tickformat=','),
-        showlegend=False
-    )
-    
-    # Add range slider
-    fig.update_xaxes(rangeslider_visible=True)
-    
+    for column, card in zip(st.columns(4), metric_cards(latest)):
+        with column:
+            st.metric(**card)
+
+def _render_figure(figure, notices, key=None):
+    """Show a cached or freshly built figure and its notices."""
+    for level, message in notices:
+        getattr(st, level)(message)
+    if figure is not None:
+        with span('chart_send'):
+            st.plotly_chart(figure, use_container_width=True, key=key)
+
+def plot_daily_metrics(data, country, metric_type, key_suffix="", date_range=None):
+    """
+    Create line chart for daily metrics.
+
+    The series is downsampled to the per-trace point budget before the
+    figure is built; ``date_range`` (start, end) sets the initial view and
+    gets most of that budget. Figures are served from the figure cache.
+    """
+    figure, notices = get_figure("daily_metrics", data, country=country, metric_type=metric_type,
+                                 date_range=date_range)
     # Use key to avoid duplicate element IDs
     chart_key = f"chart_{country}_{metric_type}_{key_suffix}" if key_suffix else None
-    st.plotly_chart(fig, use_container_width=True, key=chart_key)
+    _render_figure(figure, notices, key=chart_key)
+
+def plot_case_fatality_rate(data, country, key=None):
+    """Create line chart of the case fatality rate over time."""
+    _render_figure(*get_figure("case_fatality_rate", data, country=country), key=key)
+
+def plot_country_comparison(data, countries, normalize=False, date_range=None, column='cumulative_cases', key=None):
+    """
+    Create comparison chart across multiple countries.
 
-def plot_country_comparison(data, countries, normalize=False):
-    """Create comparison chart across multiple countries."""
+    All selected countries are fetched and normalized in one vectorized
+    pass; traces are then cut from the grouped arrays and downsampled to
+    the per-trace point budget, favouring ``date_range`` if given.
+    """
     if not countries:
         st.warning("Please select at least one country")
         return
     
-    fig = go.Figure()
-    
-    for country in countries:
-        country_data = filter_by_country(data, country)
-        
-        if country_data.empty:
-            st.warning(f"No data available for {country}")
-            continue
-        
-        if normalize and 'population' in country_data.columns:
-            # Avoid division by zero
-            country_data = country_data[country_data['population'] > 0].copy()
-            if not country_data.empty:
-                y_val = (country_data['cumulative_cases'] / country_data['population'] * 100000).fillna(0)
-                y_label = "Cases per 100K Population"
-            else:
-                continue
-        else:
-            y_val = country_data['cumulative_cases'].fillna(0)
-            y_label = "Cumulative Cases"
-        
-        fig.add_trace(go.Scatter(
-            x=country_data['date'],
-            y=y_val,
-            name=country,
-            mode='lines+markers',
-            hovertemplate='<b>%{fullData.name}</b><br>Date: %{x}<br>Count: %{y:,.0f}<extra></extra>'
-        ))
-    
-    if len(fig.data) == 0:
-        st.warning("No data available for selected countries")
-        return
-    
-    fig.update_layout(
-        title="Country Comparison - Cumulative Cases",
-        xaxis_title='Date',
-        yaxis_title=y_label,
-        hovermode='x unified',
-        template='plotly_white',
-        height=500,
-        legend=dict(
-            yanchor="top",
-            y=0.99,
-            xanchor="left",
-            x=0.01
-        )
-    )
-    
-    st.plotly_chart(fig, use_container_width=True)
+    _render_figure(*get_figure("country_comparison", data, countries=list(countries), normalize=normalize,
+                               date_range=date_range, column=column), key=key)
+
+def plot_latest_comparison(data, countries, column='cumulative_cases', per_100k=False, key=None):
+    """Create a bar chart of the selected countries' latest values, read from the country index."""
+    _render_figure(*get_figure("latest_comparison", data, countries=list(countries), column=column,
+                               per_100k=per_100k), key=key)
 
 def plot_global_map(data, map_type, selected_date):
     """Create choropleth map visualization."""
-    # Get data for selected date
-    map_data = data[data['date'] == selected_date].drop_duplicates(subset=['country']).copy()
-    
-    if map_data.empty:
-        st.warning(f"No data available for {selected_date}")
-        return
-    
-    if map_type == "Cases":
-        column = "cumulative_cases"
-        title = f"Global COVID-19 Cases - {selected_date.strftime('%Y-%m-%d')}"
-        color_scale = 'Reds'
-    elif map_type == "Deaths":
-        column = "cumulative_deaths"
-        title = f"Global COVID-19 Deaths - {selected_date.strftime('%Y-%m-%d')}"
-        color_scale = 'Purples'
-    else:
-        column = "cfr"
-        title = f"Case Fatality Rate (%) - {selected_date.strftime('%Y-%m-%d')}"
-        color_scale = 'YlOrRd'
-    
-    # Remove rows with invalid data
-    map_data = map_data[map_data[column].notna() & (map_data[column] >= 0)]
-    
-    if map_data.empty or map_data[column].sum() == 0:
-        st.info(f"No {map_type.lower()} data available for this date")
-        return
-    
-    fig = px.choropleth(
-        map_data,
-        locations='iso_code',
-        color=column,
-        hover_name='country',
-        hover_data={
-            'iso_code': False,
-            column: ':,.0f' if map_type != "Case Fatality Rate" else ':.2f'
-        },
-        color_continuous_scale=color_scale,
-        title=title,
-        labels={column: map_type}
-    )
-    
-    fig.update_layout(
-        height=600,
-        geo=dict(
-            showframe=False,
-            showcoastlines=True,
-            projection_type='natural earth'
-        )
-    )
-    
-    st.plotly_chart(fig, use_container_width=True)
+    _render_figure(*get_figure("global_map", data, map_type=map_type, selected_date=selected_date))
+
+def plot_metric_map(data, column, selected_date, per_100k=False, key=None):
+    """Create a choropleth of any count column (or its per-100K rate) on one date."""
+    _render_figure(*get_figure("metric_map", data, column=column, selected_date=selected_date,
+                               per_100k=per_100k), key=key)
+
+def plot_global_map_timeline(data, map_type, granularity="Weekly"):
+    """
+    Create an animated choropleth that plays and scrubs in the browser.
+
+    The figure is cached per (data version, map type, granularity), so it
+    is built once per data refresh and moving through dates never reruns
+    the app.
+    """
+    _render_figure(*get_figure("global_map_timeline", data, map_type=map_type, granularity=granularity))
+
+def plot_metric_trend(data, country, name, key=None):
+    """
+    Create a line chart of a derived metric from the metrics registry.
+
+    The metric is computed for all countries at once and cached per data
+    version; the chart cuts out the selected country's rows.
+    """
+    _render_figure(*get_figure("metric_trend", data, country=country, name=name), key=key)
+
+def plot_rollup_trend(data, group, metric_type, per_100k=False, key=None):
+    """
+    Create the daily trend chart of a continent or the world.
+
+    Reads the prebuilt rollups, so the cost depends on the number of
+    dates rather than on the rows of the dataset.
+    """
+    _render_figure(*get_figure("rollup_trend", data, group=group, metric_type=metric_type, per_100k=per_100k),
+                   key=key)
+
+def plot_continent_breakdown(data, metric_type, per_100k=False):
+    """Create a bar chart comparing continents on the latest day."""
+    _render_figure(*get_figure("continent_breakdown", data, metric_type=metric_type, per_100k=per_100k))